@@ -0,0 +1,154 @@
+"""
+Binary price archives
+
+An archive holds one series as fixed-width records, so that a price can be
+looked up by date without reading or parsing the whole file. The file is
+memory-mapped and searched with a binary search, which takes O(log n) time.
+
+The file starts with a header::
+
+    magic      4 bytes   b"PHAR"
+    version    uint8     1
+    scale      uint8     number of decimal places in amounts
+    length     uint16    length of the names that follow
+    names      bytes     base, quote, type and source, UTF-8, newline separated
+
+It is followed by one record per price, in ascending date order::
+
+    day        int32     proleptic Gregorian ordinal of the date
+    amount     int64     amount multiplied by 10 ** scale
+
+All numbers are little-endian.
+
+Classes:
+
+    Archive
+
+Functions:
+
+    pack
+    format_lookup
+
+"""
+
+import bisect
+import csv
+import io
+import logging
+import mmap
+import struct
+from datetime import date
+from decimal import ROUND_HALF_EVEN, Decimal
+
+from pricehist.price import Price
+
+MAGIC = b"PHAR"
+VERSION = 1
+HEADER = struct.Struct("<4sBBH")
+RECORD = struct.Struct("<iq")
+MAX_SCALE = 18
+MAX_AMOUNT = 2**63 - 1
+
+
+def pack(series, source_id, base=None, quote=None):
+    amounts = [p.amount for p in series.prices]
+    scale = _scale(amounts)
+    names = "\n".join(
+        [base or series.base, quote or series.quote, series.type, source_id]
+    ).encode("utf-8")
+
+    parts = [HEADER.pack(MAGIC, VERSION, scale, len(names)), names]
+    for price in series.prices:
+        day = date.fromisoformat(price.date).toordinal()
+        scaled = price.amount.scaleb(scale).to_integral_value(ROUND_HALF_EVEN)
+        parts.append(RECORD.pack(day, int(scaled)))
+    return b"".join(parts)
+
+
+def _scale(amounts):
+    places = max([0, *[-a.as_tuple().exponent for a in amounts]])
+    scale = min(places, MAX_SCALE)
+    largest = max([abs(a) for a in amounts], default=Decimal(0))
+    while scale > 0 and largest.scaleb(scale) > MAX_AMOUNT:
+        scale -= 1
+    if largest.scaleb(scale) > MAX_AMOUNT:
+        raise ValueError(f"The amount {largest} is too large for an archive.")
+    if scale < places:
+        logging.warning(
+            f"Amounts have been rounded to {scale} decimal places to fit in the "
+            "archive. Use --quantize to choose the number of places."
+        )
+    return scale
+
+
+def format_lookup(path, dates):
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow(["date", "price_date", "base", "quote", "amount"])
+    with Archive(path) as archive:
+        for d in dates:
+            price = archive.at_or_before(d)
+            if price is None:
+                logging.warning(f"No price found at or before {d}.")
+            else:
+                row = [d, price.date, archive.base, archive.quote, price.amount]
+                writer.writerow(row)
+    return output.getvalue()
+
+
+class Archive:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"Not a pricehist archive: '{path}'.")
+
+        try:
+            magic, version, self.scale, length = HEADER.unpack_from(self._map)
+        except struct.error:
+            magic, version = None, None
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Not a pricehist archive: '{path}'.")
+
+        names = self._map[HEADER.size : HEADER.size + length].decode("utf-8")
+        self.base, self.quote, self.type, self.source = names.split("\n")
+        self._offset = HEADER.size + length
+        self._days = _Days(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._map.close()
+
+    def __len__(self):
+        return (len(self._map) - self._offset) // RECORD.size
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError("archive index out of range")
+        day, scaled = RECORD.unpack_from(self._map, self._offset + i * RECORD.size)
+        amount = Decimal(scaled).scaleb(-self.scale)
+        return Price(date.fromordinal(day).isoformat(), amount)
+
+    def at_or_before(self, d):
+        """Return the price on the given date or the nearest before it."""
+        i = bisect.bisect_right(self._days, date.fromisoformat(d).toordinal())
+        return self[i - 1] if i > 0 else None
+
+
+class _Days:
+    def __init__(self, archive):
+        self.archive = archive
+
+    def __len__(self):
+        return len(self.archive)
+
+    def __getitem__(self, i):
+        offset = self.archive._offset + i * RECORD.size
+        return RECORD.unpack_from(self.archive._map, offset)[0]
@@ -0,0 +1,73 @@
+"""
+Disk cache for source metadata
+
+Some sources need a large listing, such as every symbol they support, before
+they can request prices. Such listings change slowly, so they are kept in the
+user's cache directory and reused until they expire, rather than downloaded on
+every run.
+
+The directory is ``$PRICEHIST_CACHE_DIR`` if that is set, and otherwise
+``pricehist`` under ``$XDG_CACHE_HOME`` or ``~/.cache``. Each entry is a JSON
+file that records a key, such as the URL it was downloaded from, so that data
+from a different server is not reused. Problems reading or writing the cache
+are logged at the debug level and otherwise ignored.
+
+The cache isn't used while source interactions are being recorded or replayed,
+as a cached listing would otherwise never be recorded.
+
+Functions:
+
+    directory
+    get
+
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+from pricehist import recorder
+
+CACHE_DIR_NAME = "PRICEHIST_CACHE_DIR"
+
+
+def directory():
+    if os.getenv(CACHE_DIR_NAME):
+        return Path(os.getenv(CACHE_DIR_NAME))
+    return Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "pricehist"
+
+
+def get(name, key, ttl, load, clock=time.time):
+    """Return the cached data for the name and key, calling load() if necessary.
+
+    Data older than ttl seconds is loaded again. The loaded data must be
+    serializable as JSON.
+    """
+    if recorder.active():
+        return load()
+
+    path = directory() / f"{name}.json"
+
+    try:
+        entry = json.loads(path.read_text())
+        if entry["key"] == key and 0 <= clock() - entry["saved"] < ttl:
+            logging.debug(f"Using cached {name} data from {path}.")
+            return entry["data"]
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logging.debug(f"Ignoring unreadable cache file {path}: {e}")
+
+    data = load()
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f".{path.name}.{os.getpid()}")
+        partial.write_text(json.dumps({"key": key, "saved": clock(), "data": data}))
+        os.replace(partial, path)
+    except OSError as e:
+        logging.debug(f"Couldn't write cache file {path}: {e}")
+
+    return data
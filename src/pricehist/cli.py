@@ -4,10 +4,24 @@ import shutil
 import sys
 from datetime import datetime, timedelta
 
-from pricehist import __version__, logger, outputs, sources
-from pricehist.fetch import fetch
+from pricehist import (
+    __version__,
+    archive,
+    jobs,
+    logger,
+    metrics,
+    outputs,
+    recorder,
+    search,
+    server,
+    sources,
+    stats,
+    trace,
+    watch,
+)
+from pricehist.fetch import fetch, fetch_many
 from pricehist.format import Format
-from pricehist.series import Series
+from pricehist.series import AGGREGATES, PERIODS, Series
 
 
 def cli(argv=sys.argv):
@@ -23,49 +37,180 @@ def cli(argv=sys.argv):
 
     logging.debug(f"Began pricehist run at {start_time}.")
 
+    if getattr(args, "trace", None):
+        trace.start()
+
+    if getattr(args, "record", None):
+        recorder.record(args.record)
+    elif getattr(args, "replay", None):
+        recorder.replay(args.replay)
+
     try:
-        if args.version:
-            print(f"pricehist {__version__}")
-        elif args.command == "sources":
-            result = sources.formatted()
-            print(result)
-        elif args.command == "source" and args.symbols:
-            result = sources.by_id[args.source].format_symbols()
-            print(result, end="")
-        elif args.command == "source" and args.search:
-            result = sources.by_id[args.source].format_search(args.search)
-            print(result, end="")
-        elif args.command == "source":
-            total_width = shutil.get_terminal_size().columns
-            result = sources.by_id[args.source].format_info(total_width)
-            print(result)
-        elif args.command == "fetch":
-            source = sources.by_id[args.source]
-            output = outputs.by_type[args.output]
-            if args.end < args.start:
-                parser.error(
-                    f"The end date '{args.end}' preceeds the start date '{args.start}'!"
+        with trace.span("cli", command=args.command):
+            if args.version:
+                print(f"pricehist {__version__}")
+            elif args.command == "sources":
+                result = sources.formatted()
+                print(result)
+            elif args.command == "source" and args.symbols:
+                result = sources.by_id[args.source].format_symbols()
+                print(result, end="")
+            elif args.command == "source" and args.search:
+                result = sources.by_id[args.source].format_search(args.search)
+                print(result, end="")
+            elif args.command == "source":
+                total_width = shutil.get_terminal_size().columns
+                result = sources.by_id[args.source].format_info(total_width)
+                print(result)
+            elif args.command == "search":
+                if args.sources:
+                    source_list = [sources.by_id[s] for s in args.sources]
+                else:
+                    source_list = sources.by_id.available()
+                result = search.format_search(
+                    " ".join(args.query), source_list, args.limit, args.refresh
+                )
+                print(result, end="")
+            elif args.command == "fetch":
+                source = sources.by_id[args.source]
+                output = outputs.by_type[args.output]
+                series_list = _series_from_args(parser, args, source)
+                many = len(series_list) > 1 or "*" in (
+                    series_list[0].base,
+                    series_list[0].quote,
+                )
+                if many and not output.multiple:
+                    parser.error(
+                        f"The {args.output} output can only hold a single pair."
+                    )
+                if args.merge and not output.streaming:
+                    parser.error(f"The {args.output} output can't merge pairs by date.")
+                if output.missing_dependency():
+                    parser.error(
+                        f"The {args.output} output requires the "
+                        f"{output.missing_dependency()} package, which is not "
+                        "installed."
+                    )
+                if output.file_only and not args.output_file:
+                    parser.error(
+                        f"The {args.output} output can only be written to a file. "
+                        "Use --output-file."
+                    )
+                via = [source.normalizesymbol(s) for s in args.via]
+                fmt = Format.fromargs(args)
+                options = dict(
+                    via=via,
+                    resample=args.resample,
+                    aggregate=args.aggregate,
+                    path=args.output_file,
+                    fixed=args.fixed,
                 )
-            if args.type not in source.types():
-                parser.error(
-                    f"The requested price type '{args.type}' is not "
-                    f"recognized by the {source.id()} source!"
+                if many:
+                    result = fetch_many(
+                        series_list,
+                        source,
+                        output,
+                        args.invert,
+                        args.quantize,
+                        fmt,
+                        merge=args.merge,
+                        **options,
+                    )
+                else:
+                    if not args.output_file:
+                        options["file"] = (
+                            sys.stdout.buffer if output.binary else sys.stdout
+                        )
+                    result = fetch(
+                        series_list[0],
+                        source,
+                        output,
+                        args.invert,
+                        args.quantize,
+                        fmt,
+                        **options,
+                    )
+                if args.output_file:
+                    logging.debug(f"Wrote output to {args.output_file}.")
+                elif result is None:
+                    pass
+                elif output.binary:
+                    sys.stdout.buffer.write(result)
+                else:
+                    print(result, end="")
+            elif args.command == "stats":
+                source = sources.by_id[args.source]
+                series_list = _series_from_args(parser, args, source)
+                if args.window < 2:
+                    parser.error("The window must be at least 2 prices.")
+                if stats.missing_dependency():
+                    parser.error(
+                        "The stats command requires the "
+                        f"{stats.missing_dependency()} package, which is not "
+                        "installed."
+                    )
+                result = stats.format_stats(
+                    series_list, source, args.window, args.output
                 )
-            series = Series(
-                base=source.normalizesymbol(args.pair[0]),
-                quote=source.normalizesymbol(args.pair[1]),
-                type=args.type,
-                start=args.start,
-                end=args.end,
-            )
-            fmt = Format.fromargs(args)
-            result = fetch(series, source, output, args.invert, args.quantize, fmt)
-            print(result, end="")
-        else:
-            parser.print_help()
+                print(result, end="")
+            elif args.command == "run":
+                try:
+                    job_list = jobs.load(args.jobfile)
+                except (OSError, ValueError) as e:
+                    logging.debug("Critical exception encountered", exc_info=e)
+                    logging.critical(str(e))
+                    sys.exit(1)
+                results, succeeded = jobs.run(job_list, workers=args.workers)
+                for result in results:
+                    if result is not None:
+                        print(result, end="")
+                if not succeeded:
+                    sys.exit(1)
+            elif args.command == "watch":
+                try:
+                    job_list = jobs.load(args.jobfile)
+                    interval = timedelta(minutes=args.interval)
+                    watch.watch(job_list, workers=args.workers, interval=interval)
+                except (OSError, ValueError) as e:
+                    logging.debug("Critical exception encountered", exc_info=e)
+                    logging.critical(str(e))
+                    sys.exit(1)
+                except KeyboardInterrupt:
+                    logging.debug("Interrupted.")
+            elif args.command == "lookup":
+                try:
+                    result = archive.format_lookup(args.archive, args.dates)
+                except (OSError, ValueError) as e:
+                    logging.debug("Critical exception encountered", exc_info=e)
+                    logging.critical(str(e))
+                    sys.exit(1)
+                print(result, end="")
+            elif args.command == "serve":
+                try:
+                    server.serve(
+                        host=args.host,
+                        port=args.port,
+                        socket=args.socket,
+                        cache_size=args.cache_size,
+                        cache_ttl=args.cache_ttl,
+                    )
+                except OSError as e:
+                    logging.debug("Critical exception encountered", exc_info=e)
+                    logging.critical(f"Couldn't serve prices: {e}")
+                    sys.exit(1)
+            else:
+                parser.print_help()
     except BrokenPipeError:
         logging.debug("The output pipe was closed early.")
     finally:
+        recorder.reset()
+        if getattr(args, "metrics", None):
+            metrics.write(args.metrics)
+            logging.debug(f"Wrote metrics to {args.metrics}.")
+        if getattr(args, "trace", None):
+            trace.write(args.trace)
+            trace.stop()
+            logging.debug(f"Wrote trace to {args.trace}.")
         logging.debug(f"Ended pricehist run at {datetime.now()}.")
 
 
@@ -111,6 +256,108 @@ def today():
     return datetime.now().date().isoformat()
 
 
+def _series_from_args(parser, args, source):
+    if args.end < args.start:
+        parser.error(
+            f"The end date '{args.end}' preceeds the start date '{args.start}'!"
+        )
+    if args.type not in source.types():
+        parser.error(
+            f"The requested price type '{args.type}' is not "
+            f"recognized by the {source.id()} source!"
+        )
+    return [
+        Series(
+            base=source.normalizesymbol(base),
+            quote=source.normalizesymbol(quote),
+            type=args.type,
+            start=args.start,
+            end=args.end,
+        )
+        for base, quote in args.pair
+    ]
+
+
+def _add_range_args(parser):
+    parser.add_argument(
+        "-t",
+        "--type",
+        dest="type",
+        metavar="TYPE",
+        type=str,
+        help="price type, e.g. close (default: first for source)",
+    )
+    start_group = parser.add_mutually_exclusive_group(required=False)
+    start_group.add_argument(
+        "-s",
+        "--start",
+        dest="start",
+        metavar="DATE",
+        type=valid_date,
+        help="start date, inclusive (default: source start)",
+    )
+    start_group.add_argument(
+        "-sx",
+        "--startx",
+        dest="start",
+        metavar="DATE",
+        type=valid_date_after,
+        help="start date, exclusive",
+    )
+    end_group = parser.add_mutually_exclusive_group(required=False)
+    end_group.add_argument(
+        "-e",
+        "--end",
+        dest="end",
+        metavar="DATE",
+        type=valid_date,
+        default=today(),
+        help="end date, inclusive (default: today)",
+    )
+    end_group.add_argument(
+        "-ex",
+        "--endx",
+        dest="end",
+        metavar="DATE",
+        type=valid_date_before,
+        help="end date, exclusive",
+    )
+
+
+def _add_run_io_args(parser, record=True):
+    # Recording, replaying, metrics and tracing of the source interactions.
+    if record:
+        record_or_replay = parser.add_mutually_exclusive_group(required=False)
+        record_or_replay.add_argument(
+            "--record",
+            dest="record",
+            metavar="DIR",
+            type=str,
+            help="save source interactions to a directory",
+        )
+        record_or_replay.add_argument(
+            "--replay",
+            dest="replay",
+            metavar="DIR",
+            type=str,
+            help="answer requests from saved interactions instead of the network",
+        )
+    parser.add_argument(
+        "--metrics",
+        dest="metrics",
+        metavar="FILE",
+        type=str,
+        help="write source metrics to a file, as JSON if it ends in .json",
+    )
+    parser.add_argument(
+        "--trace",
+        dest="trace",
+        metavar="FILE",
+        type=str,
+        help="write a trace of the run to a JSON file for a trace viewer",
+    )
+
+
 def build_parser():
     def formatter(prog):
         return argparse.HelpFormatter(prog, max_help_position=50)
@@ -161,7 +408,10 @@ def build_parser():
     source_parser = subparsers.add_parser(
         "source",
         help="show source details",
-        usage="pricehist source SOURCE [-h] [-s | --search QUERY]",
+        usage=(
+            "pricehist source SOURCE [-h] [-s | --search QUERY] "
+            "[--record DIR | --replay DIR] [--metrics FILE] [--trace FILE]"
+        ),
         formatter_class=formatter,
     )
     source_parser.add_argument(
@@ -192,20 +442,73 @@ def build_parser():
         help="search for symbols, if possible",
     )
 
+    _add_run_io_args(source_parser)
+
+    search_parser = subparsers.add_parser(
+        "search",
+        help="search for symbols across sources",
+        usage=(
+            "pricehist search QUERY [QUERY ...] [-h] [-vvv] [--source SOURCE] "
+            "[--limit INT] [--refresh] [--metrics FILE] [--trace FILE]"
+        ),
+        formatter_class=formatter,
+    )
+    search_parser.add_argument(
+        "query",
+        metavar="QUERY",
+        type=str,
+        nargs="+",
+        help="symbol or words to look for, e.g. BTC or bitcoin",
+    )
+    search_parser.add_argument(
+        "-vvv",
+        "--verbose",
+        action="store_true",
+        help="show all log messages",
+    )
+    search_parser.add_argument(
+        "--source",
+        dest="sources",
+        metavar="SOURCE",
+        type=str,
+        choices=sources.by_id.keys(),
+        action="append",
+        default=[],
+        help="only search this source (repeatable)",
+    )
+    search_parser.add_argument(
+        "--limit",
+        dest="limit",
+        metavar="INT",
+        type=int,
+        default=20,
+        help="maximum number of results (default: 20)",
+    )
+    search_parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="download symbol lists again instead of using cached ones",
+    )
+    _add_run_io_args(search_parser, record=False)
+
     fetch_parser = subparsers.add_parser(
         "fetch",
         help="fetch prices",
         usage=(
             # Set usage manually to have positional arguments before options
             # and show allowed values where appropriate
-            "pricehist fetch SOURCE PAIR [-h] [-vvv] "
+            "pricehist fetch SOURCE PAIR [PAIR ...] [-h] [-vvv] "
             "[-t TYPE] [-s DATE | -sx DATE] [-e DATE | -ex DATE] "
-            f"[-o {'|'.join(outputs.by_type.keys())}] "
-            "[--invert] [--quantize INT] "
+            f"[-o {'|'.join(outputs.by_type.keys())}] [--output-file FILE] "
+            "[--merge] "
+            f"[--via SYM] [--resample {'|'.join(PERIODS.keys())}] "
+            f"[--aggregate {'|'.join(AGGREGATES)}] "
+            "[--invert] [--quantize INT] [--fixed] "
             "[--fmt-base SYM] [--fmt-quote SYM] [--fmt-time TIME] "
             "[--fmt-decimal CHAR] [--fmt-thousands CHAR] "
             "[--fmt-symbol rightspace|right|leftspace|left] [--fmt-datesep CHAR] "
-            "[--fmt-csvdelim CHAR] [--fmt-jsonnums]"
+            "[--fmt-csvdelim CHAR] [--fmt-jsonnums] "
+            "[--record DIR | --replay DIR] [--metrics FILE] [--trace FILE]"
         ),
         formatter_class=formatter,
     )
@@ -221,7 +524,8 @@ def build_parser():
         "pair",
         metavar="PAIR",
         type=valid_pair,
-        help="pair, usually BASE/QUOTE, e.g. BTC/USD",
+        nargs="+",
+        help="pair, usually BASE/QUOTE, e.g. BTC/USD (repeatable)",
     )
     fetch_parser.add_argument(
         "-vvv",
@@ -229,50 +533,7 @@ def build_parser():
         action="store_true",
         help="show all log messages",
     )
-    fetch_parser.add_argument(
-        "-t",
-        "--type",
-        dest="type",
-        metavar="TYPE",
-        type=str,
-        help="price type, e.g. close (default: first for source)",
-    )
-    fetch_start_group = fetch_parser.add_mutually_exclusive_group(required=False)
-    fetch_start_group.add_argument(
-        "-s",
-        "--start",
-        dest="start",
-        metavar="DATE",
-        type=valid_date,
-        help="start date, inclusive (default: source start)",
-    )
-    fetch_start_group.add_argument(
-        "-sx",
-        "--startx",
-        dest="start",
-        metavar="DATE",
-        type=valid_date_after,
-        help="start date, exclusive",
-    )
-
-    fetch_end_group = fetch_parser.add_mutually_exclusive_group(required=False)
-    fetch_end_group.add_argument(
-        "-e",
-        "--end",
-        dest="end",
-        metavar="DATE",
-        type=valid_date,
-        default=today(),
-        help="end date, inclusive (default: today)",
-    )
-    fetch_end_group.add_argument(
-        "-ex",
-        "--endx",
-        dest="end",
-        metavar="DATE",
-        type=valid_date_before,
-        help="end date, exclusive",
-    )
+    _add_range_args(fetch_parser)
 
     fetch_parser.add_argument(
         "-o",
@@ -284,6 +545,44 @@ def build_parser():
         default=outputs.default,
         help=f"output format (default: {outputs.default})",
     )
+    fetch_parser.add_argument(
+        "--output-file",
+        dest="output_file",
+        metavar="FILE",
+        type=str,
+        help="write output to a file instead of standard output",
+    )
+    fetch_parser.add_argument(
+        "--merge",
+        action="store_true",
+        help="order the prices of several pairs by date, then pair",
+    )
+    fetch_parser.add_argument(
+        "--via",
+        dest="via",
+        metavar="SYM",
+        type=str,
+        action="append",
+        default=[],
+        help="derive the pair via another symbol",
+    )
+    fetch_parser.add_argument(
+        "--resample",
+        dest="resample",
+        metavar="PERIOD",
+        type=str,
+        choices=PERIODS.keys(),
+        help="reduce to one price per week, month, quarter or year",
+    )
+    fetch_parser.add_argument(
+        "--aggregate",
+        dest="aggregate",
+        metavar="AGG",
+        type=str,
+        choices=AGGREGATES,
+        default="last",
+        help="price to keep for each resampled period (default: last)",
+    )
     fetch_parser.add_argument(
         "--invert",
         action="store_true",
@@ -296,6 +595,11 @@ def build_parser():
         type=int,
         help="round to the given number of decimal places",
     )
+    fetch_parser.add_argument(
+        "--fixed",
+        action="store_true",
+        help="derive and transform prices in fixed-point arithmetic",
+    )
     fetch_parser.add_argument(
         "--fmt-base",
         dest="formatbase",
@@ -360,4 +664,211 @@ def build_parser():
         help=f"numbers not strings for JSON output (default: {default_fmt.jsonnums})",
     )
 
+    _add_run_io_args(fetch_parser)
+
+    stats_parser = subparsers.add_parser(
+        "stats",
+        help="show statistics for fetched prices",
+        usage=(
+            "pricehist stats SOURCE PAIR [PAIR ...] [-h] [-vvv] "
+            "[-t TYPE] [-s DATE | -sx DATE] [-e DATE | -ex DATE] "
+            f"[-o {'|'.join(stats.FORMATS)}] [--window INT] "
+            "[--record DIR | --replay DIR] [--metrics FILE] [--trace FILE]"
+        ),
+        formatter_class=formatter,
+    )
+    stats_parser.add_argument(
+        "source",
+        metavar="SOURCE",
+        type=str,
+        choices=sources.by_id.keys(),
+        action=SetSourceDefaults,
+        help="the source identifier",
+    )
+    stats_parser.add_argument(
+        "pair",
+        metavar="PAIR",
+        type=valid_pair,
+        nargs="+",
+        help="pair, usually BASE/QUOTE, e.g. BTC/USD (repeatable)",
+    )
+    stats_parser.add_argument(
+        "-vvv",
+        "--verbose",
+        action="store_true",
+        help="show all log messages",
+    )
+    _add_range_args(stats_parser)
+    stats_parser.add_argument(
+        "-o",
+        "--output",
+        dest="output",
+        metavar="FMT",
+        type=str,
+        choices=stats.FORMATS,
+        default="csv",
+        help="output format (default: csv)",
+    )
+    stats_parser.add_argument(
+        "--window",
+        dest="window",
+        metavar="INT",
+        type=int,
+        default=20,
+        help="number of most recent prices for the last_window_* statistics "
+        "(default: 20)",
+    )
+    _add_run_io_args(stats_parser)
+
+    run_parser = subparsers.add_parser(
+        "run",
+        help="run the fetch jobs in a job file",
+        usage=(
+            "pricehist run JOBFILE [-h] [-vvv] [--workers INT] "
+            "[--record DIR | --replay DIR] [--metrics FILE] [--trace FILE]"
+        ),
+        formatter_class=formatter,
+    )
+    run_parser.add_argument(
+        "jobfile",
+        metavar="JOBFILE",
+        type=str,
+        help="a TOML file listing fetch jobs",
+    )
+    run_parser.add_argument(
+        "-vvv",
+        "--verbose",
+        action="store_true",
+        help="show all log messages",
+    )
+    run_parser.add_argument(
+        "--workers",
+        dest="workers",
+        metavar="INT",
+        type=int,
+        default=8,
+        help="maximum number of fetches and jobs to run at once (default: 8)",
+    )
+    _add_run_io_args(run_parser)
+
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help="keep the outputs of a job file up to date",
+        usage=(
+            "pricehist watch JOBFILE [-h] [-vvv] [--workers INT] "
+            "[--interval MINUTES]"
+        ),
+        formatter_class=formatter,
+    )
+    watch_parser.add_argument(
+        "jobfile",
+        metavar="JOBFILE",
+        type=str,
+        help="a TOML file listing fetch jobs, each with an output file",
+    )
+    watch_parser.add_argument(
+        "-vvv",
+        "--verbose",
+        action="store_true",
+        help="show all log messages",
+    )
+    watch_parser.add_argument(
+        "--workers",
+        dest="workers",
+        metavar="INT",
+        type=int,
+        default=8,
+        help="maximum number of fetches and jobs to run at once (default: 8)",
+    )
+    watch_parser.add_argument(
+        "--interval",
+        dest="interval",
+        metavar="MINUTES",
+        type=int,
+        default=360,
+        help="polling interval for sources without a schedule (default: 360)",
+    )
+
+    lookup_parser = subparsers.add_parser(
+        "lookup",
+        help="look up prices in an archive",
+        usage="pricehist lookup ARCHIVE DATE [DATE ...] [-h] [-vvv]",
+        formatter_class=formatter,
+    )
+    lookup_parser.add_argument(
+        "archive",
+        metavar="ARCHIVE",
+        type=str,
+        help="an archive file written with the archive output format",
+    )
+    lookup_parser.add_argument(
+        "dates",
+        metavar="DATE",
+        type=valid_date,
+        nargs="+",
+        help="find the price on or most recently before this date",
+    )
+    lookup_parser.add_argument(
+        "-vvv",
+        "--verbose",
+        action="store_true",
+        help="show all log messages",
+    )
+
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="serve prices over HTTP",
+        usage=(
+            "pricehist serve [-h] [-vvv] [--host HOST] [--port PORT | --socket PATH] "
+            "[--cache-size INT] [--cache-ttl SECONDS]"
+        ),
+        formatter_class=formatter,
+    )
+    serve_parser.add_argument(
+        "-vvv",
+        "--verbose",
+        action="store_true",
+        help="show all log messages",
+    )
+    serve_parser.add_argument(
+        "--host",
+        dest="host",
+        metavar="HOST",
+        type=str,
+        default="127.0.0.1",
+        help="address to listen on (default: 127.0.0.1)",
+    )
+    serve_listen_group = serve_parser.add_mutually_exclusive_group(required=False)
+    serve_listen_group.add_argument(
+        "--port",
+        dest="port",
+        metavar="PORT",
+        type=int,
+        default=8080,
+        help="port to listen on (default: 8080)",
+    )
+    serve_listen_group.add_argument(
+        "--socket",
+        dest="socket",
+        metavar="PATH",
+        type=str,
+        help="listen on a Unix socket instead of a port",
+    )
+    serve_parser.add_argument(
+        "--cache-size",
+        dest="cache_size",
+        metavar="INT",
+        type=int,
+        default=1000,
+        help="maximum number of series to cache (default: 1000)",
+    )
+    serve_parser.add_argument(
+        "--cache-ttl",
+        dest="cache_ttl",
+        metavar="SECONDS",
+        type=int,
+        default=3600,
+        help="seconds to keep each cached series (default: 3600)",
+    )
+
     return parser
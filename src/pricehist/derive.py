@@ -0,0 +1,110 @@
+"""
+Derived pairs
+
+Some sources only quote prices against a single currency, such as the ECB with
+EUR or the Bank of Canada with CAD. Prices for other pairs can be derived from
+those by chaining series together through the common symbol. For example,
+USD/JPY is EUR/USD inverted, then crossed with EUR/JPY. Prices are only given
+for dates that all of the underlying series have in common.
+
+Functions:
+
+    chain
+    cross
+    fetch
+
+"""
+
+from collections import deque
+from dataclasses import replace
+from functools import reduce
+
+from pricehist import exceptions
+from pricehist.fixed import FixedSeries
+from pricehist.series import Series
+
+
+def chain(legs):
+    """Cross a sequence of series, each quoted in the next one's base.
+
+    The legs may be Series or FixedSeries, and the result is of the same kind.
+    """
+    return reduce(lambda a, b: a.cross(b), legs)
+
+
+def cross(available, base, quote):
+    """Derive BASE/QUOTE from already-fetched series.
+
+    Each available series can be used as it is or inverted. The shortest
+    chain of series from the base to the quote is used.
+    """
+    edges = {}
+    for series in available:
+        edges.setdefault(series.base, []).append((series.quote, series, False))
+        edges.setdefault(series.quote, []).append((series.base, series, True))
+
+    paths = {base: []}
+    queue = deque([base])
+    while queue and quote not in paths:
+        symbol = queue.popleft()
+        for neighbour, series, inverted in edges.get(symbol, []):
+            if neighbour not in paths:
+                leg = series.invert() if inverted else series
+                paths[neighbour] = paths[symbol] + [leg]
+                queue.append(neighbour)
+
+    if not paths.get(quote):
+        raise ValueError(f"No way to derive {base}/{quote} from the given series.")
+    return chain(paths[quote])
+
+
+def fetch(series, source, via, fixed=False):
+    """Fetch BASE/QUOTE from the source by way of the given symbols.
+
+    The legs are fetched together, so a source that can answer several pairs
+    from one response only needs one request. Each leg is fetched as it is or,
+    if the source doesn't have it, as the inverse pair, which is then inverted.
+    With fixed, the legs are inverted and crossed as FixedSeries.
+    """
+    symbols = [series.base, *via, series.quote]
+    legs = [
+        replace(series, base=a, quote=b, prices=[])
+        for a, b in zip(symbols, symbols[1:])
+    ]
+    inverted = [False] * len(legs)
+    errors = {}
+
+    while True:
+        requested = [_inverse(leg) if inv else leg for leg, inv in zip(legs, inverted)]
+        try:
+            fetched = source.fetch_many(requested)
+            break
+        except exceptions.InvalidPair as e:
+            pairs = [(r.base, r.quote) for r in requested]
+            if (e.base, e.quote) not in pairs:
+                raise
+            i = pairs.index((e.base, e.quote))
+            if inverted[i]:
+                raise errors[i]
+            inverted[i] = True
+            errors[i] = e
+
+    if fixed:
+        fetched = [FixedSeries.from_series(leg) for leg in fetched]
+    derived = chain(
+        [leg.invert() if inv else leg for leg, inv in zip(fetched, inverted)]
+    )
+    if fixed:
+        derived = derived.to_series()
+    return Series(
+        series.base,
+        series.quote,
+        series.type,
+        series.start,
+        series.end,
+        derived.prices,
+    )
+
+
+def _inverse(series):
+    return replace(series, base=series.quote, quote=series.base)
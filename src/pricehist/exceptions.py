@@ -2,17 +2,30 @@ import logging
 import sys
 from contextlib import contextmanager
 
+from pricehist import metrics
+
 
 @contextmanager
 def handler():
     try:
         yield
     except SourceError as e:
+        count(e)
         logging.debug("Critical exception encountered", exc_info=e)
         logging.critical(str(e))
         sys.exit(1)
 
 
+def count(error):
+    """Count a source error in the metrics, once it has failed an operation.
+
+    Errors that are handled internally, such as an invalid pair that is
+    fetched as its inverse instead, aren't counted.
+    """
+    source = getattr(error, "source", None)
+    metrics.record_error(error, str(source.id()) if source else None)
+
+
 class SourceError(Exception):
     """Base exception for errors rased by sources"""
 
@@ -40,6 +53,7 @@ class InvalidType(SourceError, ValueError):
 
     def __init__(self, type, base, quote, source):
         self.type = type
+        self.source = source
         self.pair = "/".join([s for s in [base, quote] if s])
         message = (
             f"Invalid price type '{type}' for pair '{self.pair}'. "
@@ -1,28 +1,175 @@
+import dataclasses
 import logging
+import os
 from datetime import date, datetime, timedelta
 
-from pricehist import exceptions
+from pricehist import derive, exceptions, trace
+from pricehist.fixed import FixedSeries
 
 
-def fetch(series, source, output, invert: bool, quantize: int, fmt) -> str:
+def fetch(
+    series,
+    source,
+    output,
+    invert: bool,
+    quantize: int,
+    fmt,
+    via=(),
+    resample=None,
+    aggregate="last",
+    path=None,
+    file=None,
+    fixed=False,
+) -> str:
+    with trace.span("fetch", **_attributes(series, source)):
+        _check_start(series, source)
+
+        streaming = not via and not resample and (path or file is not None)
+        if output.streaming and streaming:
+            _stream(series, source, output, invert, quantize, fmt, path, file, fixed)
+            return None
+
+        with exceptions.handler(), trace.span("source") as span:
+            if via:
+                series = derive.fetch(series, source, via, fixed)
+            else:
+                series = source.fetch(series)
+            span.set(rows=len(series.prices))
+
+        _report_coverage(series)
+        series = _transform(series, invert, quantize, resample, aggregate, fixed)
+
+        with trace.span("output", output=type(output).__name__) as span:
+            span.set(rows=len(series.prices))
+            if path:
+                output.write(series, source, fmt, path)
+                return None
+
+            result = output.format(series, source, fmt=fmt)
+            if file is not None:
+                file.write(result)
+                return None
+
+            return result
+
+
+def fetch_many(
+    series_list,
+    source,
+    output,
+    invert: bool,
+    quantize: int,
+    fmt,
+    via=(),
+    resample=None,
+    aggregate="last",
+    path=None,
+    merge=False,
+    fixed=False,
+) -> str:
+    pairs = ", ".join(_pair(series) for series in series_list)
+    with trace.span("fetch_many", source=source.id(), pairs=pairs):
+        results = fetch_series(series_list, source, via, fixed)
+        results = [
+            _transform(series, invert, quantize, resample, aggregate, fixed)
+            for series in results
+        ]
+
+        with trace.span("output", output=type(output).__name__) as span:
+            span.set(rows=sum(len(series.prices) for series in results))
+            if path and merge:
+                output.write_merged(results, source, fmt, path)
+                return None
+            elif path:
+                output.write_many(results, source, fmt, path)
+                return None
+            elif merge:
+                return output.format_merged(results, source, fmt=fmt)
+
+            return output.format_many(results, source, fmt=fmt)
+
+
+def fetch_series(series_list, source, via=(), fixed=False):
+    """Fetch the series from the source, untransformed.
+
+    Warnings are logged for series that start before the source does, and for
+    any part of each series' interval that the fetched prices don't cover.
+    """
+    for series in series_list:
+        _check_start(series, source)
+
+    with exceptions.handler(), trace.span("source") as span:
+        if via:
+            results = [derive.fetch(s, source, via, fixed) for s in series_list]
+        else:
+            results = source.fetch_many(series_list)
+        span.set(rows=sum(len(series.prices) for series in results))
+
+    for series in results:
+        _report_coverage(series, f"{series.base}/{series.quote}: ")
+    return results
+
+
+def _stream(series, source, output, invert, quantize, fmt, path, file, fixed):
+    # Each chunk is transformed and written as soon as the source yields it.
+    covered = {}
+    rows = 0
+
+    def chunks():
+        nonlocal rows
+        for chunk in source.stream(series):
+            last = covered.get("last")
+            prices = [p for p in chunk.prices if last is None or p.date > last.date]
+            if prices:
+                covered.setdefault("first", prices[0])
+                covered["last"] = prices[-1]
+            rows += len(prices)
+            chunk = dataclasses.replace(chunk, prices=prices)
+            yield _transform(chunk, invert, quantize, None, None, fixed)
+
+    output_name = type(output).__name__
+    with exceptions.handler(), trace.span("stream", output=output_name) as span:
+        if path:
+            # The file is only replaced once the whole stream has succeeded.
+            partial = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(partial, "w", encoding="utf-8") as f:
+                    _write(output.stream(chunks(), source, fmt), f)
+                os.replace(partial, path)
+            finally:
+                if os.path.exists(partial):
+                    os.remove(partial)
+        else:
+            _write(output.stream(chunks(), source, fmt), file)
+        span.set(rows=rows)
+
+    _report_coverage(dataclasses.replace(series, prices=list(covered.values())))
+
+
+def _write(texts, file):
+    for text in texts:
+        file.write(text)
+        file.flush()
+
+
+def _check_start(series, source):
     if series.start < source.start():
         logging.warning(
             f"The start date {series.start} preceeds the {source.name()} "
             f"source start date of {source.start()}."
         )
 
-    with exceptions.handler():
-        series = source.fetch(series)
 
+def _report_coverage(series, prefix=""):
     if len(series.prices) == 0:
         logging.warning(
-            f"No data found for the interval [{series.start}--{series.end}]."
+            f"{prefix}No data found for the interval [{series.start}--{series.end}]."
         )
     else:
         first = series.prices[0].date
         last = series.prices[-1].date
         message = (
-            f"Available data covers the interval [{first}--{last}], "
+            f"{prefix}Available data covers the interval [{first}--{last}], "
             f"{_cov_description(series.start, series.end, first, last)}."
         )
         if first > series.start or last < series.end:
@@ -34,12 +181,45 @@ def fetch(series, source, output, invert: bool, quantize: int, fmt) -> str:
         else:
             logging.debug(message)
 
+
+def _transform(series, invert, quantize, resample, aggregate, fixed=False):
+    if fixed and (resample or invert or quantize is not None):
+        # The transformations are done in integer arithmetic, which only pays
+        # off for large series, so it's left to the user to choose.
+        series = FixedSeries.from_series(series)
+    if resample:
+        with trace.span("resample", period=resample, aggregate=aggregate) as span:
+            series = series.resample(resample, aggregate)
+            span.set(rows=_rows(series))
     if invert:
-        series = series.invert()
+        with trace.span("invert", rows=_rows(series)):
+            series = series.invert()
     if quantize is not None:
-        series = series.quantize(quantize)
+        with trace.span("quantize", places=quantize, rows=_rows(series)):
+            series = series.quantize(quantize)
+    if isinstance(series, FixedSeries):
+        series = series.to_series()
+    return series
+
+
+def _rows(series):
+    if isinstance(series, FixedSeries):
+        return len(series.dates)
+    return len(series.prices)
+
+
+def _attributes(series, source):
+    return {
+        "source": source.id(),
+        "pair": _pair(series),
+        "type": series.type,
+        "start": series.start,
+        "end": series.end,
+    }
+
 
-    return output.format(series, source, fmt=fmt)
+def _pair(series):
+    return "/".join(s for s in [series.base, series.quote] if s)
 
 
 def _today():
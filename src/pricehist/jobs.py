@@ -0,0 +1,495 @@
+"""
+Job files
+
+A job file is a TOML document that lists fetch jobs, each with the same details
+as a fetch command::
+
+    [defaults]
+    start = "2021-01-01"
+    output = "ledger"
+
+    [[jobs]]
+    name = "euro"
+    source = "ecb"
+    pairs = ["EUR/AUD", "EUR/USD"]
+    output-file = "prices/euro.ledger"
+    fmt = { decimal = ",", thousands = "." }
+
+    [[jobs]]
+    source = "ecb"
+    pairs = ["AUD/USD"]
+    via = ["EUR"]
+    quantize = 4
+
+Each job needs a ``source`` and a list of ``pairs``. The optional keys are
+``name``, ``type``, ``start``, ``end``, ``via``, ``resample``, ``aggregate``,
+``invert``, ``quantize``, ``fixed``, ``output``, ``output-file`` and ``fmt``,
+which holds the fields of :class:`pricehist.format.Format`. Values in
+``[defaults]`` apply to every job that doesn't set them.
+
+Jobs are run as a dependency graph. The prices that jobs need are gathered
+into fetches first, so that each is downloaded only once: pairs of a source
+that can answer several pairs from one response, such as the ECB, are fetched
+together, wildcard pairs included, over the combined date range of the jobs
+that need them, and any other pair is fetched once for all of the jobs that
+need it. Each job then
+runs as soon as its fetches are done, deriving, transforming and formatting
+its prices from the fetched series.
+
+Fetches from different sources run in parallel, with at most
+:data:`SOURCE_CONCURRENCY` at a time for any one source.
+
+Classes:
+
+    Job
+
+Functions:
+
+    load
+    parse
+    run
+
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, fields
+from datetime import date, datetime
+from functools import partial
+from typing import List
+
+from pricehist import exceptions, outputs, sources, trace
+from pricehist.fetch import fetch_many
+from pricehist.format import Format
+from pricehist.outputs.baseoutput import BaseOutput
+from pricehist.series import AGGREGATES, PERIODS, Series
+from pricehist.sources.basesource import BaseSource
+
+try:
+    import tomllib
+except ImportError:  # pragma: nocover
+    import tomli as tomllib
+
+SOURCE_CONCURRENCY = 2
+
+KEYS = [
+    "name",
+    "source",
+    "pairs",
+    "type",
+    "start",
+    "end",
+    "via",
+    "resample",
+    "aggregate",
+    "invert",
+    "quantize",
+    "fixed",
+    "output",
+    "output-file",
+    "fmt",
+]
+
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    source: BaseSource
+    series_list: List[Series]
+    output: BaseOutput
+    fmt: Format = Format()
+    via: List[str] = ()
+    resample: str = None
+    aggregate: str = "last"
+    invert: bool = False
+    quantize: int = None
+    fixed: bool = False
+    path: str = None
+    append: bool = False
+
+
+def load(path) -> List[Job]:
+    with open(path, "rb") as f:
+        try:
+            data = tomllib.load(f)
+        except tomllib.TOMLDecodeError as e:
+            raise ValueError(f"Invalid job file '{path}': {e}")
+    return parse(data)
+
+
+def parse(data) -> List[Job]:
+    unknown = set(data) - {"defaults", "jobs"}
+    if unknown:
+        raise ValueError(f"Unknown job file key '{sorted(unknown)[0]}'.")
+    defaults = data.get("defaults", {})
+    if not data.get("jobs"):
+        raise ValueError("The job file has no jobs.")
+
+    jobs = []
+    for number, spec in enumerate(data["jobs"], 1):
+        name = str(spec.get("name", f"job {number}"))
+        try:
+            fmt = {**defaults.get("fmt", {}), **spec.get("fmt", {})}
+            jobs.append(_job(name, {**defaults, **spec, "fmt": fmt}))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Job '{name}': {e}")
+
+    names = [job.name for job in jobs]
+    duplicates = {n for n in names if names.count(n) > 1}
+    if duplicates:
+        raise ValueError(f"More than one job is named '{sorted(duplicates)[0]}'.")
+    return jobs
+
+
+def run(jobs, workers=8):
+    """Run the jobs and return (outputs, succeeded).
+
+    The outputs are in the order of the jobs, with None for jobs that wrote
+    to a file or failed. Failures are logged and don't stop jobs that don't
+    depend on the failed fetch.
+    """
+    results = execute(jobs, workers)
+    outputs = [results[job.name][0] if job.name in results else None for job in jobs]
+    return outputs, len(results) == len(jobs)
+
+
+def execute(jobs, workers=8):
+    """Run the jobs and return {name: (output, series_list)} for those that succeed.
+
+    The series are those that were formatted or written, after any
+    transformations, in the order of the job's pairs.
+    """
+    fetches, needs = _plan(jobs)
+    limits = defaultdict(lambda: threading.Semaphore(SOURCE_CONCURRENCY))
+
+    tasks = {}
+    for key, requests in fetches.items():
+        source = sources.by_id[key[0]]
+        prefetch = partial(_prefetch, source, key[1], requests, limits[key[0]])
+        tasks[key] = (prefetch, [], f"Fetching from {source.id()}")
+    for job in jobs:
+        deps = list(dict.fromkeys(key for key, _, _ in needs[job.name]))
+        run_job = partial(_run, job, needs[job.name])
+        tasks[job.name] = (run_job, deps, f"Job '{job.name}'")
+
+    results = _execute(tasks, workers)
+    return {job.name: results[job.name] for job in jobs if job.name in results}
+
+
+def _job(name, spec):
+    unknown = set(spec) - set(KEYS)
+    if unknown:
+        raise ValueError(f"Unknown key '{sorted(unknown)[0]}'.")
+
+    if "source" not in spec:
+        raise ValueError("No source given.")
+    if spec["source"] not in sources.by_id:
+        raise ValueError(f"Unknown source '{spec['source']}'.")
+    source = sources.by_id[spec["source"]]
+
+    type = spec.get("type", source.types()[0])
+    if type not in source.types():
+        raise ValueError(
+            f"The price type '{type}' is not recognized by the {source.id()} source."
+        )
+
+    start = _date(spec.get("start", source.start()))
+    end = _date(spec.get("end", "today"))
+    if end < start:
+        raise ValueError(f"The end date '{end}' preceeds the start date '{start}'.")
+
+    pairs = spec.get("pairs", [])
+    if isinstance(pairs, str):
+        pairs = [pairs]
+    if not pairs:
+        raise ValueError("No pairs given.")
+    series_list = []
+    for pair in pairs:
+        base, quote = (str(pair) + "/").split("/")[0:2]
+        if base == "":
+            raise ValueError(f"No base found in the pair '{pair}'.")
+        series_list.append(
+            Series(
+                base=source.normalizesymbol(base),
+                quote=source.normalizesymbol(quote),
+                type=type,
+                start=start,
+                end=end,
+            )
+        )
+
+    via = [source.normalizesymbol(s) for s in spec.get("via", [])]
+    wildcard = any("*" in (s.base, s.quote) for s in series_list)
+    if via and wildcard:
+        raise ValueError("Wildcard pairs can't be derived via other symbols.")
+
+    resample = spec.get("resample")
+    if resample is not None and resample not in PERIODS:
+        raise ValueError(f"Unknown resample period '{resample}'.")
+    aggregate = spec.get("aggregate", "last")
+    if aggregate not in AGGREGATES:
+        raise ValueError(f"Unknown aggregate '{aggregate}'.")
+
+    output_type = spec.get("output", outputs.default)
+    if output_type not in outputs.by_type:
+        raise ValueError(f"Unknown output format '{output_type}'.")
+    output = outputs.by_type[output_type]
+    path = spec.get("output-file")
+    if (len(series_list) > 1 or wildcard) and not output.multiple:
+        raise ValueError(f"The {output_type} output can only hold a single pair.")
+    if output.missing_dependency():
+        raise ValueError(
+            f"The {output_type} output requires the "
+            f"{output.missing_dependency()} package, which is not installed."
+        )
+    if (output.file_only or output.binary) and not path:
+        raise ValueError(
+            f"The {output_type} output can only be written to a file. "
+            "Set output-file."
+        )
+
+    fmt_fields = {f.name for f in fields(Format)}
+    unknown = set(spec["fmt"]) - fmt_fields
+    if unknown:
+        raise ValueError(f"Unknown fmt key '{sorted(unknown)[0]}'.")
+
+    return Job(
+        name=name,
+        source=source,
+        series_list=series_list,
+        output=output,
+        fmt=Format(**spec["fmt"]),
+        via=via,
+        resample=resample,
+        aggregate=aggregate,
+        invert=bool(spec.get("invert", False)),
+        quantize=None if spec.get("quantize") is None else int(spec["quantize"]),
+        fixed=bool(spec.get("fixed", False)),
+        path=None if path is None else str(path),
+    )
+
+
+def _date(value):
+    if isinstance(value, date):  # TOML has its own date values.
+        return value.isoformat()
+    if value == "today":
+        return date.today().isoformat()
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date().isoformat()
+    except (TypeError, ValueError):
+        raise ValueError(f"Not a valid YYYY-MM-DD date: '{value}'.")
+
+
+def _plan(jobs):
+    """Gather the series the jobs need into fetches.
+
+    Returns the requests of each fetch, as {(base, quote): [start, end,
+    invertible]}, and what each job needs, as (fetch key, base, quote) for
+    each pair or leg. Legs of derived pairs are invertible: if the source
+    doesn't have one, its inverse is fetched instead.
+    """
+    fetches = {}
+    needs = {}
+    for job in jobs:
+        source = job.source
+        batches = type(source).fetch_many is not BaseSource.fetch_many
+        invertible = bool(job.via)
+        needs[job.name] = []
+        for series in job.series_list:
+            symbols = [series.base, *job.via, series.quote]
+            for base, quote in zip(symbols, symbols[1:]):
+                key = (source.id(), series.type)
+                if not batches:
+                    key += (base, quote)
+                needs[job.name].append((key, base, quote))
+
+                requests = fetches.setdefault(key, {})
+                request = requests.setdefault(
+                    (base, quote), [series.start, series.end, invertible]
+                )
+                request[0] = min(request[0], series.start)
+                request[1] = max(request[1], series.end)
+                request[2] = request[2] and invertible
+
+    for requests in fetches.values():
+        _cover_wildcards(requests)
+    return fetches, needs
+
+
+def _cover_wildcards(requests):
+    # Batching sources leave pairs requested explicitly out of a wildcard's
+    # results, so those pairs must also cover the dates the wildcard needs.
+    for (base, quote), (start, end, _) in list(requests.items()):
+        if "*" not in (base, quote):
+            continue
+        for pair, request in requests.items():
+            if "*" not in pair and base in ("*", pair[0]) and quote in ("*", pair[1]):
+                request[0] = min(request[0], start)
+                request[1] = max(request[1], end)
+
+
+def _prefetch(source, type, requests, limit):
+    pending = {pair: list(request) for pair, request in requests.items()}
+    failed = {}
+    pairs = ", ".join("/".join(s for s in pair if s) for pair in pending)
+    with limit, trace.span("prefetch", source=source.id(), pairs=pairs) as span:
+        while pending:
+            requested = [
+                Series(base, quote, type, start, end)
+                for (base, quote), (start, end, _) in pending.items()
+            ]
+            try:
+                results = source.fetch_many(requested)
+                break
+            except exceptions.InvalidPair as e:
+                pair = (e.base, e.quote)
+                if pair not in pending:
+                    raise
+                failed[pair] = e
+                start, end, invertible = pending.pop(pair)
+                inverse = (pair[1], pair[0])
+                if not invertible or inverse in failed:
+                    continue
+                if inverse in pending:
+                    pending[inverse][0] = min(pending[inverse][0], start)
+                    pending[inverse][1] = max(pending[inverse][1], end)
+                else:
+                    pending[inverse] = [start, end, False]
+                _cover_wildcards(pending)
+        else:  # Every pair failed.
+            results = []
+        span.set(rows=sum(len(series.prices) for series in results))
+    for pair, e in failed.items():
+        logging.debug(f"Couldn't fetch {'/'.join(pair)} from {source.id()}: {e}")
+    return results, failed
+
+
+def _run(job, needs, *fetched):
+    available = [series for results, _ in fetched for series in results]
+    pairs = {(series.base, series.quote) for series in available}
+    failed = {pair: e for _, errors in fetched for pair, e in errors.items()}
+    for _, base, quote in needs:
+        if "*" in (base, quote):
+            continue
+        if (base, quote) not in pairs and not (job.via and (quote, base) in pairs):
+            raise failed.get((base, quote)) or exceptions.InvalidPair(
+                base, quote, job.source
+            )
+
+    output = _Written(job.output, job.append)
+    result = fetch_many(
+        job.series_list,
+        _Prefetched(job.source, available),
+        output,
+        job.invert,
+        job.quantize,
+        job.fmt,
+        via=job.via,
+        resample=job.resample,
+        aggregate=job.aggregate,
+        path=job.path,
+        fixed=job.fixed,
+    )
+    return result, output.series_list
+
+
+def _execute(tasks, workers):
+    """Run tasks once the tasks they depend on have succeeded.
+
+    Each task is (function, dependencies, description). The function is called
+    with the results of its dependencies. Returns the results of the tasks
+    that succeeded.
+    """
+    results = {}
+    failed = set()
+    waiting = dict(tasks)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while waiting or running:
+            for key, (function, deps, description) in list(waiting.items()):
+                if any(dep in failed for dep in deps):
+                    logging.warning(f"{description} skipped after an earlier failure.")
+                    failed.add(key)
+                    del waiting[key]
+                elif all(dep in results for dep in deps):
+                    args = [results[dep] for dep in deps]
+                    running[executor.submit(_counted, function, *args)] = key
+                    del waiting[key]
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = running.pop(future)
+                try:
+                    results[key] = future.result()
+                except SystemExit:
+                    failed.add(key)  # Already logged by exceptions.handler().
+                except Exception as e:
+                    logging.debug("Critical exception encountered", exc_info=e)
+                    logging.critical(f"{tasks[key][2]} failed: {e}")
+                    failed.add(key)
+    return results
+
+
+def _counted(function, *args):
+    # Counts source errors that fail a task in the thread that made its
+    # requests, so that they are attributed to the right source.
+    try:
+        return function(*args)
+    except exceptions.SourceError as e:
+        exceptions.count(e)
+        raise
+
+
+class _Prefetched:
+    # Stands in for a source, answering requests from already fetched series.
+
+    def __init__(self, source, available):
+        self._source = source
+        self._available = available
+
+    def __getattr__(self, name):
+        return getattr(self._source, name)
+
+    def fetch_many(self, series_list):
+        results = []
+        for request in series_list:
+            matches = [
+                series
+                for series in self._available
+                if series.type == request.type
+                and request.base in ("*", series.base)
+                and request.quote in ("*", series.quote)
+            ]
+            if not matches:
+                raise exceptions.InvalidPair(request.base, request.quote, self)
+            if "*" not in (request.base, request.quote):
+                matches = matches[0:1]
+            results += [s.slice(request.start, request.end) for s in matches]
+        return results
+
+
+class _Written:
+    # Stands in for an output, keeping the series it was given and appending
+    # them to the output file rather than replacing it if requested.
+
+    def __init__(self, output, append):
+        self._output = output
+        self._append = append
+        self.series_list = []
+
+    def __getattr__(self, name):
+        return getattr(self._output, name)
+
+    def format_many(self, series_list, source, fmt):
+        self.series_list = series_list
+        return self._output.format_many(series_list, source, fmt=fmt)
+
+    def write_many(self, series_list, source, fmt, path):
+        self.series_list = series_list
+        if self._append:
+            self._output.append_many(series_list, source, fmt, path)
+        else:
+            self._output.write_many(series_list, source, fmt, path)
@@ -0,0 +1,36 @@
+"""
+JSON parsing for source responses
+
+Source responses can contain thousands of numbers, of which only one column is
+usually needed. Rather than converting every number to a ``Decimal`` while
+parsing, floats are left as their original text and sources convert only the
+values they select, with ``Decimal(text)``. This keeps the exact values given
+by the source.
+
+When a response gives all of its decimal amounts as JSON strings, as the Alpha
+Vantage and Bank of Canada APIs do, the `orjson <https://github.com/ijl/orjson>`_
+package is used if it is installed. It is much faster than the standard
+library, but it parses floats to binary, so it is not used for other responses.
+
+Functions:
+
+    loads
+
+"""
+
+import json
+
+from pricehist import metrics, trace
+
+try:
+    import orjson
+except ImportError:  # pragma: nocover
+    orjson = None
+
+
+def loads(content, amounts_are_strings=False):
+    with metrics.parsing(), trace.span("parse", format="json"):
+        if amounts_are_strings and orjson is not None:
+            return orjson.loads(content)
+        else:
+            return json.loads(content, parse_float=str)
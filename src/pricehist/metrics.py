@@ -0,0 +1,216 @@
+"""
+Metrics for source interactions
+
+Counters and latency histograms are kept for each source and endpoint, so
+that slow or failing sources can be identified. The endpoint is the path of
+the requested URL, with any segment that contains a symbol replaced by ``*``.
+
+The metrics are:
+
+* ``pricehist_requests_total``: requests sent, by HTTP status code.
+* ``pricehist_response_bytes_total``: bytes of response content received.
+* ``pricehist_request_seconds``: time until each response was received.
+* ``pricehist_parse_seconds``: time spent parsing response content.
+* ``pricehist_errors_total``: source errors that failed an operation, by
+  exception class.
+
+Sources record their requests via :meth:`BaseSource.http_get` and
+:meth:`BaseSource.log_curl`, and parsing via :func:`parsing`. Errors are
+counted via :func:`pricehist.exceptions.count` when a
+:class:`pricehist.exceptions.SourceError` fails a command, job or server
+request, rather than when it is raised, so that errors that are recovered from
+aren't counted. Errors that don't name their source are attributed to the
+source that most recently made a request in the same thread.
+
+The metrics can be written in the Prometheus text exposition format, suitable
+for the node exporter's textfile collector, or as JSON.
+
+Functions:
+
+    begin
+    record_response
+    record_error
+    parsing
+    reset
+    snapshot
+    format_prometheus
+    format_json
+    write
+
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PARSE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+
+METRICS = {
+    "pricehist_requests_total": ("counter", "Requests sent to sources.", None),
+    "pricehist_response_bytes_total": (
+        "counter",
+        "Bytes of response content received from sources.",
+        None,
+    ),
+    "pricehist_request_seconds": (
+        "histogram",
+        "Time until a response was received from a source.",
+        LATENCY_BUCKETS,
+    ),
+    "pricehist_parse_seconds": (
+        "histogram",
+        "Time spent parsing source responses.",
+        PARSE_BUCKETS,
+    ),
+    "pricehist_errors_total": ("counter", "Source errors that failed.", None),
+}
+
+_lock = threading.Lock()
+_values = {}
+_context = threading.local()
+
+
+def begin(source_id, url):
+    """Note the source and endpoint of a request that is about to be made."""
+    _context.labels = (("source", source_id), ("endpoint", _endpoint(url)))
+
+
+def record_response(source_id, response):
+    labels = (("source", source_id), ("endpoint", _endpoint(response.request.url)))
+    _context.labels = labels
+    status = (("status", str(response.status_code)),)
+    _inc("pricehist_requests_total", labels + status)
+    _inc("pricehist_response_bytes_total", labels, len(response.content))
+    _observe("pricehist_request_seconds", labels, response.elapsed.total_seconds())
+
+
+def record_error(error, source_id=None):
+    if source_id is None:
+        labels = getattr(_context, "labels", (("source", ""),))[0:1]
+    else:
+        labels = (("source", source_id),)
+    _inc("pricehist_errors_total", labels + (("type", type(error).__name__),))
+
+
+@contextmanager
+def parsing():
+    """Time the enclosed parsing of the most recent response in this thread."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        labels = getattr(_context, "labels", (("source", ""), ("endpoint", "")))
+        _observe("pricehist_parse_seconds", labels, time.perf_counter() - start)
+
+
+def reset():
+    with _lock:
+        _values.clear()
+
+
+def snapshot():
+    """Return {name: {labels: value}}, where histogram values are dicts."""
+    with _lock:
+        return {
+            name: {
+                labels: (
+                    dict(value, buckets=list(value["buckets"]))
+                    if isinstance(value, dict)
+                    else value
+                )
+                for labels, value in series.items()
+            }
+            for name, series in _values.items()
+        }
+
+
+def format_prometheus():
+    lines = []
+    for name, series in sorted(snapshot().items()):
+        type, help, buckets = METRICS[name]
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {type}")
+        for labels, value in sorted(series.items()):
+            if type == "counter":
+                lines.append(f"{name}{_labels(labels)} {_num(value)}")
+                continue
+            for le, count in zip(buckets + ("+Inf",), value["buckets"]):
+                le_label = (("le", _num(le) if le != "+Inf" else le),)
+                lines.append(f"{name}_bucket{_labels(labels + le_label)} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {_num(value['sum'])}")
+            lines.append(f"{name}_count{_labels(labels)} {value['count']}")
+    return "".join(f"{line}\n" for line in lines)
+
+
+def format_json():
+    data = {}
+    for name, series in sorted(snapshot().items()):
+        type, help, buckets = METRICS[name]
+        items = []
+        for labels, value in sorted(series.items()):
+            item = {"labels": dict(labels)}
+            if type == "counter":
+                item["value"] = value
+            else:
+                item["buckets"] = dict(
+                    zip([_num(b) for b in buckets] + ["+Inf"], value["buckets"])
+                )
+                item["sum"] = value["sum"]
+                item["count"] = value["count"]
+            items.append(item)
+        data[name] = {"type": type, "help": help, "series": items}
+    return json.dumps(data, indent=2) + "\n"
+
+
+def write(path):
+    """Write the metrics to a file, as JSON if it ends in .json.
+
+    The file is replaced in one step, so that a collector never reads a
+    partially written file.
+    """
+    text = format_json() if path.endswith(".json") else format_prometheus()
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(partial, path)
+
+
+def _inc(name, labels, amount=1):
+    with _lock:
+        series = _values.setdefault(name, {})
+        series[labels] = series.get(labels, 0) + amount
+
+
+def _observe(name, labels, value):
+    buckets = METRICS[name][2]
+    with _lock:
+        series = _values.setdefault(name, {})
+        if labels not in series:
+            series[labels] = {"buckets": [0] * (len(buckets) + 1), "sum": 0, "count": 0}
+        histogram = series[labels]
+        for i, bound in enumerate(buckets + (float("inf"),)):
+            if value <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+
+def _endpoint(url):
+    segments = urlsplit(url).path.split("/")
+    return "/".join("*" if re.search("[A-Z]", s) else s for s in segments)
+
+
+def _labels(labels):
+    def escape(value):
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels) + "}"
+
+
+def _num(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -1,8 +1,11 @@
+from .archive import ArchiveOutput
+from .arrow import Arrow
 from .beancount import Beancount
 from .csv import CSV
 from .gnucashsql import GnuCashSQL
 from .json import JSON
 from .ledger import Ledger
+from .sqlite import SQLite
 
 default = "csv"
 
@@ -13,4 +16,8 @@ by_type = {
     "jsonl": JSON(jsonl=True),
     "gnucash-sql": GnuCashSQL(),
     "ledger": Ledger(),
+    "arrow": Arrow(),
+    "parquet": Arrow(parquet=True),
+    "sqlite": SQLite(),
+    "archive": ArchiveOutput(),
 }
@@ -0,0 +1,33 @@
+"""
+Archive output
+
+A compact binary file with fixed-width records, from which the
+``pricehist lookup`` command can find the price at or before any date without
+reading the whole file. See :mod:`pricehist.archive` for the file layout.
+
+Dates and amounts are stored as numbers, so only the base/quote formatting
+options are respected. Each archive holds a single series.
+
+Classes:
+
+    ArchiveOutput
+
+"""
+
+from pricehist import archive
+from pricehist.format import Format
+
+from .baseoutput import BaseOutput
+
+
+class ArchiveOutput(BaseOutput):
+    binary = True
+    multiple = False
+
+    def format(self, series, source, fmt=Format()):
+        return archive.pack(series, source.id(), base=fmt.base, quote=fmt.quote)
+
+    def format_many(self, series_list, source, fmt=Format()):
+        if len(series_list) != 1:
+            raise ValueError("An archive can only hold a single series.")
+        return self.format(series_list[0], source, fmt=fmt)
@@ -0,0 +1,96 @@
+"""
+Arrow and Parquet output
+
+Columnar output for loading into dataframes and analytics tools without
+reparsing text. Dates are stored as ``date32`` values and amounts as decimals,
+with the base, quote, source and type alongside each price.
+
+Dates and amounts are typed, so only the base/quote formatting options are
+respected. The decimal scale is the largest number of decimal places among the
+amounts, so every amount is stored exactly.
+
+The Arrow output is an Arrow IPC file, also known as Feather version 2. The
+Parquet output is a Parquet file. Both are binary and both require the
+`pyarrow <https://arrow.apache.org/docs/python/>`_ package.
+
+Classes:
+
+    Arrow
+
+"""
+
+import io
+from datetime import date
+
+from pricehist.format import Format
+
+from .baseoutput import BaseOutput
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pragma: nocover
+    pyarrow = None
+
+
+class Arrow(BaseOutput):
+    binary = True
+
+    def __init__(self, parquet=False):
+        self.parquet = parquet
+
+    def missing_dependency(self):
+        return "pyarrow" if pyarrow is None else None
+
+    def format(self, series, source, fmt=Format()):
+        return self.format_many([series], source, fmt=fmt)
+
+    def format_many(self, series_list, source, fmt=Format()):
+        table = self.table_many(series_list, source, fmt)
+        output = io.BytesIO()
+        if self.parquet:
+            pyarrow.parquet.write_table(table, output)
+        else:
+            with pyarrow.ipc.new_file(output, table.schema) as writer:
+                writer.write_table(table)
+        return output.getvalue()
+
+    def table(self, series, source, fmt=Format()):
+        return self.table_many([series], source, fmt)
+
+    def table_many(self, series_list, source, fmt=Format()):
+        prices = [p for series in series_list for p in series.prices]
+        amounts = [p.amount for p in prices]
+        schema = pyarrow.schema(
+            [
+                ("date", pyarrow.date32()),
+                ("base", pyarrow.string()),
+                ("quote", pyarrow.string()),
+                ("amount", self._decimal_type(amounts)),
+                ("source", pyarrow.string()),
+                ("type", pyarrow.string()),
+            ]
+        )
+        columns = {
+            "date": [date.fromisoformat(p.date) for p in prices],
+            "base": self._repeat(series_list, lambda s: fmt.base or s.base),
+            "quote": self._repeat(series_list, lambda s: fmt.quote or s.quote),
+            "amount": amounts,
+            "source": [source.id()] * len(prices),
+            "type": self._repeat(series_list, lambda s: s.type),
+        }
+        return pyarrow.table(columns, schema=schema)
+
+    def _repeat(self, series_list, value):
+        return [value(s) for s in series_list for _ in range(len(s.prices))]
+
+    def _decimal_type(self, amounts):
+        places = [-a.as_tuple().exponent for a in amounts]
+        whole = [len(a.as_tuple().digits) - p for a, p in zip(amounts, places)]
+        scale = max([0, *places])
+        precision = max([1, *whole]) + scale
+        if precision <= 38:
+            return pyarrow.decimal128(precision, scale)
+        else:
+            return pyarrow.decimal256(precision, scale)
@@ -1,11 +1,71 @@
 from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, List
 
 from pricehist.format import Format
-from pricehist.series import Series
+from pricehist.series import Series, interleave
 from pricehist.sources.basesource import BaseSource
 
 
 class BaseOutput(ABC):
+    binary = False
+    file_only = False
+    multiple = True
+    streaming = False
+    appendable = False
+
+    def missing_dependency(self):
+        return None
+
     @abstractmethod
     def format(self, series: Series, source: BaseSource, fmt: Format) -> str:
         pass  # pragma: nocover
+
+    def format_many(
+        self, series_list: List[Series], source: BaseSource, fmt: Format
+    ) -> str:
+        # Outputs that need a single header or document override this.
+        empty = b"" if self.binary else ""
+        return empty.join(self.format(s, source, fmt=fmt) for s in series_list)
+
+    def stream(
+        self, series_chunks: Iterable[Series], source: BaseSource, fmt: Format
+    ) -> Iterator[str]:
+        # Used for outputs with streaming set, as each chunk of a series
+        # arrives. Outputs that need a header or enclosing document override it.
+        for series in series_chunks:
+            yield self.format(series, source, fmt=fmt)
+
+    def format_merged(
+        self, series_list: List[Series], source: BaseSource, fmt: Format
+    ) -> str:
+        # Used for outputs with streaming set, to interleave the prices of
+        # several series by date and then pair, in a single document.
+        return "".join(self.stream(interleave(series_list), source, fmt=fmt))
+
+    def write_merged(
+        self, series_list: List[Series], source: BaseSource, fmt: Format, path: str
+    ):
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(self.stream(interleave(series_list), source, fmt=fmt))
+
+    def write(self, series: Series, source: BaseSource, fmt: Format, path: str):
+        self.write_many([series], source, fmt, path)
+
+    def write_many(
+        self, series_list: List[Series], source: BaseSource, fmt: Format, path: str
+    ):
+        result = self.format_many(series_list, source, fmt=fmt)
+        if self.binary:
+            with open(path, "wb") as f:
+                f.write(result)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(result)
+
+    def append_many(
+        self, series_list: List[Series], source: BaseSource, fmt: Format, path: str
+    ):
+        # Used for outputs with appendable set, to add newer prices to a file
+        # written earlier. Outputs with a header or other structure override it.
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(self.format_many(series_list, source, fmt=fmt))
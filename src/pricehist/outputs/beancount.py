@@ -28,6 +28,9 @@ from .baseoutput import BaseOutput
 
 
 class Beancount(BaseOutput):
+    streaming = True
+    appendable = True
+
     def format(self, series, source=None, fmt=Format()):
         output = ""
         for price in series.prices:
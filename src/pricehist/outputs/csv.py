@@ -24,7 +24,24 @@ from .baseoutput import BaseOutput
 
 
 class CSV(BaseOutput):
+    streaming = True
+    appendable = True
+
     def format(self, series, source, fmt=Format()):
+        return self.format_many([series], source, fmt=fmt)
+
+    def format_many(self, series_list, source, fmt=Format()):
+        return "".join(self.stream(series_list, source, fmt=fmt))
+
+    def stream(self, series_chunks, source, fmt=Format()):
+        return self._stream(series_chunks, source, fmt, header=True)
+
+    def append_many(self, series_list, source, fmt, path):
+        with open(path, "a", encoding="utf-8") as f:
+            header = f.tell() == 0
+            f.writelines(self._stream(series_list, source, fmt, header))
+
+    def _stream(self, series_chunks, source, fmt, header):
         output = io.StringIO()
         writer = csv.writer(
             output,
@@ -36,15 +53,28 @@ class CSV(BaseOutput):
             quoting=csv.QUOTE_MINIMAL,
         )
 
-        header = ["date", "base", "quote", "amount", "source", "type"]
-        writer.writerow(header)
+        # The header is only yielded with the first chunk, so nothing is
+        # written if the source fails before it gives any prices.
+        if header:
+            writer.writerow(["date", "base", "quote", "amount", "source", "type"])
+
+        for series in series_chunks:
+            base = fmt.base or series.base
+            quote = fmt.quote or series.quote
 
-        base = fmt.base or series.base
-        quote = fmt.quote or series.quote
+            for price in series.prices:
+                date = fmt.format_date(price.date)
+                amount = fmt.format_num(price.amount)
+                row = [date, base, quote, amount, source.id(), series.type]
+                writer.writerow(row)
+            yield self._flush(output)
 
-        for price in series.prices:
-            date = fmt.format_date(price.date)
-            amount = fmt.format_num(price.amount)
-            writer.writerow([date, base, quote, amount, source.id(), series.type])
+        remaining = self._flush(output)
+        if remaining:
+            yield remaining
 
-        return output.getvalue()
+    def _flush(self, output):
+        text = output.getvalue()
+        output.seek(0)
+        output.truncate()
+        return text
@@ -15,6 +15,10 @@ table and stores them in a temporary table. Another temprary table is populated
 with new price data and the two are joined to produce the new rows that are
 inserted into the prices table.
 
+When several pairs are output together, a single script covers all of them.
+Each commodity's GUID is looked up once, the prices of every pair are staged
+in the same table, and they are all inserted in one transaction.
+
 Users need to ensure that the base and quote of the new prices already have
 commodities with matching mnemonics in the GnuCash database. If this condition
 is not met, the SQL will fail without making changes. The names of the base and
@@ -25,7 +29,8 @@ formatting and the time of day used.
 Each row in the prices table has a GUID of its own. These are generated in
 pricehist by hashing the price data, so the same GUID will always be used for a
 given date, base, quote, source, type & amount. Existing GUIDs are skipped
-during the final insert into the prices table, so there's no problem with
+during the final insert into the prices table, by looking each one up in
+the table's primary key index, so there's no problem with
 running one SQL file multiple times or running multiple SQL files with
 overlapping data.
 
@@ -52,60 +57,73 @@ from .baseoutput import BaseOutput
 
 class GnuCashSQL(BaseOutput):
     def format(self, series, source, fmt=Format()):
-        base = fmt.base or series.base
-        quote = fmt.quote or series.quote
+        return self.format_many([series], source, fmt=fmt)
+
+    def format_many(self, series_list, source, fmt=Format()):
         src = source.id()
+        bases = [fmt.base or series.base for series in series_list]
+        quotes = [fmt.quote or series.quote for series in series_list]
 
         self._warn_about_backslashes(
             {
                 "date": fmt.format_date("1970-01-01"),
                 "time": fmt.time,
-                "base": base,
-                "quote": quote,
+                "base": "".join(bases),
+                "quote": "".join(quotes),
                 "source": src,
-                "price type": series.type,
+                "price type": "".join(series.type for series in series_list),
             }
         )
 
+        # Each commodity is looked up once, however many pairs it's part of.
+        mnemonics = dict.fromkeys(m for pair in zip(bases, quotes) for m in pair)
+        guids = ",\n".join(
+            f"({m}, (SELECT guid FROM commodities WHERE mnemonic = {m} LIMIT 1))"
+            for m in map(self._sql_str, mnemonics)
+        )
+        guids_comment = "" if mnemonics else "-- "
+
         too_big = False
-        values_parts = []
-        for price in series.prices:
-            date = f"{fmt.format_date(price.date)} {fmt.time}"
-            m = hashlib.sha256()
-            m.update(
-                "".join(
-                    [
-                        date,
-                        base,
-                        quote,
-                        src,
-                        series.type,
-                        str(price.amount),
-                    ]
-                ).encode("utf-8")
-            )
-            guid = m.hexdigest()[0:32]
-
-            value_num, value_denom, fit = self._rational(price.amount)
-            too_big |= not fit
-            v = (
-                "("
-                + ", ".join(
-                    [
-                        self._sql_str(guid),
-                        self._sql_str(date),
-                        self._sql_str(base),
-                        self._sql_str(quote),
-                        self._sql_str(src),
-                        self._sql_str(series.type),
-                        str(value_num),
-                        str(value_denom),
-                    ]
+        values_parts = {}
+        for series, base, quote in zip(series_list, bases, quotes):
+            for price in series.prices:
+                date = f"{fmt.format_date(price.date)} {fmt.time}"
+                m = hashlib.sha256()
+                m.update(
+                    "".join(
+                        [
+                            date,
+                            base,
+                            quote,
+                            src,
+                            series.type,
+                            str(price.amount),
+                        ]
+                    ).encode("utf-8")
                 )
-                + ")"
-            )
-            values_parts.append(v)
-        values = ",\n".join(values_parts)
+                guid = m.hexdigest()[0:32]
+
+                value_num, value_denom, fit = self._rational(price.amount)
+                too_big |= not fit
+                v = (
+                    "("
+                    + ", ".join(
+                        [
+                            self._sql_str(guid),
+                            self._sql_str(date),
+                            self._sql_str(base),
+                            self._sql_str(quote),
+                            self._sql_str(src),
+                            self._sql_str(series.type),
+                            str(value_num),
+                            str(value_denom),
+                        ]
+                    )
+                    + ")"
+                )
+                # Repeated prices would otherwise conflict on insert.
+                values_parts[guid] = v
+        values = ",\n".join(values_parts.values())
         values_comment = "" if values_parts else "-- "
 
         if too_big:
@@ -126,8 +144,8 @@ class GnuCashSQL(BaseOutput):
             .format(
                 version=__version__,
                 timestamp=datetime.now(timezone.utc).isoformat()[:-6] + "Z",
-                base=self._sql_str(base),
-                quote=self._sql_str(quote),
+                guids_comment=guids_comment,
+                guids=guids,
                 values_comment=values_comment,
                 values=values,
             )
@@ -11,6 +11,7 @@ Classes:
 
 import io
 import json
+import textwrap
 
 from pricehist.format import Format
 
@@ -18,25 +19,35 @@ from .baseoutput import BaseOutput
 
 
 class JSON(BaseOutput):
+    streaming = True
+
     def __init__(self, jsonl=False):
         self.jsonl = jsonl
+        self.appendable = jsonl
 
     def format(self, series, source, fmt=Format()):
-        data = []
-        output = io.StringIO()
+        return self.format_many([series], source, fmt=fmt)
+
+    def format_many(self, series_list, source, fmt=Format()):
+        return "".join(self.stream(series_list, source, fmt=fmt))
 
-        base = fmt.base or series.base
-        quote = fmt.quote or series.quote
+    def stream(self, series_chunks, source, fmt=Format()):
+        # Rows are written one at a time, laid out as json.dump would lay out
+        # the whole array.
+        first = True
+        for series in series_chunks:
+            output = io.StringIO()
+            base = fmt.base or series.base
+            quote = fmt.quote or series.quote
 
-        for price in series.prices:
-            date = fmt.format_date(price.date)
-            if fmt.jsonnums:
-                amount = float(price.amount)
-            else:
-                amount = fmt.format_num(price.amount)
+            for price in series.prices:
+                date = fmt.format_date(price.date)
+                if fmt.jsonnums:
+                    amount = float(price.amount)
+                else:
+                    amount = fmt.format_num(price.amount)
 
-            data.append(
-                {
+                row = {
                     "date": date,
                     "base": base,
                     "quote": quote,
@@ -44,14 +55,17 @@ class JSON(BaseOutput):
                     "source": source.id(),
                     "type": series.type,
                 }
-            )
 
-        if self.jsonl:
-            for row in data:
-                json.dump(row, output, ensure_ascii=False)
-                output.write("\n")
-        else:
-            json.dump(data, output, ensure_ascii=False, indent=2)
-            output.write("\n")
+                if self.jsonl:
+                    json.dump(row, output, ensure_ascii=False)
+                    output.write("\n")
+                else:
+                    output.write("[\n" if first else ",\n")
+                    text = json.dumps(row, ensure_ascii=False, indent=2)
+                    output.write(textwrap.indent(text, "  "))
+                first = False
+
+            yield output.getvalue()
 
-        return output.getvalue()
+        if not self.jsonl:
+            yield "[]\n" if first else "\n]\n"
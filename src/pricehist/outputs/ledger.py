@@ -33,6 +33,9 @@ from .baseoutput import BaseOutput
 
 
 class Ledger(BaseOutput):
+    streaming = True
+    appendable = True
+
     def format(self, series, source=None, fmt=Format()):
         output = ""
         for price in series.prices:
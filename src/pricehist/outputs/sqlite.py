@@ -0,0 +1,93 @@
+"""
+SQLite output
+
+Prices are written directly into a `SQLite <https://www.sqlite.org/>`_ database
+file, which is created if it doesn't exist yet. This output can only be written
+to a file, given with the ``--output-file`` option.
+
+Prices are stored in a table named ``prices`` with the columns ``source``,
+``base``, ``quote``, ``type``, ``date`` and ``amount``. A unique index covers
+all but the amount, so a price is identified by its source, pair, type and
+date, and lookups by pair and date are fast.
+
+All prices, from one or more series, are upserted in one transaction. New
+prices are inserted, changed amounts are updated, and rows that are already up
+to date are left untouched, so running the same fetch again only writes prices
+that are new.
+
+Dates are stored as ``YYYY-MM-DD`` and amounts as text, so that they keep their
+exact decimal values. Only the base/quote formatting options are respected.
+
+Classes:
+
+    SQLite
+
+"""
+
+import logging
+import sqlite3
+
+from pricehist.format import Format
+
+from .baseoutput import BaseOutput
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    source TEXT NOT NULL,
+    base TEXT NOT NULL,
+    quote TEXT NOT NULL,
+    type TEXT NOT NULL,
+    date TEXT NOT NULL,
+    amount TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS prices_source_base_quote_type_date
+ON prices (source, base, quote, type, date);
+"""
+
+UPSERT = """
+INSERT INTO prices (source, base, quote, type, date, amount)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (source, base, quote, type, date) DO UPDATE
+SET amount = excluded.amount
+WHERE amount <> excluded.amount
+"""
+
+
+class SQLite(BaseOutput):
+    file_only = True
+    appendable = True
+
+    def format(self, series, source, fmt=Format()):
+        raise ValueError(
+            "The sqlite output can only be written to a file, with --output-file."
+        )
+
+    def write_many(self, series_list, source, fmt, path):
+        src = source.id()
+        rows = [
+            (
+                src,
+                fmt.base or series.base,
+                fmt.quote or series.quote,
+                series.type,
+                p.date,
+                str(p.amount),
+            )
+            for series in series_list
+            for p in series.prices
+        ]
+
+        conn = sqlite3.connect(path)
+        try:
+            conn.executescript(SCHEMA)
+            with conn:
+                before = conn.total_changes
+                conn.executemany(UPSERT, rows)
+                changes = conn.total_changes - before
+        finally:
+            conn.close()
+
+        logging.info(f"Wrote {changes} new or changed of {len(rows)} prices to {path}.")
+
+    def append_many(self, series_list, source, fmt, path):
+        self.write_many(series_list, source, fmt, path)
@@ -0,0 +1,155 @@
+"""
+Recording and replay of source interactions
+
+When recording, every HTTP exchange made by a source is saved to a directory,
+one JSON file per distinct request. When replaying, requests are answered from
+those files and no network access is attempted, so a run can be repeated
+deterministically, e.g. to profile parsing and formatting.
+
+Requests are matched by method and URL. Credentials given as query parameters
+are left out of the saved URL and ignored when matching, so a recording can be
+replayed without the same access key.
+
+The disk cache is bypassed while recording or replaying, so that every request
+a run needs is recorded, and a replay neither depends on nor changes the cache.
+
+Functions:
+
+    record
+    replay
+    reset
+    active
+    session
+    save
+
+"""
+
+import hashlib
+import json
+import logging
+import os
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+CREDENTIAL_PARAMS = ["apikey"]
+
+# The saved body is already decoded, so these no longer apply.
+DROPPED_HEADERS = ["content-encoding", "content-length", "transfer-encoding"]
+
+_mode = None
+_directory = None
+
+
+def record(directory):
+    global _mode, _directory
+    _mode, _directory = "record", directory
+
+
+def replay(directory):
+    global _mode, _directory
+    _mode, _directory = "replay", directory
+
+
+def reset():
+    global _mode, _directory
+    _mode, _directory = None, None
+
+
+def active():
+    return _mode is not None
+
+
+def session():
+    s = requests.Session()
+    if _mode == "replay":
+        adapter = ReplayAdapter(_directory)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+    return s
+
+
+def save(response):
+    if _mode != "record":
+        return
+
+    request = response.request
+    url = _redacted_url(request.url)
+    headers = {
+        k: v for k, v in response.headers.items() if k.lower() not in DROPPED_HEADERS
+    }
+    exchange = {
+        "request": {"method": request.method, "url": url},
+        "response": {
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": headers,
+        },
+    }
+    try:
+        exchange["response"]["body"] = response.content.decode("utf-8")
+    except UnicodeDecodeError:
+        exchange["response"]["body_hex"] = response.content.hex()
+
+    os.makedirs(_directory, exist_ok=True)
+    path = _path(_directory, request.method, url)
+    with open(path, "w") as f:
+        json.dump(exchange, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    logging.debug(f"Recorded response to {path}")
+
+
+class ReplayAdapter(BaseAdapter):
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+
+    def send(self, request, **kwargs):
+        path = _path(self.directory, request.method, _redacted_url(request.url))
+        try:
+            with open(path) as f:
+                exchange = json.load(f)
+        except FileNotFoundError:
+            raise requests.exceptions.ConnectionError(
+                f"No recorded response for {request.method} "
+                f"{_redacted_url(request.url)} in '{self.directory}'.",
+                request=request,
+            )
+
+        recorded = exchange["response"]
+        response = requests.Response()
+        response.status_code = recorded["status"]
+        response.reason = recorded["reason"]
+        response.headers = CaseInsensitiveDict(recorded["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        if "body_hex" in recorded:
+            response._content = bytes.fromhex(recorded["body_hex"])
+        else:
+            response._content = recorded["body"].encode("utf-8")
+        logging.debug(f"Replayed response from {path}")
+        return response
+
+    def close(self):
+        pass
+
+
+def _redacted_url(url):
+    parts = urlsplit(url)
+    query = [
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in CREDENTIAL_PARAMS
+    ]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _path(directory, method, url):
+    digest = hashlib.sha256(f"{method} {url}".encode("utf-8")).hexdigest()[0:16]
+    host = urlsplit(url).hostname or "unknown"
+    return os.path.join(directory, f"{host}-{digest}.json")
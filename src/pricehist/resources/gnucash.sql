@@ -5,8 +5,9 @@ BEGIN;
 -- The GnuCash database must already have entries for the relevant commodities.
 -- These statements fail and later changes are skipped if that isn't the case.
 CREATE TEMPORARY TABLE guids (mnemonic TEXT NOT NULL, guid TEXT NOT NULL);
-INSERT INTO guids VALUES ({base}, (SELECT guid FROM commodities WHERE mnemonic = {base} LIMIT 1));
-INSERT INTO guids VALUES ({quote}, (SELECT guid FROM commodities WHERE mnemonic = {quote} LIMIT 1));
+{guids_comment}INSERT INTO guids VALUES
+{guids_comment}{guids}
+{guids_comment};
 
 -- Create a staging table for the new price data.
 -- Doing this via a SELECT ensures the correct date type across databases.
@@ -23,16 +24,17 @@ WHERE FALSE;
 -- Get some numbers for the summary.
 CREATE TEMPORARY TABLE summary (description TEXT, num INT);
 INSERT INTO summary VALUES ('staged rows', (SELECT COUNT(*) FROM new_prices));
-INSERT INTO summary VALUES ('pre-existing rows', (SELECT COUNT(*) FROM new_prices tp, prices p where p.guid = tp.guid));
-INSERT INTO summary VALUES ('additional rows', (SELECT COUNT(*) FROM new_prices WHERE guid NOT IN (SELECT guid FROM prices)));
+INSERT INTO summary VALUES ('pre-existing rows', (SELECT COUNT(*) FROM new_prices tp WHERE EXISTS (SELECT 1 FROM prices p WHERE p.guid = tp.guid)));
+INSERT INTO summary VALUES ('additional rows', (SELECT COUNT(*) FROM new_prices tp WHERE NOT EXISTS (SELECT 1 FROM prices p WHERE p.guid = tp.guid)));
 
 -- Insert the new prices into the prices table, unless they're already there.
+-- The lookup of each staged guid uses the primary key index of prices.
 INSERT INTO prices (guid, commodity_guid, currency_guid, date, source, type, value_num, value_denom)
 SELECT tp.guid, g1.guid, g2.guid, tp.date, tp.source, tp.type, tp.value_num, tp.value_denom
 FROM new_prices tp, guids g1, guids g2
 WHERE tp.base = g1.mnemonic
   AND tp.quote = g2.mnemonic
-  AND tp.guid NOT IN (SELECT guid FROM prices)
+  AND NOT EXISTS (SELECT 1 FROM prices p WHERE p.guid = tp.guid)
 ;
 
 -- Show the final relevant rows of the main prices table
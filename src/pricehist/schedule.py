@@ -0,0 +1,65 @@
+"""
+Publication schedules
+
+Most sources publish one price per pair for each day, at a known time. The ECB
+publishes its reference rates around 16:00 CET on working days, the Bank of
+Canada publishes its exchange rates by 16:30 ET on business days, and crypto
+sources close each day's prices at midnight UTC, every day.
+
+A :class:`Publication` describes such a schedule, so that prices can be
+requested when they are expected rather than by polling at fixed intervals.
+Times are in the source's own time zone, so that daylight saving time is
+taken into account.
+
+Classes:
+
+    Publication
+
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+from typing import Tuple
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # pragma: nocover
+    from backports.zoneinfo import ZoneInfo
+
+WEEKDAYS = (0, 1, 2, 3, 4)
+EVERY_DAY = (0, 1, 2, 3, 4, 5, 6)
+
+
+@dataclass(frozen=True)
+class Publication:
+    """The daily publication of a source's prices.
+
+    The price for each date in ``weekdays`` is published at ``time`` in the
+    ``zone`` time zone, ``days_later`` days after that date.
+    """
+
+    time: str
+    zone: str
+    weekdays: Tuple[int, ...] = WEEKDAYS
+    days_later: int = 0
+
+    def next(self, after: datetime) -> datetime:
+        """Return the first publication time later than the given time."""
+        return next(t for t, _ in self._times(after, 1) if t > after)
+
+    def latest_date(self, now: datetime) -> str:
+        """Return the date of the most recently published price."""
+        return next(d for t, d in self._times(now, -1) if t <= now).isoformat()
+
+    def _times(self, around, step):
+        # Yields (publication time, price date) pairs, in UTC, going forwards
+        # or backwards from the day of the given time.
+        zone = ZoneInfo(self.zone)
+        hours, minutes = (int(part) for part in self.time.split(":"))
+        day = around.astimezone(zone).date() - timedelta(days=step)
+        while True:
+            price_date = day - timedelta(days=self.days_later)
+            if price_date.weekday() in self.weekdays:
+                local = datetime.combine(day, time(hours, minutes), tzinfo=zone)
+                yield (local.astimezone(timezone.utc), price_date)
+            day += timedelta(days=step)
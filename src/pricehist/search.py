@@ -0,0 +1,194 @@
+"""
+Symbol search across sources
+
+The symbol lists of all sources are kept in the disk cache (see
+:mod:`pricehist.cache`) and refreshed after a day, so searching them doesn't
+depend on the network once they have been downloaded. The lists are indexed by
+lowercase symbol, for exact and prefix matches, and by the trigrams of each
+word in the symbol and description, for approximate matches that tolerate
+typos and partial words.
+
+Building the trigram index takes longer than a search, so it is cached too.
+Each trigram's list of entries is saved as packed integers and only unpacked
+when a query uses that trigram.
+
+Results are ranked with exact symbol matches first, then symbol prefix
+matches, then by the fraction of the query's trigrams that each entry
+contains.
+
+Classes:
+
+    Index
+
+Functions:
+
+    entries
+    index
+    format_search
+
+"""
+
+import base64
+import logging
+import os
+import re
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from pricehist import cache, exceptions, sources
+
+SYMBOLS_TTL = 24 * 60 * 60
+
+# The fraction of the query's trigrams an approximate match must contain.
+THRESHOLD = 0.5
+
+
+class Index:
+    def __init__(self, entries, postings=None):
+        self.entries = [tuple(entry) for entry in entries]
+        self._symbols = sorted(
+            (symbol.lower(), i) for i, (_, symbol, _) in enumerate(self.entries)
+        )
+        if postings is None:
+            postings = _postings(self.entries)
+        self._postings = postings
+
+    def data(self):
+        """Return the index as data that can be saved as JSON."""
+        return {
+            "entries": [list(entry) for entry in self.entries],
+            "postings": self._postings,
+        }
+
+    @classmethod
+    def fromdata(cls, data):
+        return cls(data["entries"], data["postings"])
+
+    def search(self, query, limit=20):
+        """Return up to limit (source_id, symbol, description) entries."""
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        scores = {}
+        lo = bisect_left(self._symbols, (query,))
+        for j in range(lo, len(self._symbols)):
+            symbol, i = self._symbols[j]
+            if not symbol.startswith(query):
+                break
+            scores[i] = 3 if symbol == query else 2
+
+        trigrams = _trigrams(query)
+        counts = Counter(i for t in trigrams for i in self._posting(t))
+        for i, count in counts.items():
+            score = count / len(trigrams)
+            if score >= THRESHOLD and score > scores.get(i, 0):
+                scores[i] = score
+
+        def rank(i):
+            _, symbol, description = self.entries[i]
+            return (-scores[i], len(symbol) + len(description), i)
+
+        return [self.entries[i] for i in sorted(scores, key=rank)[:limit]]
+
+    def _posting(self, trigram):
+        if trigram not in self._postings:
+            return array("I")
+        return array("I", base64.b64decode(self._postings[trigram]))
+
+
+def entries(source_list, refresh=False):
+    """Return (source_id, symbol, description) for every symbol of the sources.
+
+    Sources whose symbols can't be listed are skipped with a warning.
+    """
+    return _entries(source_list, refresh)[0]
+
+
+def _entries(source_list, refresh):
+    # Also returns the IDs of the sources that were skipped.
+    result, failed = [], []
+    for source in source_list:
+        ttl = 0 if refresh else SYMBOLS_TTL
+        try:
+            symbols = cache.get(
+                f"symbols-{source.id()}",
+                _key(source),
+                ttl,
+                lambda: [list(s) for s in source.symbols()],
+            )
+        except exceptions.SourceError as e:
+            exceptions.count(e)
+            logging.warning(f"Skipping {source.id()} symbols, which failed: {e}")
+            failed.append(source.id())
+            continue
+        result += [(source.id(), symbol, desc) for symbol, desc in symbols]
+    return result, failed
+
+
+def index(source_list, refresh=False):
+    """Return an index of the symbols of the sources, cached with them.
+
+    An index missing the symbols of a source that failed isn't cached, so that
+    the source is included again once it recovers.
+    """
+    ids = [source.id() for source in source_list]
+    name = "search-index"
+    if set(ids) != set(sources.by_id):
+        name += "-" + "-".join(ids)
+    keys = [_key(source) for source in source_list]
+    ttl = 0 if refresh else SYMBOLS_TTL
+
+    def load():
+        result, failed = _entries(source_list, refresh)
+        if failed:
+            raise _Incomplete(Index(result))
+        return Index(result).data()
+
+    try:
+        return Index.fromdata(cache.get(name, keys, ttl, load))
+    except _Incomplete as e:
+        return e.index
+
+
+def format_search(query, source_list, limit=20, refresh=False) -> str:
+    results = index(source_list, refresh).search(query, limit)
+
+    if results == []:
+        logging.info(f"No results found for query '{query}'.")
+        return ""
+
+    id_width = max(len(source_id) for source_id, _, _ in results)
+    sym_width = max(len(symbol) for _, symbol, _ in results)
+    lines = [
+        source_id.ljust(id_width + 4) + symbol.ljust(sym_width + 4) + desc + "\n"
+        for source_id, symbol, desc in results
+    ]
+    return "".join(lines)
+
+
+class _Incomplete(Exception):
+    def __init__(self, index):
+        self.index = index
+
+
+def _key(source):
+    # Symbols from another server, such as the stand-in, are kept apart.
+    return os.getenv(source.BASE_URL_NAME) or source.id()
+
+
+def _postings(entries):
+    postings = defaultdict(lambda: array("I"))
+    for i, (_, symbol, description) in enumerate(entries):
+        for trigram in _trigrams(f"{symbol} {description}"):
+            postings[trigram].append(i)
+    return {t: base64.b64encode(a.tobytes()).decode() for t, a in postings.items()}
+
+
+def _trigrams(text):
+    trigrams = set()
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        padded = f"  {word} "
+        trigrams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return trigrams
@@ -1,5 +1,11 @@
+import bisect
+import heapq
+from collections.abc import Sequence
 from dataclasses import dataclass, field, replace
+from datetime import date
 from decimal import Decimal, getcontext
+from functools import cached_property
+from itertools import repeat
 from typing import List
 
 from pricehist.price import Price
@@ -14,6 +20,66 @@ class Series:
     end: str
     prices: List[Price] = field(default_factory=list)
 
+    def at(self, date):
+        prices, dates, lo, hi = self._index
+        i = bisect.bisect_left(dates, date, lo, hi)
+        if i < hi and dates[i] == date:
+            return prices[i]
+        return None
+
+    def asof(self, date):
+        prices, dates, lo, hi = self._index
+        i = bisect.bisect_right(dates, date, lo, hi)
+        return prices[i - 1] if i > lo else None
+
+    def slice(self, start, end):
+        prices, dates, lo, hi = self._index
+        i = bisect.bisect_left(dates, start, lo, hi)
+        j = bisect.bisect_right(dates, end, i, hi)
+        view = PriceView(prices, dates, i, j)
+        return replace(self, start=start, end=end, prices=view)
+
+    @cached_property
+    def _index(self):
+        if isinstance(self.prices, PriceView):
+            view = self.prices
+            return (view._prices, view._dates, view._lo, view._hi)
+        return (self.prices, [p.date for p in self.prices], 0, len(self.prices))
+
+    def merge(self, *others, conflict="last"):
+        if conflict not in CONFLICTS:
+            raise ValueError(f"Unknown merge conflict policy '{conflict}'.")
+        kind = (self.base, self.quote, self.type)
+        for other in others:
+            if (other.base, other.quote, other.type) != kind:
+                raise ValueError(
+                    f"Can't merge {other.base}/{other.quote} {other.type} prices "
+                    f"into {self.base}/{self.quote} {self.type} prices."
+                )
+
+        # Ties are yielded in input order, so later inputs come later.
+        all_series = [self, *others]
+        merged = heapq.merge(*[s.prices for s in all_series], key=lambda p: p.date)
+
+        prices = []
+        for p in merged:
+            if not prices or prices[-1].date != p.date:
+                prices.append(p)
+            elif conflict == "last":
+                prices[-1] = p
+            elif conflict == "error" and prices[-1].amount != p.amount:
+                raise ValueError(
+                    f"Conflicting prices for {p.date}: "
+                    f"{prices[-1].amount} and {p.amount}."
+                )
+
+        return replace(
+            self,
+            start=min(s.start for s in all_series),
+            end=max(s.end for s in all_series),
+            prices=prices,
+        )
+
     def invert(self):
         return replace(
             self,
@@ -22,6 +88,31 @@ class Series:
             prices=[Price(date=p.date, amount=(1 / p.amount)) for p in self.prices],
         )
 
+    def cross(self, other):
+        if self.quote != other.base:
+            raise ValueError(
+                f"Can't cross {self.base}/{self.quote} with {other.base}/{other.quote}."
+            )
+        prices = []
+        i, j = 0, 0
+        while i < len(self.prices) and j < len(other.prices):
+            a, b = self.prices[i], other.prices[j]
+            if a.date < b.date:
+                i += 1
+            elif a.date > b.date:
+                j += 1
+            else:
+                prices.append(Price(date=a.date, amount=(a.amount * b.amount)))
+                i += 1
+                j += 1
+        return replace(
+            self,
+            quote=other.quote,
+            start=max(self.start, other.start),
+            end=min(self.end, other.end),
+            prices=prices,
+        )
+
     def quantize(self, decimal_places):
         return replace(
             self,
@@ -31,12 +122,43 @@ class Series:
             ],
         )
 
+    def resample(self, period, aggregate="last"):
+        if period not in PERIODS:
+            raise ValueError(f"Unknown resampling period '{period}'.")
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Unknown resampling aggregate '{aggregate}'.")
+        period_of = PERIODS[period]
+        prices = []
+        group = []
+        for p in self.prices:
+            if group and period_of(p.date) != period_of(group[0].date):
+                prices.append(self._aggregate(group, aggregate))
+                group = []
+            group.append(p)
+        if group:
+            prices.append(self._aggregate(group, aggregate))
+        return replace(self, prices=prices)
+
     def rename_base(self, new_base):
         return replace(self, base=new_base)
 
     def rename_quote(self, new_quote):
         return replace(self, quote=new_quote)
 
+    def _aggregate(self, group, aggregate):
+        if aggregate == "first":
+            return group[0]
+        amounts = [p.amount for p in group]
+        if aggregate == "last":
+            amount = amounts[-1]
+        elif aggregate == "high":
+            amount = max(amounts)
+        elif aggregate == "low":
+            amount = min(amounts)
+        else:
+            amount = sum(amounts) / len(amounts)
+        return Price(date=group[-1].date, amount=amount)
+
     def _quantize(self, amount, decimal_places):
         digits = len(amount.as_tuple().digits)
         exponent = amount.as_tuple().exponent
@@ -49,3 +171,71 @@ class Series:
         rounding = Decimal("0." + ("0" * chosen_decimal_places))
 
         return amount.quantize(rounding)
+
+
+def interleave(series_list):
+    """Yield the prices of several series in order of date and then pair.
+
+    Each series' prices must already be in date order. Prices are yielded in
+    chunks, as copies of their series holding consecutive prices of that
+    series, so that outputs can stream them as they would one series.
+    """
+    merged = heapq.merge(
+        *[zip(repeat(i), s.prices) for i, s in enumerate(series_list)],
+        key=lambda item: (
+            item[1].date,
+            series_list[item[0]].base,
+            series_list[item[0]].quote,
+        ),
+    )
+    current, prices = None, []
+    for i, price in merged:
+        if i != current and prices:
+            yield replace(series_list[current], prices=prices)
+            prices = []
+        current = i
+        prices.append(price)
+    if prices:
+        yield replace(series_list[current], prices=prices)
+
+
+class PriceView(Sequence):
+    """A read-only view of a range of another series' prices."""
+
+    def __init__(self, prices, dates, lo, hi):
+        self._prices = prices
+        self._dates = dates
+        self._lo = lo
+        self._hi = hi
+
+    def __len__(self):
+        return self._hi - self._lo
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("price view index out of range")
+        return self._prices[self._lo + i]
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"PriceView({list(self)!r})"
+
+
+PERIODS = {
+    "week": lambda d: date.fromisoformat(d).isocalendar()[0:2],
+    "month": lambda d: d[0:7],
+    "quarter": lambda d: (d[0:4], (int(d[5:7]) - 1) // 3),
+    "year": lambda d: d[0:4],
+}
+
+AGGREGATES = ["last", "first", "high", "low", "mean"]
+
+CONFLICTS = ["last", "first", "error"]
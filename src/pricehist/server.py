@@ -0,0 +1,346 @@
+"""
+Price server
+
+A long-running HTTP server that answers price queries from an in-memory cache,
+so that many clients can share one warm process. It can listen on a TCP port or
+on a Unix socket.
+
+Prices are requested with the same details as for the fetch command::
+
+    GET /prices?source=ecb&pair=EUR/USD&start=2021-01-01&output=ledger
+
+The ``source`` and ``pair`` parameters are required. The optional ``type``,
+``start`` and ``end`` parameters default as they do for the fetch command.
+``output`` defaults to CSV. The ``invert`` and ``quantize`` parameters and the
+``fmt-*`` parameters correspond to the fetch command options of the same
+names.
+
+Invalid parameters are answered with a 400 status, and a pair the source
+doesn't have with a 404. Other source errors are answered with a 502.
+
+Fetched series are cached by source, pair, type, start and end. The cache holds
+a limited number of series, dropping the least recently used first, and each
+entry expires after a given time so that recent prices are picked up.
+Concurrent identical requests share a single fetch from the source.
+
+Metrics about the server's requests to sources (see :mod:`pricehist.metrics`)
+are available in the Prometheus text format at ``/metrics``, or as JSON at
+``/metrics?format=json``.
+
+Classes:
+
+    Cache
+    PriceServer
+    UnixPriceServer
+
+Functions:
+
+    serve
+
+"""
+
+import logging
+import os
+import signal
+import stat
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socket import AF_UNIX, SOCK_STREAM
+from socket import socket as Socket
+from socketserver import ThreadingMixIn, UnixStreamServer
+from urllib.parse import parse_qs, urlsplit
+
+from pricehist import exceptions, metrics, outputs, sources
+from pricehist.format import Format
+from pricehist.series import Series
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "jsonl": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.file",
+    "parquet": "application/vnd.apache.parquet",
+    "archive": "application/octet-stream",
+}
+
+
+class Cache:
+    def __init__(self, size=1000, ttl=3600, clock=time.monotonic):
+        self.size = size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, load):
+        """Return the cached value for the key, calling load() if necessary.
+
+        Only one load runs at a time for any key. Other callers wait for its
+        result, or its exception, which is not cached.
+        """
+        with self._lock:
+            if key in self._entries:
+                loaded_at, value = self._entries[key]
+                if self.clock() - loaded_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+            pending = self._pending.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._pending[key] = Future()
+
+        if not leader:
+            return pending.result()
+
+        try:
+            value = load()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(e)
+            raise
+
+        with self._lock:
+            self._entries[key] = (self.clock(), value)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+            del self._pending[key]
+        pending.set_result(value)
+        return value
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/prices":
+            try:
+                status, content_type, body = self.server.prices(params)
+            except Exception as e:
+                logging.debug("Unexpected exception encountered", exc_info=e)
+                status, content_type, body = 500, "text/plain", f"{e}\n"
+        elif url.path == "/metrics" and params.get("format") == "json":
+            status, content_type, body = 200, "application/json", metrics.format_json()
+        elif url.path == "/metrics":
+            content_type = "text/plain; version=0.0.4"
+            status, body = 200, metrics.format_prometheus()
+        else:
+            status, content_type, body = 404, "text/plain", "Not found.\n"
+
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+            content_type = f"{content_type}; charset=utf-8"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"Served {format % args}")
+
+
+class PriceServerMixIn:
+    def setup_cache(self, cache_size, cache_ttl):
+        self.cache = Cache(size=cache_size, ttl=cache_ttl)
+
+    def prices(self, params):
+        try:
+            source, series, output, invert, quantize, fmt = self._parse(params)
+        except ValueError as e:
+            return (400, "text/plain", f"{e}\n")
+
+        key = (source.id(), series.base, series.quote, series.type)
+        key += (series.start, series.end)
+        try:
+            series = self.cache.get(key, lambda: source.fetch(series))
+        except exceptions.InvalidPair as e:
+            exceptions.count(e)
+            return (404, "text/plain", f"{e}\n")
+        except exceptions.InvalidType as e:
+            exceptions.count(e)
+            return (400, "text/plain", f"{e}\n")
+        except exceptions.SourceError as e:
+            exceptions.count(e)
+            return (502, "text/plain", f"{e}\n")
+
+        if invert:
+            series = series.invert()
+        if quantize is not None:
+            series = series.quantize(quantize)
+
+        body = output.format(series, source, fmt=fmt)
+        output_type = params.get("output", outputs.default)
+        return (200, CONTENT_TYPES.get(output_type, "text/plain"), body)
+
+    def _parse(self, params):
+        if "source" not in params or "pair" not in params:
+            raise ValueError("The source and pair parameters are required.")
+        if params["source"] not in sources.by_id:
+            raise ValueError(f"Unknown source '{params['source']}'.")
+        source = sources.by_id[params["source"]]
+
+        output_type = params.get("output", outputs.default)
+        if output_type not in outputs.by_type:
+            raise ValueError(f"Unknown output format '{output_type}'.")
+        output = outputs.by_type[output_type]
+        if output.file_only:
+            raise ValueError(f"The {output_type} output can only be written to a file.")
+        if output.missing_dependency():
+            raise ValueError(
+                f"The {output_type} output requires the "
+                f"{output.missing_dependency()} package, which is not installed."
+            )
+
+        base, quote = (params["pair"] + "/").split("/")[0:2]
+        if base == "":
+            raise ValueError(f"No base found in the requested pair '{params['pair']}'.")
+
+        type = params.get("type", source.types()[0])
+        if type not in source.types():
+            raise ValueError(
+                f"The requested price type '{type}' is not recognized by the "
+                f"{source.id()} source."
+            )
+
+        start = self._date(params.get("start", source.start()))
+        end = self._date(params.get("end", "today"))
+        if end < start:
+            raise ValueError(f"The end date '{end}' preceeds the start date '{start}'.")
+
+        quantize = self._quantize(params.get("quantize"))
+        invert = params.get("invert", "false").lower() in ["true", "1", "yes"]
+
+        series = Series(
+            base=source.normalizesymbol(base),
+            quote=source.normalizesymbol(quote),
+            type=type,
+            start=start,
+            end=end,
+        )
+        return (source, series, output, invert, quantize, self._format(params))
+
+    def _quantize(self, s):
+        if s is None:
+            return None
+        try:
+            return int(s)
+        except ValueError:
+            raise ValueError(f"The quantize parameter must be an integer, not '{s}'.")
+
+    def _date(self, s):
+        if s == "today":
+            return datetime.now().date().isoformat()
+        try:
+            return datetime.strptime(s, "%Y-%m-%d").date().isoformat()
+        except ValueError:
+            raise ValueError(f"Not a valid YYYY-MM-DD date: '{s}'.")
+
+    def _format(self, params):
+        fields = {
+            "base": "fmt-base",
+            "quote": "fmt-quote",
+            "time": "fmt-time",
+            "decimal": "fmt-decimal",
+            "thousands": "fmt-thousands",
+            "symbol": "fmt-symbol",
+            "datesep": "fmt-datesep",
+            "csvdelim": "fmt-csvdelim",
+        }
+        values = {f: params[p] for f, p in fields.items() if p in params}
+        if "fmt-jsonnums" in params:
+            values["jsonnums"] = params["fmt-jsonnums"].lower() in ["true", "1"]
+        return Format(**values)
+
+
+class PriceServer(PriceServerMixIn, ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, cache_size=1000, cache_ttl=3600):
+        super().__init__(address, Handler)
+        self.setup_cache(cache_size, cache_ttl)
+
+    def location(self):
+        host, port = self.server_address[0:2]
+        return f"http://{host}:{port}"
+
+
+class UnixPriceServer(PriceServerMixIn, ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, cache_size=1000, cache_ttl=3600):
+        super().__init__(path, Handler)
+        self.setup_cache(cache_size, cache_ttl)
+
+    def location(self):
+        return f"unix:{self.server_address}"
+
+
+def serve(host="127.0.0.1", port=8080, socket=None, cache_size=1000, cache_ttl=3600):
+    """Serve prices until interrupted or terminated.
+
+    A Unix socket left behind by a server that didn't shut down is replaced.
+    Raises OSError if the address can't be listened on.
+    """
+    if socket:
+        _remove_stale_socket(socket)
+        server = UnixPriceServer(socket, cache_size=cache_size, cache_ttl=cache_ttl)
+    else:
+        server = PriceServer((host, port), cache_size=cache_size, cache_ttl=cache_ttl)
+
+    # SIGTERM, as sent by service managers, shuts down like an interrupt.
+    if threading.current_thread() is threading.main_thread():
+        previous = signal.signal(signal.SIGTERM, _terminate)
+    logging.info(f"Serving prices at {server.location()}.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.debug("Interrupted.")
+    except _Terminated:
+        logging.debug("Terminated.")
+    finally:
+        server.server_close()
+        if socket:
+            os.unlink(socket)
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, previous)
+
+
+class _Terminated(Exception):
+    pass
+
+
+def _terminate(signum, frame):
+    raise _Terminated()
+
+
+def _remove_stale_socket(path):
+    try:
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            return
+    except FileNotFoundError:
+        return
+
+    probe = Socket(AF_UNIX, SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:  # Nothing is listening on it any more.
+        logging.debug(f"Removing the stale socket {path}.")
+        os.unlink(path)
+    except OSError:
+        pass
+    finally:
+        probe.close()
@@ -1,14 +1,146 @@
+"""
+Price sources
+
+The built-in sources are always available. Other packages can add sources by
+declaring an entry point in the ``pricehist.sources`` group, named with the
+source ID and referring to a :class:`BaseSource` subclass, e.g. in
+``pyproject.toml``::
+
+    [project.entry-points."pricehist.sources"]
+    inhouse = "inhouse_prices.source:InHouse"
+
+A plugin source is only imported when its ID is first looked up in
+:data:`by_id`. Its name, which the sources command lists, is kept in the disk
+cache (see :mod:`pricehist.cache`) until the plugin's version changes, so that
+listing sources doesn't import every plugin.
+
+Classes:
+
+    Registry
+
+Functions:
+
+    formatted
+
+"""
+
+import logging
+from collections.abc import MutableMapping
+from importlib import metadata
+
+from pricehist import cache
+
 from .alphavantage import AlphaVantage
 from .bankofcanada import BankOfCanada
+from .basesource import BaseSource
 from .coinbasepro import CoinbasePro
 from .coindesk import CoinDesk
 from .coinmarketcap import CoinMarketCap
 from .ecb import ECB
 from .yahoo import Yahoo
 
-by_id = {
-    source.id(): source
-    for source in [
+GROUP = "pricehist.sources"
+
+
+class Registry(MutableMapping):
+    """Sources by ID, loading plugin sources when they are first looked up."""
+
+    def __init__(self, builtins, entry_points=()):
+        self._sources = {source.id(): source for source in builtins}
+        self._ids = list(self._sources)
+        self._entry_points = {}
+        for entry_point in entry_points:
+            if entry_point.name in self._ids:
+                logging.warning(
+                    f"Ignoring the {entry_point.name} source from "
+                    f"{entry_point.value}, which has a duplicate ID."
+                )
+                continue
+            self._ids.append(entry_point.name)
+            self._entry_points[entry_point.name] = entry_point
+
+    def __getitem__(self, id):
+        if id not in self._sources:
+            if id not in self._entry_points:
+                raise KeyError(id)
+            self._sources[id] = self._load(self._entry_points[id])
+        return self._sources[id]
+
+    def __setitem__(self, id, source):
+        if id not in self._ids:
+            self._ids.append(id)
+        self._sources[id] = source
+
+    def __delitem__(self, id):
+        self._ids.remove(id)
+        self._sources.pop(id, None)
+        self._entry_points.pop(id, None)
+
+    def __contains__(self, id):
+        return id in self._ids
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def available(self):
+        """Return every source, skipping plugins that fail to load."""
+        result = []
+        for id in self._ids:
+            try:
+                result.append(self[id])
+            except Exception as e:
+                logging.warning(f"Skipping the {id} source, which failed to load: {e}")
+        return result
+
+    def name(self, id):
+        """Return the source's name, without loading a plugin if it is cached."""
+        if id in self._sources:
+            return self._sources[id].name()
+        entry_point = self._entry_points[id]
+        data = cache.get(
+            f"plugin-{id}",
+            [entry_point.value, _version(entry_point)],
+            float("inf"),
+            lambda: {"name": self[id].name()},
+        )
+        return data["name"]
+
+    def _load(self, entry_point):
+        logging.debug(f"Loading the {entry_point.name} source {entry_point.value}.")
+        cls = entry_point.load()
+        if not (isinstance(cls, type) and issubclass(cls, BaseSource)):
+            raise TypeError(
+                f"The {entry_point.name} source {entry_point.value} "
+                "is not a BaseSource subclass."
+            )
+        source = cls()
+        if source.id() != entry_point.name:
+            raise ValueError(
+                f"The {entry_point.name} source {entry_point.value} "
+                f"has the ID '{source.id()}'."
+            )
+        return source
+
+
+def _entry_points():
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        return entry_points.select(group=GROUP)
+    return entry_points.get(GROUP, [])
+
+
+def _version(entry_point):
+    # Entry points only know their distribution from Python 3.10. Before that,
+    # a cached name is reused until the entry point itself changes.
+    dist = getattr(entry_point, "dist", None)
+    return dist.version if dist else None
+
+
+by_id = Registry(
+    [
         AlphaVantage(),
         BankOfCanada(),
         CoinbasePro(),
@@ -16,11 +148,18 @@ by_id = {
         CoinMarketCap(),
         ECB(),
         Yahoo(),
-    ]
-}
+    ],
+    _entry_points(),
+)
 
 
 def formatted():
-    width = max([len(k) for k, v in by_id.items()])
-    lines = [k.ljust(width + 4) + v.name() for k, v in by_id.items()]
+    names = {}
+    for id in by_id:
+        try:
+            names[id] = by_id.name(id)
+        except Exception as e:
+            logging.warning(f"Skipping the {id} source, which failed to load: {e}")
+    width = max([len(k) for k in names])
+    lines = [k.ljust(width + 4) + v for k, v in names.items()]
     return "\n".join(lines)
@@ -1,16 +1,14 @@
 import csv
 import dataclasses
-import json
 import logging
 import os
+import threading
 import time
 from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import List, Tuple
 
-import requests
-
-from pricehist import __version__, exceptions
+from pricehist import __version__, exceptions, jsonparse, metrics, trace
 from pricehist.price import Price
 
 from .basesource import BaseSource
@@ -21,6 +19,8 @@ class AlphaVantage(BaseSource):
     API_KEY_NAME = "ALPHAVANTAGE_API_KEY"
     NON_PREMIUM_MAX_RPS = 1
 
+    _non_premium_lock = threading.Lock()
+
     def id(self):
         return "alphavantage"
 
@@ -167,7 +167,7 @@ class AlphaVantage(BaseSource):
             raise exceptions.BadResponse(str(e)) from e
 
         try:
-            data = json.loads(response.content, parse_float=Decimal)
+            data = jsonparse.loads(response.content, amounts_are_strings=True)
         except Exception as e:
             raise exceptions.ResponseParsingError(str(e)) from e
 
@@ -210,7 +210,7 @@ class AlphaVantage(BaseSource):
             raise exceptions.BadResponse(str(e)) from e
 
         try:
-            data = json.loads(response.content, parse_float=Decimal)
+            data = jsonparse.loads(response.content, amounts_are_strings=True)
         except Exception as e:
             raise exceptions.ResponseParsingError(str(e)) from e
 
@@ -261,7 +261,7 @@ class AlphaVantage(BaseSource):
             raise exceptions.BadResponse(str(e)) from e
 
         try:
-            data = json.loads(response.content, parse_float=Decimal)
+            data = jsonparse.loads(response.content, amounts_are_strings=True)
         except Exception as e:
             raise exceptions.ResponseParsingError(str(e)) from e
 
@@ -302,7 +302,7 @@ class AlphaVantage(BaseSource):
             raise exceptions.BadResponse(str(e)) from e
 
         try:
-            data = json.loads(response.content, parse_float=Decimal)
+            data = jsonparse.loads(response.content, amounts_are_strings=True)
         except Exception as e:
             raise exceptions.ResponseParsingError(str(e)) from e
 
@@ -325,10 +325,14 @@ class AlphaVantage(BaseSource):
         return normalized_data
 
     def _query(self, params):
-        if self._using_non_premium_account():
+        if not self._using_non_premium_account():
+            return self.log_curl(self.http_get(self.QUERY_URL, params=params))
+
+        # Held while waiting and requesting, so that requests from concurrent
+        # jobs are spaced out too.
+        with self._non_premium_lock:
             self._non_premium_api_rate_limit()
-        response = self.log_curl(requests.get(self.QUERY_URL, params=params))
-        if self._using_non_premium_account():
+            response = self.log_curl(self.http_get(self.QUERY_URL, params=params))
             self._last_non_premium_api_request = time.monotonic()
         return response
 
@@ -380,7 +384,7 @@ class AlphaVantage(BaseSource):
 
     def _get_symbols(self, url, prefix) -> List[Tuple[str, str]]:
         try:
-            response = self.log_curl(requests.get(url))
+            response = self.log_curl(self.http_get(url))
         except Exception as e:
             raise exceptions.RequestError(str(e)) from e
 
@@ -390,9 +394,10 @@ class AlphaVantage(BaseSource):
             raise exceptions.BadResponse(str(e)) from e
 
         try:
-            lines = response.content.decode("utf-8").splitlines()
-            data = csv.reader(lines[1:], delimiter=",")
-            results = [(s, f"{prefix}{n}") for s, n in data]
+            with metrics.parsing(), trace.span("parse", format="csv"):
+                lines = response.content.decode("utf-8").splitlines()
+                data = csv.reader(lines[1:], delimiter=",")
+                results = [(s, f"{prefix}{n}") for s, n in data]
         except Exception as e:
             raise exceptions.ResponseParsingError(str(e)) from e
 
@@ -1,16 +1,16 @@
 import dataclasses
-import json
 from decimal import Decimal
 
-import requests
-
-from pricehist import exceptions
+from pricehist import exceptions, jsonparse
 from pricehist.price import Price
+from pricehist.schedule import Publication
 
 from .basesource import BaseSource
 
 
 class BankOfCanada(BaseSource):
+    GROUP = "FX_RATES_DAILY"
+
     def id(self):
         return "bankofcanada"
 
@@ -39,11 +39,15 @@ class BankOfCanada(BaseSource):
             "issue in pricehist's Gitlab project. "
         )
 
+    def publication(self):
+        # Exchange rates are published by 16:30 ET on business days.
+        return Publication("16:30", "America/Toronto")
+
     def symbols(self):
         url = "https://www.bankofcanada.ca/valet/lists/series/json"
 
         try:
-            response = self.log_curl(requests.get(url))
+            response = self.log_curl(self.http_get(url))
         except Exception as e:
             raise exceptions.RequestError(str(e)) from e
 
@@ -53,7 +57,7 @@ class BankOfCanada(BaseSource):
             raise exceptions.BadResponse(str(e)) from e
 
         try:
-            data = json.loads(response.content, parse_float=Decimal)
+            data = jsonparse.loads(response.content, amounts_are_strings=True)
             series_names = data["series"].keys()
             fx_series_names = [
                 n for n in series_names if len(n) == 8 and n[0:2] == "FX"
@@ -72,28 +76,72 @@ class BankOfCanada(BaseSource):
             return results
 
     def fetch(self, series):
-        if len(series.base) != 3 or len(series.quote) != 3:
-            raise exceptions.InvalidPair(series.base, series.quote, self)
-
-        series_name = f"FX{series.base}{series.quote}"
-        data = self._data(series, series_name)
-
-        prices = []
+        if series.base == "*":
+            raise exceptions.InvalidPair(
+                series.base, series.quote, self, "Wildcards need fetch_many."
+            )
+        return self.fetch_many([series])[0]
+
+    def fetch_many(self, series_list):
+        wildcard = False
+        names = []
+        for series in series_list:
+            if series.base == "*" and series.quote == "CAD":
+                wildcard = True
+            elif len(series.base) != 3 or len(series.quote) != 3:
+                raise exceptions.InvalidPair(series.base, series.quote, self)
+            elif f"FX{series.base}{series.quote}" not in names:
+                names.append(f"FX{series.base}{series.quote}")
+
+        start = min(series.start for series in series_list)
+        end = max(series.end for series in series_list)
+
+        prices = {}
+        group_names = []
+        if wildcard:
+            data = self._data(f"group/{self.GROUP}", start, end, series_list)
+            group_names = sorted(
+                n for n in data.get("seriesDetail", {}) if n not in names
+            )
+            self._collect(data, prices)
+        missing = [n for n in names if n not in prices]
+        if missing:
+            data = self._data(",".join(missing), start, end, series_list)
+            self._collect(data, prices)
+
+        results = []
+        for series in series_list:
+            if series.base == "*":
+                quoted = [(n[2:5], n[5:8], n) for n in group_names]
+            else:
+                quoted = [(series.base, series.quote, f"FX{series.base}{series.quote}")]
+            for base, quote, name in quoted:
+                everything = dataclasses.replace(
+                    series, base=base, quote=quote, prices=prices.get(name, [])
+                )
+                results.append(everything.slice(series.start, series.end))
+
+        return results
+
+    def _collect(self, data, prices):
+        for name in data.get("seriesDetail", {}):
+            prices.setdefault(name, [])
         for o in data.get("observations", []):
-            prices.append(Price(o["d"], Decimal(o[series_name]["v"])))
-
-        return dataclasses.replace(series, prices=prices)
+            for name, value in o.items():
+                if name != "d" and isinstance(value, dict) and "v" in value:
+                    price = Price(o["d"], Decimal(value["v"]))
+                    prices.setdefault(name, []).append(price)
 
-    def _data(self, series, series_name):
-        url = f"https://www.bankofcanada.ca/valet/observations/{series_name}/json"
+    def _data(self, path, start, end, series_list):
+        url = f"https://www.bankofcanada.ca/valet/observations/{path}/json"
         params = {
-            "start_date": series.start,
-            "end_date": series.end,
+            "start_date": start,
+            "end_date": end,
             "order_dir": "asc",
         }
 
         try:
-            response = self.log_curl(requests.get(url, params=params))
+            response = self.log_curl(self.http_get(url, params=params))
         except Exception as e:
             raise exceptions.RequestError(str(e)) from e
 
@@ -101,12 +149,15 @@ class BankOfCanada(BaseSource):
         text = response.text
 
         try:
-            result = json.loads(response.content, parse_float=Decimal)
+            result = jsonparse.loads(response.content, amounts_are_strings=True)
         except Exception as e:
             raise exceptions.ResponseParsingError(str(e)) from e
 
         if code == 404 and "not found" in text:
-            raise exceptions.InvalidPair(series.base, series.quote, self)
+            invalid = [
+                s for s in series_list if f"FX{s.base}{s.quote}" in text
+            ] or series_list
+            raise exceptions.InvalidPair(invalid[0].base, invalid[0].quote, self)
         elif code == 400 and "End date must be greater than the Start date" in text:
             raise exceptions.BadResponse(result["message"])
         else:
@@ -1,15 +1,20 @@
 import logging
+import os
 from abc import ABC, abstractmethod
 from textwrap import TextWrapper
-from typing import List, Tuple
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
 
 import curlify
 
-from pricehist import exceptions
+from pricehist import exceptions, metrics, recorder, trace
+from pricehist.schedule import Publication
 from pricehist.series import Series
 
 
 class BaseSource(ABC):
+    BASE_URL_NAME = "PRICEHIST_BASE_URL"
+
     @abstractmethod
     def id(self) -> str:
         pass  # pragma: nocover
@@ -52,11 +57,45 @@ class BaseSource(ABC):
     def fetch(self, series: Series) -> Series:
         pass  # pragma: nocover
 
+    def stream(self, series: Series) -> Iterator[Series]:
+        # Sources that get prices in segments override this to yield each
+        # segment, in date order, as soon as it arrives.
+        yield self.fetch(series)
+
+    def fetch_many(self, series_list: List[Series]) -> List[Series]:
+        # Sources that can get several series from one response override this.
+        return [self.fetch(series) for series in series_list]
+
+    def publication(self) -> Optional[Publication]:
+        # Sources that publish each day's prices at a known time override this.
+        return None
+
+    def http_get(self, url, **kwargs):
+        metrics.begin(self.id(), url)
+        base_url = os.getenv(self.BASE_URL_NAME)
+        if base_url:
+            url = self._rebase_url(url, base_url)
+        with trace.span("http", source=self.id(), url=url) as span:
+            with recorder.session() as session:
+                response = session.get(url, **kwargs)
+            span.set(status=response.status_code, bytes=len(response.content))
+            return response
+
     def log_curl(self, response):
         curl = curlify.to_curl(response.request, compressed=True)
         logging.debug(curl)
+        metrics.record_response(self.id(), response)
+        recorder.save(response)
         return response
 
+    def _rebase_url(self, url, base_url):
+        # Keep the path and query but send the request to another server, such
+        # as the stand-in server in pricehist.standin.
+        parts = urlsplit(url)
+        base = urlsplit(base_url)
+        path = base.path.rstrip("/") + parts.path
+        return urlunsplit((base.scheme, base.netloc, path, parts.query, ""))
+
     def format_symbols(self) -> str:
         with exceptions.handler():
             symbols = self.symbols()
@@ -1,12 +1,10 @@
 import dataclasses
-import json
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 
-import requests
-
-from pricehist import exceptions
+from pricehist import exceptions, jsonparse
 from pricehist.price import Price
+from pricehist.schedule import EVERY_DAY, Publication
 
 from .basesource import BaseSource
 
@@ -37,13 +35,17 @@ class CoinbasePro(BaseSource):
             "the feed APIs that provide market data and are public."
         )
 
+    def publication(self):
+        # Daily candles close at midnight UTC.
+        return Publication("00:00", "UTC", EVERY_DAY, days_later=1)
+
     def symbols(self):
         products_url = "https://api.pro.coinbase.com/products"
         currencies_url = "https://api.pro.coinbase.com/currencies"
 
         try:
-            products_response = self.log_curl(requests.get(products_url))
-            currencies_response = self.log_curl(requests.get(currencies_url))
+            products_response = self.log_curl(self.http_get(products_url))
+            currencies_response = self.log_curl(self.http_get(currencies_url))
         except Exception as e:
             raise exceptions.RequestError(str(e)) from e
 
@@ -54,10 +56,8 @@ class CoinbasePro(BaseSource):
             raise exceptions.BadResponse(str(e)) from e
 
         try:
-            products_data = json.loads(products_response.content, parse_float=Decimal)
-            currencies_data = json.loads(
-                currencies_response.content, parse_float=Decimal
-            )
+            products_data = jsonparse.loads(products_response.content)
+            currencies_data = jsonparse.loads(currencies_response.content)
             currencies = {c["id"]: c for c in currencies_data}
 
             results = []
@@ -77,15 +77,15 @@ class CoinbasePro(BaseSource):
             return results
 
     def fetch(self, series):
-        data = []
-        for seg_start, seg_end in self._segments(series.start, series.end):
-            data.extend(self._data(series.base, series.quote, seg_start, seg_end))
+        return series.merge(*self.stream(series))
 
-        prices = []
-        for item in data:
-            prices.append(Price(item["date"], self._amount(item, series.type)))
-
-        return dataclasses.replace(series, prices=prices)
+    def stream(self, series):
+        for seg_start, seg_end in self._segments(series.start, series.end):
+            data = self._data(series.base, series.quote, seg_start, seg_end)
+            prices = [Price(i["date"], self._amount(i, series.type)) for i in data]
+            yield dataclasses.replace(
+                series, start=seg_start, end=seg_end, prices=prices
+            )
 
     def _segments(self, start, end, length=290):
         start = datetime.fromisoformat(start).date()
@@ -110,7 +110,7 @@ class CoinbasePro(BaseSource):
         }
 
         try:
-            response = self.log_curl(requests.get(url, params=params))
+            response = self.log_curl(self.http_get(url, params=params))
         except Exception as e:
             raise exceptions.RequestError(str(e)) from e
 
@@ -145,7 +145,7 @@ class CoinbasePro(BaseSource):
                         "open": candle[3],
                         "close": candle[4],
                     }
-                    for candle in json.loads(response.content, parse_float=Decimal)
+                    for candle in jsonparse.loads(response.content)
                     if start <= self._ts_to_date(candle[0]) <= end
                 ]
             )
@@ -1,12 +1,10 @@
 import dataclasses
-import json
 import logging
 from decimal import Decimal
 
-import requests
-
-from pricehist import exceptions
+from pricehist import exceptions, jsonparse
 from pricehist.price import Price
+from pricehist.schedule import EVERY_DAY, Publication
 
 from .basesource import BaseSource
 
@@ -38,11 +36,15 @@ class CoinDesk(BaseSource):
     def notes(self):
         return ""
 
+    def publication(self):
+        # Each day's close is known at midnight UTC.
+        return Publication("00:00", "UTC", EVERY_DAY, days_later=1)
+
     def symbols(self):
         url = "https://api.coindesk.com/v1/bpi/supported-currencies.json"
 
         try:
-            response = self.log_curl(requests.get(url))
+            response = self.log_curl(self.http_get(url))
         except Exception as e:
             raise exceptions.RequestError(str(e)) from e
 
@@ -52,7 +54,7 @@ class CoinDesk(BaseSource):
             raise exceptions.BadResponse(str(e)) from e
 
         try:
-            data = json.loads(response.content, parse_float=Decimal)
+            data = jsonparse.loads(response.content)
             relevant = [i for i in data if i["currency"] not in ["BTC", "XBT"]]
             results = [
                 (f"BTC/{i['currency']}", f"Bitcoin against {i['country']}")
@@ -92,7 +94,7 @@ class CoinDesk(BaseSource):
         }
 
         try:
-            response = self.log_curl(requests.get(url, params=params))
+            response = self.log_curl(self.http_get(url, params=params))
         except Exception as e:
             raise exceptions.RequestError(str(e)) from e
 
@@ -119,7 +121,7 @@ class CoinDesk(BaseSource):
                 raise exceptions.BadResponse(str(e)) from e
 
         try:
-            result = json.loads(response.content, parse_float=Decimal)
+            result = jsonparse.loads(response.content)
         except Exception as e:
             raise exceptions.ResponseParsingError(str(e)) from e
 
@@ -1,18 +1,19 @@
 import dataclasses
-import json
+import os
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from functools import lru_cache
 
-import requests
-
-from pricehist import exceptions
+from pricehist import cache, exceptions, jsonparse
 from pricehist.price import Price
+from pricehist.schedule import EVERY_DAY, Publication
 
 from .basesource import BaseSource
 
 
 class CoinMarketCap(BaseSource):
+    SYMBOL_DATA_TTL = 24 * 60 * 60
+
     def id(self):
         return "coinmarketcap"
 
@@ -39,12 +40,16 @@ class CoinMarketCap(BaseSource):
             "Each symbol you give will be coverted an ID by checking fiat and "
             "metals first, then crypto by CoinMarketCap rank. "
             "The symbol data is hard-coded for fiat and metals, but fetched "
-            "live for crypto.\n"
+            "for crypto and cached for a day.\n"
             "You can directly use IDs, which can be listed via the --symbols "
             "option. For example, 'ETH/BTC' is 'id=1027/id=1'. "
             "The corresponding symbols will be used in output, when available."
         )
 
+    def publication(self):
+        # Daily quotes close at midnight UTC.
+        return Publication("00:00", "UTC", EVERY_DAY, days_later=1)
+
     def symbols(self):
         data = self._symbol_data()
         ids = [f"id={i['id']}" for i in data]
@@ -52,15 +57,24 @@ class CoinMarketCap(BaseSource):
         return list(zip(ids, descriptions))
 
     def fetch(self, series):
+        segments = list(self.stream(series))
+        output_base, output_quote = segments[0].base, segments[0].quote
+
+        return dataclasses.replace(series, base=output_base, quote=output_quote).merge(
+            *segments
+        )
+
+    def stream(self, series):
         if series.base == "ID=" or not series.quote or series.quote == "ID=":
             raise exceptions.InvalidPair(series.base, series.quote, self)
 
         params = self._params(series)
-        data = dict(params)
-        prices = []
+        output_pair = None
         for start, end in self._segments(series.start, series.end):
             segment_data = self._data(params, start, end)
-            data.update(segment_data)
+            if output_pair is None:
+                output_pair = self._output_pair(series, {**params, **segment_data})
+            prices = []
             for item in segment_data.get("quotes", []):
                 d = item["timeOpen"][0:10]
                 if d < start or d > end:
@@ -68,12 +82,10 @@ class CoinMarketCap(BaseSource):
                 amount = self._amount(item["quote"], series.type)
                 if amount is not None:
                     prices.append(Price(d, amount))
-
-        output_base, output_quote = self._output_pair(data)
-
-        return dataclasses.replace(
-            series, base=output_base, quote=output_quote, prices=prices
-        )
+            base, quote = output_pair
+            yield dataclasses.replace(
+                series, base=base, quote=quote, start=start, end=end, prices=prices
+            )
 
     def _params(self, series):
         params = {}
@@ -125,7 +137,7 @@ class CoinMarketCap(BaseSource):
         params["interval"] = "daily"
 
         try:
-            response = self.log_curl(requests.get(url, params=params))
+            response = self.log_curl(self.http_get(url, params=params))
         except Exception as e:
             raise exceptions.RequestError(str(e)) from e
 
@@ -148,7 +160,7 @@ class CoinMarketCap(BaseSource):
             raise exceptions.BadResponse(str(e)) from e
 
         try:
-            parsed = json.loads(response.content, parse_float=Decimal)
+            parsed = jsonparse.loads(response.content)
         except Exception as e:
             raise exceptions.ResponseParsingError(str(e)) from e
 
@@ -184,30 +196,64 @@ class CoinMarketCap(BaseSource):
         else:
             return None
 
-    def _output_pair(self, data):
-        symbols = {i["id"]: (i["symbol"] or i["code"]) for i in self._symbol_data()}
-
-        data_base = data.get("symbol") or symbols[int(data["id"])]
-        data_quote = symbols[int(data["convertId"])]
+    def _output_pair(self, series, data):
+        data_base = data.get("symbol") or self._symbol_from_id(int(data["id"]))
+        if series.quote.startswith("ID="):
+            data_quote = self._symbol_from_id(int(data["convertId"]))
+        else:
+            data_quote = series.quote
 
         return (data_base, data_quote)
 
     def _id_from_symbol(self, symbol, series):
-        for i in self._symbol_data():
-            if i["symbol"] == symbol:
-                return i["id"]
+        # Fiat and metals take precedence, so crypto is only looked up if needed.
+        for crypto in [False, True]:
+            by_symbol, _ = self._symbol_index(crypto)
+            if symbol in by_symbol:
+                return by_symbol[symbol]["id"]
         raise exceptions.InvalidPair(
             series.base, series.quote, self, f"Invalid symbol '{symbol}'."
         )
 
-    @lru_cache(maxsize=1)
+    def _symbol_from_id(self, id):
+        for crypto in [False, True]:
+            _, by_id = self._symbol_index(crypto)
+            if id in by_id:
+                return by_id[id]["symbol"] or by_id[id]["code"]
+        return f"ID={id}"
+
+    @lru_cache(maxsize=2)
+    def _symbol_index(self, crypto):
+        data = self._symbol_data() if crypto else self._fixed_symbol_data()
+        by_symbol = {}
+        by_id = {}
+        for i in data:
+            by_symbol.setdefault(i["symbol"], i)
+            by_id.setdefault(i["id"], i)
+        return (by_symbol, by_id)
+
     def _symbol_data(self):
+        return self._fixed_symbol_data() + self._crypto_symbol_data()
 
+    @lru_cache(maxsize=1)
+    def _crypto_symbol_data(self):
         base_url = "https://api.coinmarketcap.com/data-api/v1/"
         crypto_url = f"{base_url}cryptocurrency/map?sort=cmc_rank"
 
-        crypto = self._get_json_data(crypto_url)
+        # The cached data depends on the server actually used.
+        key = crypto_url
+        if os.getenv(self.BASE_URL_NAME):
+            key = self._rebase_url(crypto_url, os.getenv(self.BASE_URL_NAME))
+
+        def load():
+            fields = ["id", "symbol", "code", "name"]
+            crypto = self._get_json_data(crypto_url)
+            return [{f: i[f] for f in fields if f in i} for i in crypto]
 
+        return cache.get("coinmarketcap-crypto", key, self.SYMBOL_DATA_TTL, load)
+
+    @lru_cache(maxsize=1)
+    def _fixed_symbol_data(self):
         # fmt: off
         fiat = [
             {"id": 2781, "symbol": "USD", "name": "United States Dollar"},
@@ -312,11 +358,11 @@ class CoinMarketCap(BaseSource):
         ]
         # fmt: on
 
-        return fiat + metals + crypto
+        return fiat + metals
 
     def _get_json_data(self, url, params={}):
         try:
-            response = self.log_curl(requests.get(url, params=params))
+            response = self.log_curl(self.http_get(url, params=params))
         except Exception as e:
             raise exceptions.RequestError(str(e)) from e
 
@@ -326,7 +372,7 @@ class CoinMarketCap(BaseSource):
             raise exceptions.BadResponse(str(e)) from e
 
         try:
-            parsed = json.loads(response.content, parse_float=Decimal)
+            parsed = jsonparse.loads(response.content)
         except Exception as e:
             raise exceptions.ResponseParsingError(str(e)) from e
 
@@ -2,11 +2,11 @@ import dataclasses
 from datetime import datetime, timedelta
 from decimal import Decimal
 
-import requests
 from lxml import etree
 
-from pricehist import exceptions, isocurrencies
+from pricehist import exceptions, isocurrencies, metrics, trace
 from pricehist.price import Price
+from pricehist.schedule import Publication
 
 from .basesource import BaseSource
 
@@ -33,6 +33,10 @@ class ECB(BaseSource):
     def notes(self):
         return ""
 
+    def publication(self):
+        # Reference rates are published around 16:00 CET on working days.
+        return Publication("16:00", "Europe/Berlin")
+
     def symbols(self):
         quotes = self._quotes()
         iso = isocurrencies.by_code()
@@ -42,27 +46,49 @@ class ECB(BaseSource):
         ]
 
     def fetch(self, series):
-        if series.base != "EUR" or not series.quote:  # EUR is the only valid base.
-            raise exceptions.InvalidPair(series.base, series.quote, self)
+        if series.quote == "*":
+            raise exceptions.InvalidPair(
+                series.base, series.quote, self, "Wildcards need fetch_many."
+            )
+        return self.fetch_many([series])[0]
+
+    def fetch_many(self, series_list):
+        for series in series_list:
+            if series.base != "EUR" or not series.quote:  # EUR is the only base.
+                raise exceptions.InvalidPair(series.base, series.quote, self)
 
         almost_90_days_ago = (datetime.now().date() - timedelta(days=85)).isoformat()
-        root = self._data(series.start < almost_90_days_ago)
+        earliest = min(series.start for series in series_list)
+        root = self._data(earliest < almost_90_days_ago)
 
-        all_rows = []
+        wanted = {series.quote for series in series_list}
+        wildcard = "*" in wanted
+        all_prices = {}
         for day in root.cssselect("[time]"):
             date = day.attrib["time"]
-            for row in day.cssselect(f"[currency='{series.quote}']"):
-                rate = Decimal(row.attrib["rate"])
-                all_rows.insert(0, (date, rate))
-
-        if not all_rows and series.quote not in self._quotes():
-            raise exceptions.InvalidPair(series.base, series.quote, self)
-
-        selected = [
-            Price(d, r) for d, r in all_rows if d >= series.start and d <= series.end
-        ]
-
-        return dataclasses.replace(series, prices=selected)
+            for row in day.cssselect("[currency]"):
+                currency = row.attrib["currency"]
+                if wildcard or currency in wanted:
+                    price = Price(date, Decimal(row.attrib["rate"]))
+                    all_prices.setdefault(currency, []).append(price)
+        for prices in all_prices.values():
+            prices.sort(key=lambda p: p.date)  # Usually in reverse order.
+
+        results = []
+        for series in series_list:
+            if series.quote == "*":
+                quotes = [q for q in sorted(all_prices) if q not in wanted]
+            else:
+                quotes = [series.quote]
+            for quote in quotes:
+                if quote not in all_prices and quote not in self._quotes():
+                    raise exceptions.InvalidPair(series.base, quote, self)
+                everything = dataclasses.replace(
+                    series, quote=quote, prices=all_prices.get(quote, [])
+                )
+                results.append(everything.slice(series.start, series.end))
+
+        return results
 
     def _quotes(self):
         root = self._data(more_than_90_days=True)
@@ -80,7 +106,7 @@ class ECB(BaseSource):
             source_url = f"{url_base}/eurofxref-hist-90d.xml"  # last 90 days
 
         try:
-            response = self.log_curl(requests.get(source_url))
+            response = self.log_curl(self.http_get(source_url))
         except Exception as e:
             raise exceptions.RequestError(str(e)) from e
 
@@ -90,7 +116,8 @@ class ECB(BaseSource):
             raise exceptions.BadResponse(str(e)) from e
 
         try:
-            root = etree.fromstring(response.content)
+            with metrics.parsing(), trace.span("parse", format="xml"):
+                root = etree.fromstring(response.content)
         except Exception as e:
             raise exceptions.ResponseParsingError(str(e)) from e
 
@@ -1,10 +1,7 @@
 import dataclasses
-import json
 from decimal import Decimal
 
-import requests
-
-from pricehist import exceptions
+from pricehist import exceptions, jsonparse
 from pricehist.price import Price
 
 from .basesource import BaseSource
@@ -40,7 +37,7 @@ class ExchangeRateHost(BaseSource):
         url = "https://api.coindesk.com/v1/bpi/supported-currencies.json"
 
         try:
-            response = self.log_curl(requests.get(url))
+            response = self.log_curl(self.http_get(url))
         except Exception as e:
             raise exceptions.RequestError(str(e)) from e
 
@@ -50,7 +47,7 @@ class ExchangeRateHost(BaseSource):
             raise exceptions.BadResponse(str(e)) from e
 
         try:
-            data = json.loads(response.content, parse_float=Decimal)
+            data = jsonparse.loads(response.content)
             relevant = [i for i in data if i["currency"] not in ["BTC", "XBT"]]
             results = [
                 (f"BTC/{i['currency']}", f"Bitcoin against {i['country']}")
@@ -88,7 +85,7 @@ class ExchangeRateHost(BaseSource):
         }
 
         try:
-            response = self.log_curl(requests.get(url, params=params))
+            response = self.log_curl(self.http_get(url, params=params))
         except Exception as e:
             raise exceptions.RequestError(str(e)) from e
 
@@ -115,7 +112,7 @@ class ExchangeRateHost(BaseSource):
                 raise exceptions.BadResponse(str(e)) from e
 
         try:
-            result = json.loads(response.content, parse_float=Decimal)
+            result = jsonparse.loads(response.content)
         except Exception as e:
             raise exceptions.ResponseParsingError(str(e)) from e
 
@@ -1,12 +1,9 @@
 import dataclasses
-import json
 import logging
 from datetime import datetime, timezone
 from decimal import Decimal
 
-import requests
-
-from pricehist import __version__, exceptions
+from pricehist import __version__, exceptions, jsonparse
 from pricehist.price import Price
 
 from .basesource import BaseSource
@@ -144,7 +141,7 @@ class Yahoo(BaseSource):
         }
 
         try:
-            response = self.log_curl(requests.get(url, params=params, headers=headers))
+            response = self.log_curl(self.http_get(url, params=params, headers=headers))
         except Exception as e:
             raise exceptions.RequestError(str(e)) from e
 
@@ -171,7 +168,7 @@ class Yahoo(BaseSource):
             raise exceptions.BadResponse(str(e)) from e
 
         try:
-            data = json.loads(response.content, parse_float=Decimal)
+            data = jsonparse.loads(response.content)
         except Exception as e:
             raise exceptions.ResponseParsingError(
                 "The data couldn't be parsed. "
@@ -0,0 +1,498 @@
+"""
+Stand-in server
+
+A local HTTP server that emulates the endpoints used by each source, serving
+synthetic data, so that the full fetch pipeline can be exercised and measured
+without depending on upstream services.
+
+Run it and point sources at it via the ``PRICEHIST_BASE_URL`` environment
+variable::
+
+    python -m pricehist.standin --port 8765 --years 30 --latency 0.05
+    PRICEHIST_BASE_URL=http://127.0.0.1:8765 pricehist fetch ecb EUR/USD
+
+Prices follow a deterministic random walk for each series, so repeated runs
+with the same seed see the same data. Every series covers the given number of
+years up to today, with weekends skipped except for crypto data. A latency can
+be added to each response and a fraction of responses can be made to fail with
+HTTP status 503.
+
+Classes:
+
+    Market
+    StandIn
+
+Functions:
+
+    main
+
+"""
+
+import argparse
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from pricehist import logger
+
+# fmt: off
+FIAT = [
+    "AUD", "BGN", "BRL", "CAD", "CHF", "CNY", "CZK", "DKK", "EUR", "GBP", "HKD",
+    "HUF", "IDR", "ILS", "INR", "ISK", "JPY", "KRW", "MXN", "MYR", "NOK", "NZD",
+    "PHP", "PLN", "RON", "SEK", "SGD", "THB", "TRY", "USD", "ZAR",
+]
+CRYPTO = {
+    "BTC": (1, "Bitcoin"),
+    "LTC": (2, "Litecoin"),
+    "XRP": (52, "XRP"),
+    "DOGE": (74, "Dogecoin"),
+    "ETH": (1027, "Ethereum"),
+    "ADA": (2010, "Cardano"),
+    "SOL": (5426, "Solana"),
+    "DOT": (6636, "Polkadot"),
+}
+# fmt: on
+
+DAY = timedelta(days=1)
+
+
+class Market:
+    def __init__(self, years=30, seed=0, today=None):
+        self.end = today or date.today()
+        self.start = self.end - timedelta(days=round(years * 365.25))
+        self.seed = seed
+        self._days = {}
+        self._lock = threading.Lock()
+
+    def ohlc(self, key, start, end, weekdays=True):
+        """Return (date, open, high, low, close) rows for the key, in order."""
+        days = self._history(key)
+        dates = [d[0] for d in days]
+        rows = days[bisect_left(dates, start) : bisect_right(dates, end)]
+        if weekdays:
+            rows = [r for r in rows if date.fromisoformat(r[0]).weekday() < 5]
+        return rows
+
+    def _history(self, key):
+        with self._lock:
+            if key not in self._days:
+                self._days[key] = self._walk(key)
+            return self._days[key]
+
+    def _walk(self, key):
+        rng = random.Random(f"{self.seed}:{key}")
+        close = 10 ** rng.uniform(-1, 4)
+        days = []
+        d = self.start
+        while d <= self.end:
+            o = close
+            close = o * math.exp(rng.gauss(0, 0.01))
+            high = max(o, close) * (1 + abs(rng.gauss(0, 0.004)))
+            low = min(o, close) * (1 - abs(rng.gauss(0, 0.004)))
+            days.append((d.isoformat(), o, high, low, close))
+            d += DAY
+        return days
+
+
+class StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, market, latency=0, error_rate=0, seed=0):
+        super().__init__(address, Handler)
+        self.market = market
+        self.latency = latency
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bodies = {}
+
+    def base_url(self):
+        host, port = self.server_address[0:2]
+        return f"http://{host}:{port}"
+
+    def should_fail(self):
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def body(self, key, build):
+        with self._lock:
+            if key not in self._bodies:
+                self._bodies[key] = build()
+            return self._bodies[key]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if self.server.should_fail():
+            self._send(503, "text/plain", "Service Unavailable (stand-in)")
+            return
+
+        for pattern, method in ROUTES:
+            match = re.fullmatch(pattern, url.path)
+            if match:
+                status, content_type, body = method(self, match, params)
+                self._send(status, content_type, body)
+                return
+
+        self._send(404, "text/plain", f"Not found: {url.path}")
+
+    def log_message(self, format, *args):
+        logging.debug(f"Stand-in: {format % args}")
+
+    def _send(self, status, content_type, body):
+        if not isinstance(body, bytes):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, data, status=200):
+        return (status, "application/json", json.dumps(data))
+
+    @property
+    def market(self):
+        return self.server.market
+
+    # ECB
+
+    def ecb_hist(self, match, params):
+        body = self.server.body(match[0], lambda: self._ecb_xml(bool(match[1])))
+        return (200, "text/xml", body)
+
+    def _ecb_xml(self, last_90_days):
+        end = self.market.end
+        start = end - timedelta(days=90) if last_90_days else self.market.start
+        rates = {
+            c: self.market.ohlc(f"ecb:{c}", start.isoformat(), end.isoformat())
+            for c in FIAT
+            if c != "EUR"
+        }
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<gesmes:Envelope xmlns:gesmes="http://www.gesmes.org/xml/2002-08-01" '
+            'xmlns="http://www.ecb.int/vocabulary/2002-08-01/eurofxref">',
+            "<gesmes:subject>Reference rates</gesmes:subject>",
+            "<Cube>",
+        ]
+        days = [r[0] for r in rates["USD"]]
+        for i in reversed(range(len(days))):
+            lines.append(f'<Cube time="{days[i]}">')
+            for c, rows in rates.items():
+                lines.append(f'<Cube currency="{c}" rate="{rows[i][4]:.4f}"/>')
+            lines.append("</Cube>")
+        lines += ["</Cube>", "</gesmes:Envelope>"]
+        return "\n".join(lines)
+
+    # Bank of Canada
+
+    def boc_series_list(self, match, params):
+        series = {
+            f"FX{c}CAD": {
+                "label": f"{c}/CAD",
+                "description": f"{c} to Canadian dollar daily exchange rate",
+            }
+            for c in FIAT
+            if c != "CAD"
+        }
+        return self._json({"series": series})
+
+    def boc_observations(self, match, params):
+        names = match[1].split(",")
+        known = [f"FX{c}CAD" for c in FIAT if c != "CAD"]
+        for name in names:
+            if name not in known:
+                return (404, "application/json", f'{{"message": "{name} not found"}}')
+        return self._boc_observations(names, params)
+
+    def boc_group_observations(self, match, params):
+        if match[1] != "FX_RATES_DAILY":
+            return (404, "application/json", f'{{"message": "{match[1]} not found"}}')
+        names = [f"FX{c}CAD" for c in FIAT if c != "CAD"]
+        return self._boc_observations(names, params)
+
+    def _boc_observations(self, names, params):
+        start = params.get("start_date", self.market.start.isoformat())
+        end = params.get("end_date", self.market.end.isoformat())
+        if end < start:
+            message = "End date must be greater than the Start date"
+            return self._json({"message": message}, 400)
+        rows = {n: self.market.ohlc(f"boc:{n}", start, end) for n in names}
+        observations = [
+            {"d": r[0], **{n: {"v": f"{rows[n][i][4]:.4f}"} for n in names}}
+            for i, r in enumerate(rows[names[0]])
+        ]
+        if params.get("order_dir") == "desc":
+            observations.reverse()
+        details = {n: {"label": f"{n[2:5]}/{n[5:8]}"} for n in names}
+        return self._json({"seriesDetail": details, "observations": observations})
+
+    # Coinbase Pro
+
+    def coinbasepro_products(self, match, params):
+        products = [
+            {"id": f"{b}-{q}", "base_currency": b, "quote_currency": q}
+            for b in CRYPTO
+            for q in ["USD", "EUR", "GBP"]
+        ]
+        return self._json(products)
+
+    def coinbasepro_currencies(self, match, params):
+        names = {c: name for c, (_, name) in CRYPTO.items()}
+        names.update({"USD": "United States Dollar", "EUR": "Euro", "GBP": "Pound"})
+        return self._json([{"id": c, "name": n} for c, n in names.items()])
+
+    def coinbasepro_candles(self, match, params):
+        base, quote = match[1], match[2]
+        if base not in CRYPTO or quote not in FIAT + list(CRYPTO):
+            return self._json({"message": "NotFound"}, 404)
+        start, end = params["start"][0:10], params["end"][0:10]
+        if end < start:
+            return self._json({"message": "start must be before end"}, 400)
+        if (date.fromisoformat(end) - date.fromisoformat(start)).days >= 300:
+            message = (
+                "granularity too small for the requested time range. "
+                "Count of aggregations requested exceeds 300"
+            )
+            return self._json({"message": message}, 400)
+        rows = self.market.ohlc(f"crypto:{base}-{quote}", start, end, weekdays=False)
+        candles = [
+            [_ts(d), round(lo, 2), round(hi, 2), round(o, 2), round(c, 2), 100.0]
+            for d, o, hi, lo, c in reversed(rows)
+        ]
+        return self._json(candles)
+
+    # CoinDesk
+
+    def coindesk_currencies(self, match, params):
+        return self._json([{"currency": c, "country": c} for c in FIAT])
+
+    def coindesk_close(self, match, params):
+        quote = params.get("currency", "USD")
+        if quote not in FIAT:
+            return (404, "text/plain", "Sorry, that currency was not found")
+        start = params.get("start", self.market.start.isoformat())
+        end = params.get("end", self.market.end.isoformat())
+        rows = self.market.ohlc(f"crypto:BTC-{quote}", start, end, weekdays=False)
+        return self._json({"bpi": {d: round(c, 4) for d, _, _, _, c in rows}})
+
+    # CoinMarketCap
+
+    def coinmarketcap_map(self, match, params):
+        data = [
+            {"id": i, "symbol": s, "name": name, "rank": rank + 1}
+            for rank, (s, (i, name)) in enumerate(CRYPTO.items())
+        ]
+        return self._json({"data": data})
+
+    def coinmarketcap_historical(self, match, params):
+        by_id = {str(i): (s, name) for s, (i, name) in CRYPTO.items()}
+        if params.get("id") not in by_id:
+            return self._json({"status": {"error_message": "No items found."}}, 400)
+        symbol, name = by_id[params["id"]]
+        time_end = datetime.fromtimestamp(int(params["timeEnd"]), tz=timezone.utc)
+        time_start = datetime.fromtimestamp(int(params["timeStart"]), tz=timezone.utc)
+        end = time_end.date()
+        start = max(time_start.date() + DAY, end - timedelta(days=399))
+        key = f"crypto:{params['id']}-{params.get('convertId')}"
+        rows = self.market.ohlc(key, start.isoformat(), end.isoformat(), weekdays=False)
+        quotes = [
+            {
+                "timeOpen": f"{d}T00:00:00.000Z",
+                "timeClose": f"{d}T23:59:59.999Z",
+                "quote": {
+                    "name": params.get("convertId"),
+                    "open": o,
+                    "high": hi,
+                    "low": lo,
+                    "close": c,
+                    "volume": 1000000.0,
+                    "timestamp": f"{d}T23:59:59.999Z",
+                },
+            }
+            for d, o, hi, lo, c in rows
+        ]
+        data = {"id": int(params["id"]), "name": name, "symbol": symbol}
+        return self._json({"data": {**data, "quotes": quotes}})
+
+    # Alpha Vantage
+
+    def alphavantage_list(self, match, params):
+        if match[1] == "physical":
+            rows = [(c, c) for c in FIAT]
+        else:
+            rows = [(c, name) for c, (_, name) in CRYPTO.items()]
+        lines = ["currency code,currency name"] + [f"{c},{n}" for c, n in rows]
+        return (200, "text/csv", "\n".join(lines) + "\n")
+
+    def alphavantage_query(self, match, params):
+        function = params.get("function")
+        end = self.market.end.isoformat()
+        if params.get("outputsize") == "compact":
+            start = (self.market.end - timedelta(days=140)).isoformat()
+        else:
+            start = self.market.start.isoformat()
+
+        if function == "SYMBOL_SEARCH":
+            symbol = params.get("keywords", "").upper()
+            best = {
+                "1. symbol": symbol,
+                "2. name": f"{symbol} Stand-in Inc",
+                "3. type": "Equity",
+                "4. region": "United States",
+                "8. currency": "USD",
+                "9. matchScore": "1.0000",
+            }
+            return self._json({"bestMatches": [best]})
+
+        elif function in ["TIME_SERIES_DAILY", "TIME_SERIES_DAILY_ADJUSTED"]:
+            rows = self.market.ohlc(f"stock:{params.get('symbol')}", start, end)
+            series = _av_series(rows)
+            if function == "TIME_SERIES_DAILY_ADJUSTED":
+                for entries in series.values():
+                    entries["5. adjusted close"] = entries["4. close"]
+            return self._json({"Time Series (Daily)": series})
+
+        elif function == "FX_DAILY":
+            key = f"fx:{params.get('from_symbol')}-{params.get('to_symbol')}"
+            rows = self.market.ohlc(key, start, end)
+            return self._json({"Time Series FX (Daily)": _av_series(rows)})
+
+        elif function == "DIGITAL_CURRENCY_DAILY":
+            key = f"crypto:{params.get('symbol')}-{params.get('market')}"
+            rows = self.market.ohlc(key, start, end, weekdays=False)
+            return self._json(
+                {"Time Series (Digital Currency Daily)": _av_series(rows)}
+            )
+
+        else:
+            message = "Invalid API call."
+            return self._json({"Error Message": message})
+
+    # Yahoo! Finance
+
+    def yahoo_chart(self, match, params):
+        symbol = match[1]
+        start = datetime.fromtimestamp(int(params["period1"]), tz=timezone.utc)
+        end = datetime.fromtimestamp(int(params["period2"]), tz=timezone.utc)
+        rows = self.market.ohlc(
+            f"stock:{symbol}", start.date().isoformat(), (end.date() - DAY).isoformat()
+        )
+        result = {"meta": {"currency": "USD", "symbol": symbol, "gmtoffset": -14400}}
+        if rows:
+            # Timestamps are for the market open, 09:30 at UTC-4.
+            result["timestamp"] = [_ts(r[0]) + 48600 for r in rows]
+            columns = list(zip(*[[round(v, 4) for v in r[1:]] for r in rows]))
+            quote = dict(zip(["open", "high", "low", "close"], columns))
+            quote["volume"] = [1000000] * len(rows)
+            result["indicators"] = {
+                "quote": [quote],
+                "adjclose": [{"adjclose": quote["close"]}],
+            }
+        return self._json({"chart": {"result": [result], "error": None}})
+
+
+ROUTES = [
+    (r"/stats/eurofxref/eurofxref-hist(-90d)?\.xml", Handler.ecb_hist),
+    (r"/valet/lists/series/json", Handler.boc_series_list),
+    (r"/valet/observations/([A-Z,]+)/json", Handler.boc_observations),
+    (r"/valet/observations/group/([A-Z_]+)/json", Handler.boc_group_observations),
+    (r"/products", Handler.coinbasepro_products),
+    (r"/currencies", Handler.coinbasepro_currencies),
+    (r"/products/([A-Z]+)-([A-Z]+)/candles", Handler.coinbasepro_candles),
+    (r"/v1/bpi/supported-currencies\.json", Handler.coindesk_currencies),
+    (r"/v1/bpi/historical/close\.json", Handler.coindesk_close),
+    (r"/data-api/v1/cryptocurrency/map", Handler.coinmarketcap_map),
+    (r"/data-api/v3\.1/cryptocurrency/historical", Handler.coinmarketcap_historical),
+    (r"/(physical|digital)_currency_list/", Handler.alphavantage_list),
+    (r"/query", Handler.alphavantage_query),
+    (r"/v8/finance/chart/([^/]+)", Handler.yahoo_chart),
+]
+
+
+def _ts(day):
+    return int(datetime.fromisoformat(day).replace(tzinfo=timezone.utc).timestamp())
+
+
+def _av_series(rows):
+    return {
+        d: {
+            "1. open": f"{o:.4f}",
+            "2. high": f"{hi:.4f}",
+            "3. low": f"{lo:.4f}",
+            "4. close": f"{c:.4f}",
+        }
+        for d, o, hi, lo, c in reversed(rows)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m pricehist.standin",
+        description="Serve synthetic data for all pricehist sources",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="default: 127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="default: 8765")
+    parser.add_argument(
+        "--years", type=float, default=30, help="years of history (default: 30)"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0, help="seconds per response (default: 0)"
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0,
+        help="fraction of responses that fail (default: 0)",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="random seed for data (default: 0)"
+    )
+    parser.add_argument(
+        "-vvv", "--verbose", action="store_true", help="log each request"
+    )
+    args = parser.parse_args(argv)
+
+    logger.init()
+    if args.verbose:
+        logger.show_debug()
+
+    market = Market(years=args.years, seed=args.seed)
+    server = StandIn(
+        (args.host, args.port),
+        market,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    logging.info(
+        f"Serving stand-in data from {market.start} to {market.end} at "
+        f"{server.base_url()}. Set PRICEHIST_BASE_URL to use it."
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
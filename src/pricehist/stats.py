@@ -0,0 +1,134 @@
+"""
+Price statistics
+
+Summary statistics for fetched series, computed with `NumPy
+<https://numpy.org/>`_ over each series' dates and amounts, so that they
+don't need to be exported and reloaded elsewhere. Each series gives one row:
+
+* ``start`` and ``end``: the dates of the first and last prices.
+* ``rows``: the number of prices.
+* ``min`` and ``max``: the lowest and highest amounts, as given by the source.
+* ``log_return``: the log of the last amount over the first.
+* ``mean_log_return`` and ``volatility``: the mean and sample standard
+  deviation of the log returns from each price to the next.
+* ``last_window_mean`` and ``last_window_volatility``: the mean of the last
+  WINDOW amounts and the volatility of the last WINDOW log returns.
+* ``max_drawdown``: the largest fall from a previous high, as a fraction of
+  that high.
+* ``gaps`` and ``missing_weekdays``: the number of gaps between prices that
+  skip over weekdays, and the number of weekdays skipped.
+
+Statistics that need more prices than the series has are left empty. Log
+returns are per price, not annualized. Prices are fetched as for the fetch
+command, with the same warnings about dates they don't cover.
+
+NumPy is optional, and installed with the ``stats`` extra.
+
+Functions:
+
+    compute
+    format_stats
+
+"""
+
+import csv
+import io
+import json
+import math
+
+from pricehist import trace
+from pricehist.fetch import fetch_series
+
+try:
+    import numpy
+except ImportError:  # pragma: nocover
+    numpy = None
+
+COLUMNS = [
+    "base",
+    "quote",
+    "type",
+    "start",
+    "end",
+    "rows",
+    "min",
+    "max",
+    "log_return",
+    "mean_log_return",
+    "volatility",
+    "last_window_mean",
+    "last_window_volatility",
+    "max_drawdown",
+    "gaps",
+    "missing_weekdays",
+]
+
+FORMATS = ["csv", "json"]
+
+
+def missing_dependency():
+    return "numpy" if numpy is None else None
+
+
+def compute(series, window=20):
+    """Return a dict of statistics for the series, keyed by column name."""
+    prices = series.prices
+    n = len(prices)
+    amounts = numpy.fromiter((p.amount for p in prices), dtype=numpy.float64, count=n)
+    dates = numpy.array([p.date for p in prices], dtype="datetime64[D]")
+
+    if n > 1:
+        skipped = numpy.busday_count(dates[:-1] + 1, dates[1:])
+    else:
+        skipped = numpy.zeros(0, dtype=numpy.int64)
+
+    # Amounts that aren't positive give infinite or NaN results, not errors.
+    with numpy.errstate(all="ignore"):
+        returns = numpy.diff(numpy.log(amounts))
+        highs = numpy.maximum.accumulate(amounts) if n else amounts
+        drawdowns = 1 - amounts / highs
+        return {
+            "base": series.base,
+            "quote": series.quote,
+            "type": series.type,
+            "start": prices[0].date if n else None,
+            "end": prices[-1].date if n else None,
+            "rows": n,
+            "min": prices[int(amounts.argmin())].amount if n else None,
+            "max": prices[int(amounts.argmax())].amount if n else None,
+            "log_return": _float(returns.sum()) if n > 1 else None,
+            "mean_log_return": _float(returns.mean()) if n > 1 else None,
+            "volatility": _float(returns.std(ddof=1)) if n > 2 else None,
+            "last_window_mean": (
+                _float(amounts[-window:].mean()) if n >= window else None
+            ),
+            "last_window_volatility": (
+                _float(returns[-window:].std(ddof=1)) if n > window else None
+            ),
+            "max_drawdown": _float(drawdowns.max()) if n else None,
+            "gaps": int((skipped > 0).sum()),
+            "missing_weekdays": int(skipped.sum()),
+        }
+
+
+def format_stats(series_list, source, window=20, output="csv"):
+    results = fetch_series(series_list, source)
+
+    with trace.span("stats", window=window):
+        rows = [compute(series, window) for series in results]
+
+    if output == "json":
+        return json.dumps(rows, indent=2, ensure_ascii=False, default=str) + "\n"
+
+    text = io.StringIO()
+    writer = csv.writer(text, lineterminator="\n")
+    writer.writerow(COLUMNS)
+    for row in rows:
+        writer.writerow(["" if row[c] is None else row[c] for c in COLUMNS])
+    return text.getvalue()
+
+
+def _float(value):
+    # Results from amounts that aren't positive are left empty.
+    value = float(value)
+    return value if math.isfinite(value) else None
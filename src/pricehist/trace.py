@@ -0,0 +1,110 @@
+"""
+Tracing of pricehist runs
+
+When tracing is started, nested spans are recorded for the phases of a run:
+the command as a whole, each fetch, the source's HTTP requests and parsing,
+transformations such as inverting and quantizing, and output formatting. Each
+span has attributes such as the pair, date range and number of rows.
+
+Traces are written as JSON in the Trace Event Format, which can be loaded
+into trace viewers such as `Perfetto <https://ui.perfetto.dev/>`_ or
+``chrome://tracing``. Spans in the same thread are nested by their times.
+
+When tracing hasn't been started, spans do nothing.
+
+Functions:
+
+    start
+    stop
+    span
+    write
+
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_events = None
+_origin = 0
+
+
+class Span:
+    def __init__(self, attributes):
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+class _NoSpan:
+    def set(self, **attributes):
+        pass
+
+
+_no_span = _NoSpan()
+
+
+def start():
+    global _events, _origin
+    with _lock:
+        _events = []
+        _origin = time.perf_counter_ns()
+
+
+def stop():
+    global _events
+    with _lock:
+        _events = None
+
+
+@contextmanager
+def span(name, **attributes):
+    """Record a span around the enclosed code.
+
+    The yielded span's set() method adds attributes known only later, such as
+    the number of rows produced. Exceptions are noted in an error attribute.
+    """
+    if _events is None:
+        yield _no_span
+        return
+
+    s = Span(attributes)
+    begin = time.perf_counter_ns()
+    try:
+        yield s
+    except BaseException as e:
+        s.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        end = time.perf_counter_ns()
+        event = {
+            "name": name,
+            "cat": "pricehist",
+            "ph": "X",
+            "ts": (begin - _origin) / 1000,
+            "dur": (end - begin) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": s.attributes,
+        }
+        with _lock:
+            if _events is not None:
+                _events.append(event)
+
+
+def write(path):
+    with _lock:
+        events = list(_events or [])
+    process = {
+        "name": "process_name",
+        "ph": "M",
+        "pid": os.getpid(),
+        "args": {"name": "pricehist"},
+    }
+    data = {"traceEvents": [process] + events, "displayTimeUnit": "ms"}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, default=str)
@@ -0,0 +1,143 @@
+"""
+Watching for new prices
+
+The jobs of a job file (see :mod:`pricehist.jobs`) can be kept up to date by a
+long-running process. On start, each job's output file is written with all
+prices from the job's start date. After that, only newer prices are fetched,
+and they are appended to the output file.
+
+Each source is polled shortly after it is expected to publish new prices,
+according to its :meth:`BaseSource.publication` schedule, and prices are only
+requested up to the most recently published date. If an expected price hasn't
+appeared yet, because publication is late or it was a holiday, the source is
+polled again after increasing delays until the next publication is due.
+Sources without a known schedule are polled at a fixed interval, for prices up
+to the previous day.
+
+Jobs whose polls are due at the same time are run together, so that jobs that
+share a download still share it.
+
+Classes:
+
+    Watcher
+
+Functions:
+
+    watch
+
+"""
+
+import logging
+import time
+from dataclasses import replace
+from datetime import date, datetime, timedelta, timezone
+
+from pricehist import jobs
+
+# Time after a scheduled publication before polling, as publication can vary.
+DELAY = timedelta(minutes=5)
+
+# First delay before polling again for a price that hasn't appeared yet.
+RETRY = timedelta(minutes=10)
+
+
+class Watcher:
+    def __init__(self, job_list, workers=8, interval=timedelta(hours=6)):
+        for job in job_list:
+            _check(job)
+        self.jobs = job_list
+        self.workers = workers
+        self.interval = interval
+        self._last = {job.name: [None] * len(job.series_list) for job in job_list}
+        start = datetime.min.replace(tzinfo=timezone.utc)
+        self._due = {job.name: start for job in job_list}
+        self._retry = {}
+        self._written = set()
+
+    def poll(self, now):
+        """Update the jobs that are due and return the time of the next poll."""
+        updates = {}
+        for job in self.jobs:
+            if self._due[job.name] > now:
+                continue
+            end = self._latest(job, now)
+            indices = [
+                i for i in range(len(job.series_list)) if self._start(job, i) <= end
+            ]
+            if not indices:
+                self._schedule(job, now, True)
+                continue
+            series_list = [
+                replace(job.series_list[i], start=self._start(job, i), end=end)
+                for i in indices
+            ]
+            append = job.name in self._written
+            update = replace(job, series_list=series_list, append=append)
+            updates[job.name] = (job, update, indices)
+
+        results = jobs.execute([u for _, u, _ in updates.values()], self.workers)
+
+        for name, (job, update, indices) in updates.items():
+            new = False
+            if name in results:
+                self._written.add(name)
+                for i, series in zip(indices, results[name][1]):
+                    if series.prices:
+                        self._last[name][i] = series.prices[-1].date
+                        new = True
+            self._schedule(job, now, new)
+
+        return min(self._due[job.name] for job in self.jobs)
+
+    def _start(self, job, i):
+        last = self._last[job.name][i]
+        if last is None:
+            return job.series_list[i].start
+        return (date.fromisoformat(last) + timedelta(days=1)).isoformat()
+
+    def _latest(self, job, now):
+        publication = job.source.publication()
+        if publication:
+            return publication.latest_date(now)
+        return (now.astimezone().date() - timedelta(days=1)).isoformat()
+
+    def _schedule(self, job, now, new):
+        publication = job.source.publication()
+        if not publication:
+            self._due[job.name] = now + self.interval
+            return
+
+        regular = publication.next(now) + DELAY
+        if new:
+            self._retry.pop(job.name, None)
+            self._due[job.name] = regular
+        else:
+            retry = self._retry.get(job.name, RETRY / 2) * 2
+            self._retry[job.name] = retry
+            self._due[job.name] = min(now + retry, regular)
+
+
+def watch(job_list, workers=8, interval=timedelta(hours=6)):
+    watcher = Watcher(job_list, workers, interval)
+    while True:
+        due = watcher.poll(_now())
+        logging.info(f"Next update at {due.astimezone():%Y-%m-%d %H:%M:%S %Z}.")
+        time.sleep(max(0, (due - _now()).total_seconds()))
+
+
+def _check(job):
+    if not job.path:
+        raise ValueError(f"Job '{job.name}': Watched jobs need an output-file.")
+    if not job.output.appendable:
+        raise ValueError(
+            f"Job '{job.name}': The output format can't be appended to, "
+            "so it can't be watched."
+        )
+    if job.resample:
+        raise ValueError(f"Job '{job.name}': Resampled jobs can't be watched.")
+    if any("*" in (s.base, s.quote) for s in job.series_list):
+        raise ValueError(f"Job '{job.name}': Wildcard pairs can't be watched.")
+
+
+def _now():
+    return datetime.now(timezone.utc)
@@ -0,0 +1,32 @@
+from decimal import Decimal
+
+import pytest
+
+from pricehist import archive
+from pricehist.format import Format
+from pricehist.outputs.archive import ArchiveOutput
+from pricehist.price import Price
+from pricehist.series import Series
+
+
+def test_format(mocker):
+    prices = [Price("2021-01-01", Decimal("24139.4648"))]
+    series = Series("BTC", "EUR", "close", "2021-01-01", "2021-01-03", prices)
+    source = mocker.MagicMock()
+    source.id = mocker.MagicMock(return_value="sourceid")
+    result = ArchiveOutput().format(series, source, Format(base="XBT"))
+    assert ArchiveOutput.binary
+    assert result == archive.pack(series, "sourceid", base="XBT")
+
+
+def test_format_many_single_series_only(mocker):
+    series = Series("BTC", "EUR", "close", "2021-01-01", "2021-01-03")
+    source = mocker.MagicMock()
+    source.id = mocker.MagicMock(return_value="sourceid")
+    out = ArchiveOutput()
+    assert not out.multiple
+    assert out.format_many([series], source, Format()) == out.format(
+        series, source, Format()
+    )
+    with pytest.raises(ValueError, match="single series"):
+        out.format_many([series, series], source, Format())
@@ -0,0 +1,110 @@
+import io
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from pricehist.format import Format
+from pricehist.outputs.arrow import Arrow
+from pricehist.price import Price
+from pricehist.series import Series
+
+pyarrow = pytest.importorskip("pyarrow")
+pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.fixture
+def series():
+    prices = [
+        Price("2021-01-01", Decimal("24139.4648")),
+        Price("2021-01-02", Decimal("26533.576")),
+        Price("2021-01-03", Decimal("27001.2846")),
+    ]
+    return Series("BTC", "EUR", "close", "2021-01-01", "2021-01-03", prices)
+
+
+@pytest.fixture
+def source(mocker):
+    source = mocker.MagicMock()
+    source.id = mocker.MagicMock(return_value="sourceid")
+    return source
+
+
+def test_table_types(series, source):
+    table = Arrow().table(series, source)
+    assert table.schema.field("date").type == pyarrow.date32()
+    assert table.schema.field("amount").type == pyarrow.decimal128(9, 4)
+    assert table.column_names == ["date", "base", "quote", "amount", "source", "type"]
+    assert table.to_pylist()[1] == {
+        "date": date(2021, 1, 2),
+        "base": "BTC",
+        "quote": "EUR",
+        "amount": Decimal("26533.5760"),
+        "source": "sourceid",
+        "type": "close",
+    }
+
+
+def test_table_renames_base_and_quote(series, source):
+    table = Arrow().table(series, source, Format(base="XBT", quote="EURO"))
+    assert set(table.column("base").to_pylist()) == {"XBT"}
+    assert set(table.column("quote").to_pylist()) == {"EURO"}
+
+
+def test_table_keeps_high_precision_amounts_exactly(series, source):
+    inverted = series.invert()
+    table = Arrow().table(inverted, source)
+    assert table.column("amount").to_pylist() == [p.amount for p in inverted.prices]
+    big = Series("A", "B", "t", "2021-01-01", "2021-01-01")
+    big.prices.append(
+        Price("2021-01-01", Decimal("1234567890123456.1234567890123456789"))
+    )
+    big.prices.append(Price("2021-01-02", Decimal("0.00000000000000000000001")))
+    table = Arrow().table(big, source)
+    assert table.schema.field("amount").type == pyarrow.decimal256(39, 23)
+    assert table.column("amount").to_pylist()[0] == big.prices[0].amount
+
+
+def test_table_empty_series(source):
+    empty = Series("BTC", "EUR", "close", "2021-01-01", "2021-01-03")
+    table = Arrow().table(empty, source)
+    assert table.num_rows == 0
+
+
+def test_format_arrow_file(series, source):
+    result = Arrow().format(series, source)
+    assert isinstance(result, bytes)
+    table = pyarrow.ipc.open_file(pyarrow.py_buffer(result)).read_all()
+    assert table.equals(Arrow().table(series, source))
+
+
+def test_format_parquet_file(series, source):
+    result = Arrow(parquet=True).format(series, source)
+    assert result[0:4] == b"PAR1"
+    table = pyarrow.parquet.read_table(io.BytesIO(result))
+    assert table.equals(Arrow().table(series, source))
+
+
+def test_missing_dependency(mocker):
+    assert Arrow().missing_dependency() is None
+    mocker.patch("pricehist.outputs.arrow.pyarrow", None)
+    assert Arrow().missing_dependency() == "pyarrow"
+
+
+def test_write_binary(series, source, tmp_path):
+    path = tmp_path / "prices.parquet"
+    Arrow(parquet=True).write(series, source, Format(), str(path))
+    table = pyarrow.parquet.read_table(str(path))
+    assert table.equals(Arrow().table(series, source))
+
+
+def test_format_many_one_table(series, source):
+    small = Series("BTC", "USD", "open", "2021-01-01", "2021-01-01")
+    small.prices.append(Price("2021-01-01", Decimal("0.12345")))
+    result = Arrow(parquet=True).format_many([series, small], source, Format())
+    table = pyarrow.parquet.read_table(io.BytesIO(result))
+    assert table.num_rows == 4
+    assert table.schema.field("amount").type == pyarrow.decimal128(10, 5)
+    assert table.column("quote").to_pylist() == ["EUR", "EUR", "EUR", "USD"]
+    assert table.column("type").to_pylist() == ["close", "close", "close", "open"]
+    assert table.column("amount").to_pylist()[3] == Decimal("0.12345")
@@ -2,6 +2,7 @@ from decimal import Decimal
 
 import pytest
 
+from pricehist import exceptions
 from pricehist.format import Format
 from pricehist.outputs.csv import CSV
 from pricehist.price import Price
@@ -48,3 +49,90 @@ def test_format_custom(out, series, mocker):
         '"2021/01/02"/XBT/€/26.533,576/sourceid/close\n'
         '"2021/01/03"/XBT/€/27.001,2846/sourceid/close\n'
     )
+
+
+def test_write(out, series, mocker, tmp_path):
+    source = mocker.MagicMock()
+    source.id = mocker.MagicMock(return_value="sourceid")
+    path = tmp_path / "prices.csv"
+    out.write(series, source, Format(), str(path))
+    assert path.read_text() == out.format(series, source, Format())
+
+
+def test_format_many_one_header(out, series, mocker):
+    source = mocker.MagicMock()
+    source.id = mocker.MagicMock(return_value="sourceid")
+    other = Series("BTC", "USD", "close", "2021-01-01", "2021-01-01", series.prices[:1])
+    result = out.format_many([series, other], source, Format())
+    lines = result.splitlines()
+    assert lines[0] == "date,base,quote,amount,source,type"
+    assert len(lines) == 5
+    assert lines[4] == "2021-01-01,BTC,USD,24139.4648,sourceid,close"
+
+
+def test_stream_header_once(out, series, mocker):
+    source = mocker.MagicMock()
+    source.id = mocker.MagicMock(return_value="sourceid")
+    chunks = [
+        Series("BTC", "EUR", "close", "2021-01-01", "2021-01-01", series.prices[:1]),
+        Series("BTC", "EUR", "close", "2021-01-02", "2021-01-03", series.prices[1:]),
+    ]
+    streamed = list(out.stream(iter(chunks), source, Format()))
+    assert streamed[0] == (
+        "date,base,quote,amount,source,type\n"
+        "2021-01-01,BTC,EUR,24139.4648,sourceid,close\n"
+    )
+    assert "".join(streamed) == out.format(series, source, Format())
+
+
+def test_stream_header_waits_for_first_chunk(out, mocker):
+    source = mocker.MagicMock()
+
+    def failing():
+        raise exceptions.RequestError("Network issue")
+        yield
+
+    streamed = out.stream(failing(), source, Format())
+    with pytest.raises(exceptions.RequestError):
+        next(streamed)
+    assert list(out.stream(iter([]), source, Format())) == [
+        "date,base,quote,amount,source,type\n"
+    ]
+
+
+def test_append_many_writes_header_only_once(out, series, mocker, tmp_path):
+    source = mocker.MagicMock()
+    source.id = mocker.MagicMock(return_value="sourceid")
+    path = tmp_path / "prices.csv"
+    out.append_many([series.slice("2021-01-01", "2021-01-01")], source, Format(), path)
+    out.append_many([series.slice("2021-01-02", "2021-01-03")], source, Format(), path)
+    assert path.read_text() == (
+        "date,base,quote,amount,source,type\n"
+        "2021-01-01,BTC,EUR,24139.4648,sourceid,close\n"
+        "2021-01-02,BTC,EUR,26533.576,sourceid,close\n"
+        "2021-01-03,BTC,EUR,27001.2846,sourceid,close\n"
+    )
+
+
+def test_format_merged_by_date(out, series, mocker):
+    source = mocker.MagicMock()
+    source.id = mocker.MagicMock(return_value="sourceid")
+    other = Series("BTC", "USD", "close", "2021-01-01", "2021-01-01", series.prices[:2])
+    result = out.format_merged([series, other], source, Format())
+    assert [line.split(",")[0:3] for line in result.splitlines()] == [
+        ["date", "base", "quote"],
+        ["2021-01-01", "BTC", "EUR"],
+        ["2021-01-01", "BTC", "USD"],
+        ["2021-01-02", "BTC", "EUR"],
+        ["2021-01-02", "BTC", "USD"],
+        ["2021-01-03", "BTC", "EUR"],
+    ]
+
+
+def test_write_merged(out, series, mocker, tmp_path):
+    source = mocker.MagicMock()
+    source.id = mocker.MagicMock(return_value="sourceid")
+    other = Series("BTC", "USD", "close", "2021-01-01", "2021-01-01", series.prices[:1])
+    path = tmp_path / "prices.csv"
+    out.write_merged([series, other], source, Format(), str(path))
+    assert path.read_text() == out.format_merged([series, other], source, Format())
@@ -1,6 +1,7 @@
 import dataclasses
 import logging
 import re
+import sqlite3
 from decimal import Decimal
 
 import pytest
@@ -102,6 +103,45 @@ def test_format_insert_commented_out_if_no_values(out, series, src):
     ) in result
 
 
+def test_format_many_one_transaction(out, series, src):
+    prices = [Price("2021-01-01", Decimal("600"))]
+    other = Series("ETH", "EUR", "close", "2021-01-01", "2021-01-01", prices)
+    result = out.format_many([series, other], src, Format())
+    assert result.count("BEGIN;") == 1
+    assert result.count("COMMIT;") == 1
+    mnemonics = re.findall(r"WHERE mnemonic = (.*) LIMIT", result, re.MULTILINE)
+    assert mnemonics == ["'BTC'", "'EUR'", "'ETH'"]
+    assert result.count("'coindesk', 'close'") == 4
+
+
+def test_format_many_inserts_once(out, series, src, tmp_path):
+    prices = [Price("2021-01-01", Decimal("600"))]
+    other = Series("ETH", "EUR", "close", "2021-01-01", "2021-01-01", prices)
+    sql = out.format_many([series, other], src, Format())
+    path = tmp_path / "gnucash.sqlite"
+    with sqlite3.connect(path) as db:
+        db.executescript(
+            "CREATE TABLE commodities (guid TEXT PRIMARY KEY, mnemonic TEXT);"
+            "INSERT INTO commodities VALUES ('g-btc', 'BTC'), ('g-eth', 'ETH'), "
+            "('g-eur', 'EUR');"
+            "CREATE TABLE prices (guid TEXT PRIMARY KEY, commodity_guid TEXT, "
+            "currency_guid TEXT, date TEXT, source TEXT, type TEXT, "
+            "value_num INTEGER, value_denom INTEGER);"
+        )
+    # Each run is a separate session, as with the sqlite3 command.
+    for _ in range(2):
+        db = sqlite3.connect(path, isolation_level=None)
+        db.executescript(sql)
+        db.close()
+    db = sqlite3.connect(path)
+    rows = db.execute(
+        "SELECT commodity_guid, currency_guid, COUNT(*) FROM prices "
+        "GROUP BY commodity_guid, currency_guid"
+    ).fetchall()
+    db.close()
+    assert rows == [("g-btc", "g-eur", 3), ("g-eth", "g-eur", 1)]
+
+
 def test_format_warns_about_backslash(out, series, src, caplog):
     with caplog.at_level(logging.WARNING):
         out.format(series, src, Format(quote="EU\\RO"))
@@ -1,3 +1,4 @@
+import json
 from decimal import Decimal
 from textwrap import dedent
 
@@ -166,3 +167,54 @@ def test_format_numbers(json_out, series, mocker):
         ).strip()
         + "\n"
     )
+
+
+def test_format_many_single_array(json_out, series, mocker):
+    source = mocker.MagicMock()
+    source.id = mocker.MagicMock(return_value="sourceid")
+    other = Series("BTC", "USD", "close", "2021-01-01", "2021-01-01", series.prices[:1])
+    data = json.loads(json_out.format_many([series, other], source, Format()))
+    assert [(d["quote"], d["date"]) for d in data] == [
+        ("EUR", "2021-01-01"),
+        ("EUR", "2021-01-02"),
+        ("EUR", "2021-01-03"),
+        ("USD", "2021-01-01"),
+    ]
+
+
+def test_format_merged_single_array(json_out, series, mocker):
+    source = mocker.MagicMock()
+    source.id = mocker.MagicMock(return_value="sourceid")
+    other = Series("BTC", "USD", "close", "2021-01-01", "2021-01-01", series.prices[:1])
+    data = json.loads(json_out.format_merged([series, other], source, Format()))
+    assert [(d["quote"], d["date"]) for d in data] == [
+        ("EUR", "2021-01-01"),
+        ("USD", "2021-01-01"),
+        ("EUR", "2021-01-02"),
+        ("EUR", "2021-01-03"),
+    ]
+
+
+def test_format_many_jsonl(jsonl_out, series, mocker):
+    source = mocker.MagicMock()
+    source.id = mocker.MagicMock(return_value="sourceid")
+    result = jsonl_out.format_many([series, series], source, Format())
+    assert result == jsonl_out.format(series, source, Format()) * 2
+
+
+def test_stream_matches_format(json_out, series, mocker):
+    source = mocker.MagicMock()
+    source.id = mocker.MagicMock(return_value="sourceid")
+    chunks = [
+        Series("BTC", "EUR", "close", "2021-01-01", "2021-01-01", series.prices[:1]),
+        Series("BTC", "EUR", "close", "2021-01-02", "2021-01-02", []),
+        Series("BTC", "EUR", "close", "2021-01-02", "2021-01-03", series.prices[1:]),
+    ]
+    streamed = list(json_out.stream(iter(chunks), source, Format()))
+    assert len(streamed) == 4
+    assert "".join(streamed) == json_out.format(series, source, Format())
+
+
+def test_stream_empty(json_out, mocker):
+    empty = Series("BTC", "EUR", "close", "2021-01-01", "2021-01-03")
+    assert "".join(json_out.stream([empty], mocker.MagicMock(), Format())) == "[]\n"
@@ -50,3 +50,15 @@ def test_format_custom(out, series, mocker):
         "P 2021/01/02 23:59:59 XBT €26.533,576\n"
         "P 2021/01/03 23:59:59 XBT €27.001,2846\n"
     )
+
+
+def test_append_many(out, series, mocker, tmp_path):
+    source = mocker.MagicMock()
+    path = tmp_path / "prices.ledger"
+    out.write_many([series.slice("2021-01-01", "2021-01-02")], source, Format(), path)
+    out.append_many([series.slice("2021-01-03", "2021-01-03")], source, Format(), path)
+    assert path.read_text() == (
+        "P 2021-01-01 00:00:00 BTC 24139.4648 EUR\n"
+        "P 2021-01-02 00:00:00 BTC 26533.576 EUR\n"
+        "P 2021-01-03 00:00:00 BTC 27001.2846 EUR\n"
+    )
@@ -0,0 +1,97 @@
+import logging
+import sqlite3
+from dataclasses import replace
+from decimal import Decimal
+
+import pytest
+
+from pricehist.format import Format
+from pricehist.outputs.sqlite import SQLite
+from pricehist.price import Price
+from pricehist.series import Series
+
+
+@pytest.fixture
+def out():
+    return SQLite()
+
+
+@pytest.fixture
+def series():
+    prices = [
+        Price("2021-01-01", Decimal("24139.4648")),
+        Price("2021-01-02", Decimal("26533.576")),
+        Price("2021-01-03", Decimal("27001.2846")),
+    ]
+    return Series("BTC", "EUR", "close", "2021-01-01", "2021-01-03", prices)
+
+
+@pytest.fixture
+def src(mocker):
+    source = mocker.MagicMock()
+    source.id = mocker.MagicMock(return_value="sourceid")
+    return source
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "prices.db")
+
+
+def rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT * FROM prices ORDER BY date").fetchall()
+    finally:
+        conn.close()
+
+
+def test_write_creates_table(out, series, src, path):
+    out.write(series, src, Format(), path)
+    assert rows(path) == [
+        ("sourceid", "BTC", "EUR", "close", "2021-01-01", "24139.4648"),
+        ("sourceid", "BTC", "EUR", "close", "2021-01-02", "26533.576"),
+        ("sourceid", "BTC", "EUR", "close", "2021-01-03", "27001.2846"),
+    ]
+    conn = sqlite3.connect(path)
+    indexes = conn.execute("PRAGMA index_list(prices)").fetchall()
+    conn.close()
+    assert [(i[1], i[2]) for i in indexes] == [
+        ("prices_source_base_quote_type_date", 1)
+    ]
+
+
+def test_write_renames_base_and_quote(out, series, src, path):
+    out.write(series, src, Format(base="XBT", quote="EURO"), path)
+    assert {(r[1], r[2]) for r in rows(path)} == {("XBT", "EURO")}
+
+
+def test_write_again_only_changes_new_rows(out, series, src, path, caplog):
+    out.write(replace(series, prices=series.prices[0:2]), src, Format(), path)
+    changed = replace(series.prices[1], amount=Decimal("26533.5"))
+    updated = replace(series, prices=[series.prices[0], changed, series.prices[2]])
+    with caplog.at_level(logging.INFO):
+        out.write(updated, src, Format(), path)
+    assert [r[5] for r in rows(path)] == ["24139.4648", "26533.5", "27001.2846"]
+    assert "Wrote 2 new or changed of 3 prices" in caplog.text
+
+
+def test_write_keeps_other_series(out, series, src, path):
+    out.write(series, src, Format(), path)
+    out.write(replace(series, type="open"), src, Format(), path)
+    assert len(rows(path)) == 6
+
+
+def test_format_not_supported(out, series, src):
+    assert out.file_only
+    with pytest.raises(ValueError, match="can only be written to a file"):
+        out.format(series, src, Format())
+
+
+def test_write_many_in_one_transaction(out, series, src, path, mocker):
+    other = replace(series, quote="USD")
+    connect = mocker.spy(sqlite3, "connect")
+    out.write_many([series, other], src, Format(), path)
+    assert connect.call_count == 1
+    assert len(rows(path)) == 6
+    assert {r[2] for r in rows(path)} == {"EUR", "USD"}
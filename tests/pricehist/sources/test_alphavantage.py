@@ -1,6 +1,8 @@
 import logging
 import os
 import re
+import threading
+import time
 from datetime import datetime, timedelta
 from decimal import Decimal
 from pathlib import Path
@@ -666,6 +668,29 @@ def test_fetch_api_key_defaults_to_generic(
     assert req.params["apikey"] == f"pricehist_{__version__}"
 
 
+def test_non_premium_requests_spaced_across_threads(src, monkeypatch, mocker):
+    monkeypatch.delenv(api_key_name)
+    monkeypatch.setattr(src, "NON_PREMIUM_MAX_RPS", 20)
+    times = []
+
+    def http_get(url, params=None):
+        times.append(time.monotonic())
+        time.sleep(0.01)
+        return mocker.MagicMock()
+
+    mocker.patch.object(src, "http_get", side_effect=http_get)
+    mocker.patch.object(src, "log_curl", side_effect=lambda response: response)
+    threads = [threading.Thread(target=src._query, args=({},)) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    times.sort()
+    assert len(times) == 3
+    assert all(b - a >= 0.05 for a, b in zip(times, times[1:]))
+
+
 def test_fetch_api_key_invalid(src, type, physical_list_ok, requests_mock):
     body = (
         '{ "Error Message": "the parameter apikey is invalid or missing. Please '
@@ -219,6 +219,87 @@ def test_fetch_unknown_pair(src, type, requests_mock):
         src.fetch(Series("CAD", "AFN", type, "2021-01-01", "2021-01-07"))
 
 
+def test_fetch_wildcard_needs_fetch_many(src, type):
+    with pytest.raises(exceptions.InvalidPair) as e:
+        src.fetch(Series("*", "CAD", type, "2021-01-01", "2021-01-07"))
+    assert "fetch_many" in str(e.value)
+
+
+def test_fetch_many_in_one_request(src, type, requests_mock):
+    body = """{
+        "seriesDetail": {"FXUSDCAD": {}, "FXEURCAD": {}},
+        "observations": [
+            {"d": "2021-01-04", "FXUSDCAD": {"v": "1.2718"},
+             "FXEURCAD": {"v": "1.5601"}},
+            {"d": "2021-01-05", "FXUSDCAD": {"v": "1.2708"}},
+            {"d": "2021-01-06", "FXUSDCAD": {"v": "1.2666"},
+             "FXEURCAD": {"v": "1.5589"}}
+        ]
+    }"""
+    requests_mock.add(responses.GET, fetch_url("FXUSDCAD,FXEURCAD"), body=body)
+    usd, eur = src.fetch_many(
+        [
+            Series("USD", "CAD", type, "2021-01-05", "2021-01-06"),
+            Series("EUR", "CAD", type, "2021-01-01", "2021-01-07"),
+        ]
+    )
+    assert len(requests_mock.calls) == 1
+    req = requests_mock.calls[0].request
+    assert req.params["start_date"] == "2021-01-01"
+    assert req.params["end_date"] == "2021-01-07"
+    assert (usd.base, usd.quote, usd.start) == ("USD", "CAD", "2021-01-05")
+    assert list(usd.prices) == [
+        Price("2021-01-05", Decimal("1.2708")),
+        Price("2021-01-06", Decimal("1.2666")),
+    ]
+    assert [p.date for p in eur.prices] == ["2021-01-04", "2021-01-06"]
+
+
+def test_fetch_many_wildcard_uses_group(src, type, requests_mock):
+    body = """{
+        "seriesDetail": {"FXUSDCAD": {}, "FXEURCAD": {}, "FXAUDCAD": {}},
+        "observations": [
+            {
+                "d": "2021-01-04",
+                "FXUSDCAD": {"v": "1.2718"},
+                "FXEURCAD": {"v": "1.5601"},
+                "FXAUDCAD": {"v": "0.9791"}
+            }
+        ]
+    }"""
+    requests_mock.add(responses.GET, fetch_url("group/FX_RATES_DAILY"), body=body)
+    result = src.fetch_many(
+        [
+            Series("USD", "CAD", type, "2021-01-01", "2021-01-07"),
+            Series("*", "CAD", type, "2021-01-01", "2021-01-07"),
+        ]
+    )
+    assert len(requests_mock.calls) == 1
+    assert [(s.base, s.quote) for s in result] == [
+        ("USD", "CAD"),
+        ("AUD", "CAD"),
+        ("EUR", "CAD"),
+    ]
+    assert result[2].prices[0] == Price("2021-01-04", Decimal("1.5601"))
+
+
+def test_fetch_many_unknown_pair(src, type, requests_mock):
+    requests_mock.add(
+        responses.GET,
+        fetch_url("FXUSDCAD,FXCADAFN"),
+        status=404,
+        body="""{"message": "Series FXCADAFN not found."}""",
+    )
+    with pytest.raises(exceptions.InvalidPair) as e:
+        src.fetch_many(
+            [
+                Series("USD", "CAD", type, "2021-01-01", "2021-01-07"),
+                Series("CAD", "AFN", type, "2021-01-01", "2021-01-07"),
+            ]
+        )
+    assert (e.value.base, e.value.quote) == ("CAD", "AFN")
+
+
 def test_fetch_network_issue(src, type, requests_mock):
     body = requests.exceptions.ConnectionError("Network issue")
     requests_mock.add(responses.GET, fetch_url("FXCADUSD"), body=body)
@@ -45,6 +45,15 @@ def test_normalizesymbol_default_uppercase(src):
     assert src.normalizesymbol("eur") == "EUR"
 
 
+def test_fetch_many_default_fetches_each(src, mocker):
+    src.fetch = mocker.MagicMock(side_effect=lambda s: s.quote)
+    series_list = [
+        Series("A", "B", "t", "2021-01-01", "2021-01-02"),
+        Series("A", "C", "t", "2021-01-01", "2021-01-02"),
+    ]
+    assert src.fetch_many(series_list) == ["B", "C"]
+
+
 def test_format_symbols_one(src, mocker):
     src.symbols = mocker.MagicMock(return_value=[("A", "Description")])
     assert src.format_symbols() == "A    Description\n"
@@ -236,6 +236,16 @@ def test_fetch_long_hist_multi_segment(src, type, multi_response_ok):
     assert len(series.prices) > 3
 
 
+def test_stream_yields_each_segment(src, type, multi_response_ok):
+    chunks = src.stream(Series("BTC", "EUR", type, "2020-01-01", "2021-01-07"))
+    first = next(chunks)
+    assert len(multi_response_ok.calls) == 1
+    assert (first.start, first.end) == ("2020-01-01", "2020-10-16")
+    rest = list(chunks)
+    assert len(multi_response_ok.calls) == 2
+    assert [(c.start, c.end) for c in rest] == [("2020-10-17", "2021-01-07")]
+
+
 def test_fetch_from_before_start(src, type, requests_mock):
     body = '{"message":"End is too old"}'
     requests_mock.add(responses.GET, product_url("BTC", "EUR"), status=400, body=body)
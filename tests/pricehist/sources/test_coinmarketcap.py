@@ -8,7 +8,7 @@ import pytest
 import requests
 import responses
 
-from pricehist import exceptions
+from pricehist import exceptions, recorder
 from pricehist.price import Price
 from pricehist.series import Series
 from pricehist.sources.coinmarketcap import CoinMarketCap
@@ -140,8 +140,9 @@ def test_symbols_no_data(src, type, requests_mock):
     assert "Empty data section" in str(e.value)
 
 
-def test_fetch_known_pair_id_id(src, type, recent_id_id_ok, crypto_ok):
+def test_fetch_known_pair_id_id(src, type, recent_id_id_ok):
     series = src.fetch(Series("ID=1", "ID=2782", type, "2021-01-01", "2021-01-07"))
+    assert len(recent_id_id_ok.calls) == 1
     req = recent_id_id_ok.calls[0].request
     assert req.params["id"] == "1"
     assert req.params["convertId"] == "2782"
@@ -149,9 +150,9 @@ def test_fetch_known_pair_id_id(src, type, recent_id_id_ok, crypto_ok):
     assert len(series.prices) == 7
 
 
-def test_fetch_known_pair_id_sym(src, type, recent_id_id_ok, crypto_ok):
+def test_fetch_known_pair_id_sym(src, type, recent_id_id_ok):
     series = src.fetch(Series("ID=1", "AUD", type, "2021-01-01", "2021-01-07"))
-    req = recent_id_id_ok.calls[1].request
+    req = recent_id_id_ok.calls[0].request
     assert req.params["id"] == "1"
     assert req.params["convertId"] == "2782"
     assert (series.base, series.quote) == ("BTC", "AUD")
@@ -175,9 +176,49 @@ def test_fetch_known_pair_sym_sym(src, type, recent_id_id_ok, crypto_ok):
     assert len(series.prices) == 7
 
 
-def test_fetch_requests_and_receives_correct_times(
-    src, type, recent_id_id_ok, crypto_ok
+def test_fetch_crypto_id_quote_uses_symbol_data(src, type, requests_mock):
+    json = (Path(os.path.splitext(__file__)[0]) / "crypto-partial.json").read_text()
+    requests_mock.add(responses.GET, crypto_url, body=json, status=200)
+    body = '{"data": {"id": 1027, "symbol": "ETH", "convertId": 1, "quotes": []}}'
+    requests_mock.add(responses.GET, fetch_url, body=body)
+    series = src.fetch(Series("ID=1027", "ID=1", type, "2021-01-01", "2021-01-07"))
+    assert (series.base, series.quote) == ("ETH", "BTC")
+
+
+def test_fetch_unknown_id_kept_in_output(src, type, crypto_ok, requests_mock):
+    body = '{"data": {"id": 1, "symbol": "BTC", "convertId": 987654321, "quotes": []}}'
+    requests_mock.add(responses.GET, fetch_url, body=body)
+    series = src.fetch(Series("ID=1", "ID=987654321", type, "2021-01-01", "2021-01-07"))
+    assert series.quote == "ID=987654321"
+
+
+def test_symbol_data_cached_on_disk(type, crypto_ok, recent_id_id_ok, cache_dir):
+    for _ in range(3):
+        CoinMarketCap().fetch(Series("BTC", "AUD", type, "2021-01-01", "2021-01-07"))
+    map_calls = [c for c in crypto_ok.calls if c.request.url == crypto_url]
+    assert len(map_calls) == 1
+    assert (cache_dir / "coinmarketcap-crypto.json").exists()
+
+
+def test_symbol_data_recorded_and_replayed_without_cache(
+    type, crypto_ok, recent_id_id_ok, cache_dir, tmp_path
 ):
+    series = Series("BTC", "AUD", type, "2021-01-01", "2021-01-07")
+    CoinMarketCap().fetch(series)
+    try:
+        recorder.record(str(tmp_path / "recording"))
+        recorded = CoinMarketCap().fetch(series)
+        (cache_dir / "coinmarketcap-crypto.json").unlink()
+        recorder.replay(str(tmp_path / "recording"))
+        assert CoinMarketCap().fetch(series) == recorded
+    finally:
+        recorder.reset()
+    map_calls = [c for c in crypto_ok.calls if c.request.url == crypto_url]
+    assert len(map_calls) == 2
+    assert not (cache_dir / "coinmarketcap-crypto.json").exists()
+
+
+def test_fetch_requests_and_receives_correct_times(src, type, recent_id_id_ok):
     series = src.fetch(Series("ID=1", "ID=2782", type, "2021-01-01", "2021-01-07"))
     req = recent_id_id_ok.calls[0].request
     assert req.params["timeStart"] == str(timestamp("2020-12-31"))  # back one period
@@ -186,7 +227,7 @@ def test_fetch_requests_and_receives_correct_times(
     assert series.prices[-1] == Price("2021-01-07", Decimal("49369.66288590665"))
 
 
-def test_fetch_long_hist_multi_segment(src, type, crypto_ok, requests_mock):
+def test_fetch_long_hist_multi_segment(src, type, requests_mock):
     requests_mock.add(
         responses.GET,
         fetch_url,
@@ -253,7 +294,7 @@ def test_fetch_long_hist_multi_segment(src, type, crypto_ok, requests_mock):
     ]
 
 
-def test_fetch_filters_extra_returned_dates(src, type, crypto_ok, requests_mock):
+def test_fetch_filters_extra_returned_dates(src, type, requests_mock):
     requests_mock.add(
         responses.GET,
         fetch_url,
@@ -365,7 +406,7 @@ def test_fetch_bad_quote_sym(src, type, crypto_ok):
     assert "Invalid symbol 'NOTAQUOTE'" in str(e.value)
 
 
-def test_fetch_bad_response(src, type, crypto_ok, requests_mock):
+def test_fetch_bad_response(src, type, requests_mock):
     requests_mock.add(
         responses.GET,
         fetch_url,
@@ -190,6 +190,64 @@ def test_fetch_unknown_pair(src, type):
         src.fetch(Series("ABC", "XZY", type, "2021-01-04", "2021-01-08"))
 
 
+def test_fetch_wildcard_needs_fetch_many(src, type):
+    with pytest.raises(exceptions.InvalidPair, match="Wildcards need fetch_many"):
+        src.fetch(Series("EUR", "*", type, "2021-01-04", "2021-01-08"))
+
+
+def test_fetch_many_from_one_download(src, type, response_ok):
+    results = src.fetch_many(
+        [
+            Series("EUR", "AUD", type, "2021-01-04", "2021-01-08"),
+            Series("EUR", "USD", type, "1999-01-04", "1999-01-08"),
+        ]
+    )
+    assert len(response_ok.calls) == 1
+    assert [(s.quote, s.start, len(s.prices)) for s in results] == [
+        ("AUD", "2021-01-04", 5),
+        ("USD", "1999-01-04", 5),
+    ]
+    assert results[0].prices[0] == Price("2021-01-04", Decimal("1.5928"))
+
+
+def test_fetch_many_wildcard(src, type, response_ok):
+    results = src.fetch_many(
+        [
+            Series("EUR", "AUD", type, "2021-01-04", "2021-01-08"),
+            Series("EUR", "*", type, "2021-01-04", "2021-01-08"),
+        ]
+    )
+    assert len(response_ok.calls) == 1
+    quotes = [s.quote for s in results]
+    assert quotes[0] == "AUD"
+    assert quotes[1:] == sorted(quotes[1:])
+    assert "AUD" not in quotes[1:]
+    assert "USD" in quotes
+    assert len(quotes) == 41
+
+
+def test_fetch_many_unknown_quote(src, type, response_ok):
+    with pytest.raises(exceptions.InvalidPair) as e:
+        src.fetch_many(
+            [
+                Series("EUR", "AUD", type, "2021-01-04", "2021-01-08"),
+                Series("EUR", "XZY", type, "2021-01-04", "2021-01-08"),
+            ]
+        )
+    assert (e.value.base, e.value.quote) == ("EUR", "XZY")
+
+
+def test_fetch_many_invalid_base_before_download(src, type, requests_mock):
+    with pytest.raises(exceptions.InvalidPair):
+        src.fetch_many(
+            [
+                Series("EUR", "AUD", type, "2021-01-04", "2021-01-08"),
+                Series("USD", "AUD", type, "2021-01-04", "2021-01-08"),
+            ]
+        )
+    assert len(requests_mock.calls) == 0
+
+
 def test_fetch_network_issue(src, type, requests_mock, url):
     err = requests.exceptions.ConnectionError("Network issue")
     requests_mock.add(responses.GET, url, body=err)
@@ -0,0 +1,116 @@
+import logging
+from decimal import Decimal
+
+import pytest
+
+from pricehist import archive
+from pricehist.archive import Archive
+from pricehist.price import Price
+from pricehist.series import Series
+
+
+@pytest.fixture
+def series():
+    prices = [
+        Price("2021-01-04", Decimal("1.5928")),
+        Price("2021-01-05", Decimal("1.5927")),
+        Price("2021-01-06", Decimal("1.58")),
+        Price("2021-01-08", Decimal("1.5758")),
+    ]
+    return Series("EUR", "AUD", "reference", "2021-01-01", "2021-01-10", prices)
+
+
+@pytest.fixture
+def path(series, tmp_path):
+    path = tmp_path / "eur-aud.phar"
+    path.write_bytes(archive.pack(series, "ecb"))
+    return str(path)
+
+
+def test_pack_layout(series):
+    data = archive.pack(series, "ecb")
+    names = b"EUR\nAUD\nreference\necb"
+    assert data[0:8] == b"PHAR\x01\x04" + len(names).to_bytes(2, "little")
+    assert data[8 : 8 + len(names)] == names
+    assert len(data) == 8 + len(names) + 4 * 12
+
+
+def test_pack_renames(series, tmp_path):
+    path = tmp_path / "a.phar"
+    path.write_bytes(archive.pack(series, "ecb", base="€", quote="$"))
+    with Archive(str(path)) as a:
+        assert (a.base, a.quote, a.type, a.source) == ("€", "$", "reference", "ecb")
+
+
+def test_read(path, series):
+    with Archive(path) as a:
+        assert (a.base, a.quote, a.type, a.source) == ("EUR", "AUD", "reference", "ecb")
+        assert a.scale == 4
+        assert len(a) == 4
+        assert [a[i] for i in range(len(a))] == series.prices
+        with pytest.raises(IndexError):
+            a[4]
+
+
+def test_at_or_before(path):
+    with Archive(path) as a:
+        assert a.at_or_before("2021-01-03") is None
+        assert a.at_or_before("2021-01-04") == Price("2021-01-04", Decimal("1.5928"))
+        assert a.at_or_before("2021-01-07") == Price("2021-01-06", Decimal("1.5800"))
+        assert a.at_or_before("2021-12-31") == Price("2021-01-08", Decimal("1.5758"))
+
+
+def test_empty_series(tmp_path):
+    path = tmp_path / "empty.phar"
+    empty = Series("EUR", "AUD", "reference", "2021-01-01", "2021-01-10")
+    path.write_bytes(archive.pack(empty, "ecb"))
+    with Archive(str(path)) as a:
+        assert len(a) == 0
+        assert a.at_or_before("2021-01-01") is None
+
+
+def test_scale_reduced_to_fit(caplog):
+    series = Series(
+        "A",
+        "B",
+        "t",
+        "2021-01-01",
+        "2021-01-01",
+        [Price("2021-01-01", Decimal("123456789.0123456789012345"))],
+    )
+    with caplog.at_level(logging.WARNING):
+        data = archive.pack(series, "s")
+    assert data[5] == 10
+    assert "rounded to 10 decimal places" in caplog.text
+
+
+def test_amount_too_large():
+    series = Series(
+        "A",
+        "B",
+        "t",
+        "2021-01-01",
+        "2021-01-01",
+        [Price("2021-01-01", Decimal("1E19"))],
+    )
+    with pytest.raises(ValueError, match="too large"):
+        archive.pack(series, "s")
+
+
+def test_not_an_archive(tmp_path):
+    for content in [b"", b"PH", b"date,amount\n"]:
+        path = tmp_path / "other"
+        path.write_bytes(content)
+        with pytest.raises(ValueError, match="Not a pricehist archive"):
+            Archive(str(path))
+
+
+def test_format_lookup(path, caplog):
+    with caplog.at_level(logging.WARNING):
+        result = archive.format_lookup(path, ["2021-01-07", "2020-12-31", "2021-01-04"])
+    assert result == (
+        "date,price_date,base,quote,amount\n"
+        "2021-01-07,2021-01-06,EUR,AUD,1.5800\n"
+        "2021-01-04,2021-01-04,EUR,AUD,1.5928\n"
+    )
+    assert "No price found at or before 2020-12-31" in caplog.text
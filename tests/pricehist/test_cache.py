@@ -0,0 +1,78 @@
+from pathlib import Path
+
+from pricehist import cache, recorder
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000
+
+    def __call__(self):
+        return self.now
+
+
+def test_directory(monkeypatch, tmp_path):
+    monkeypatch.delenv("PRICEHIST_CACHE_DIR")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert cache.directory() == tmp_path / "pricehist"
+    monkeypatch.delenv("XDG_CACHE_HOME")
+    assert cache.directory() == Path.home() / ".cache" / "pricehist"
+    monkeypatch.setenv("PRICEHIST_CACHE_DIR", str(tmp_path / "other"))
+    assert cache.directory() == tmp_path / "other"
+
+
+def test_get_loads_once(cache_dir):
+    calls = []
+    clock = Clock()
+
+    def load():
+        calls.append(1)
+        return [{"id": 1, "symbol": "BTC"}]
+
+    assert cache.get("map", "url", 60, load, clock) == [{"id": 1, "symbol": "BTC"}]
+    assert cache.get("map", "url", 60, load, clock) == [{"id": 1, "symbol": "BTC"}]
+    assert len(calls) == 1
+    assert (cache_dir / "map.json").exists()
+
+
+def test_get_expires(cache_dir):
+    clock = Clock()
+    cache.get("map", "url", 60, lambda: "old", clock)
+    clock.now += 59
+    assert cache.get("map", "url", 60, lambda: "new", clock) == "old"
+    clock.now += 1
+    assert cache.get("map", "url", 60, lambda: "new", clock) == "new"
+
+
+def test_get_different_key_reloads(cache_dir):
+    cache.get("map", "url", 60, lambda: "old")
+    assert cache.get("map", "other", 60, lambda: "new") == "new"
+    assert cache.get("map", "other", 60, lambda: "newer") == "new"
+
+
+def test_get_ignores_unreadable_file(cache_dir):
+    cache_dir.mkdir()
+    (cache_dir / "map.json").write_text("NOT JSON")
+    assert cache.get("map", "url", 60, lambda: "new") == "new"
+    assert cache.get("map", "url", 60, lambda: "newer") == "new"
+
+
+def test_get_ignores_unwritable_directory(monkeypatch, tmp_path):
+    (tmp_path / "file").write_text("")
+    monkeypatch.setenv("PRICEHIST_CACHE_DIR", str(tmp_path / "file" / "cache"))
+    assert cache.get("map", "url", 60, lambda: "new") == "new"
+    assert cache.get("map", "url", 60, lambda: "newer") == "newer"
+
+
+def test_get_bypassed_while_recording_or_replaying(cache_dir, tmp_path):
+    cache.get("map", "url", 60, lambda: "cached")
+    try:
+        recorder.record(str(tmp_path / "recording"))
+        assert cache.get("map", "url", 60, lambda: "recorded") == "recorded"
+        recorder.replay(str(tmp_path / "recording"))
+        assert cache.get("map", "url", 60, lambda: "replayed") == "replayed"
+        assert cache.get("other", "url", 60, lambda: "replayed") == "replayed"
+    finally:
+        recorder.reset()
+    assert cache.get("map", "url", 60, lambda: "new") == "cached"
+    assert not (cache_dir / "other.json").exists()
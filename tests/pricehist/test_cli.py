@@ -1,8 +1,15 @@
 import argparse
+import json
+import logging
+from dataclasses import replace
+from decimal import Decimal
 
 import pytest
 
-from pricehist import __version__, cli, sources
+from pricehist import __version__, cli, exceptions, jobs, metrics, sources
+from pricehist.fetch import fetch
+from pricehist.fixed import FixedSeries
+from pricehist.price import Price
 
 
 def w(string):
@@ -147,6 +154,36 @@ def test_cli_source_fetch_sets_source_defaults(mocker):
     assert captured_series.type == sources.by_id["coindesk"].types()[0]
 
 
+def test_cli_search(capfd, mocker):
+    sources.by_id["ecb"].symbols = mocker.MagicMock(
+        return_value=[
+            ("EUR/AUD", "Euro against Australian Dollar"),
+            ("EUR/USD", "Euro against US Dollar"),
+        ]
+    )
+    sources.by_id["coindesk"].symbols = mocker.MagicMock(
+        return_value=[("AUD", "Australian Dollar")]
+    )
+    cli.cli(w("pricehist search australian --source ecb --source coindesk"))
+    out, err = capfd.readouterr()
+    assert out == (
+        "coindesk    AUD        Australian Dollar\n"
+        "ecb         EUR/AUD    Euro against Australian Dollar\n"
+    )
+
+
+def test_cli_search_all_uses_available_sources(capfd, mocker):
+    available = mocker.patch.object(
+        sources.by_id, "available", return_value=[sources.by_id["coindesk"]]
+    )
+    sources.by_id["coindesk"].symbols = mocker.MagicMock(
+        return_value=[("AUD", "Australian Dollar")]
+    )
+    cli.cli(w("pricehist search australian"))
+    available.assert_called_once_with()
+    assert capfd.readouterr().out == "coindesk    AUD    Australian Dollar\n"
+
+
 def test_cli_source_fetch_normalizes_symbols(mocker):
     cli.fetch = mocker.MagicMock(return_value="")
     cli.cli(w("pricehist fetch coindesk btc/eur"))
@@ -164,3 +201,319 @@ def test_cli_source_fetch_handles_brokenpipeerror(caplog, mocker):
             for r in caplog.records
         ]
     )
+
+
+def test_cli_source_fetch_replay(mocker):
+    cli.fetch = mocker.MagicMock(return_value="")
+    replay = mocker.patch.object(cli.recorder, "replay")
+    reset = mocker.patch.object(cli.recorder, "reset")
+    cli.cli(w("pricehist fetch coindesk BTC/EUR --replay some/dir"))
+    replay.assert_called_once_with("some/dir")
+    reset.assert_called_once()
+
+
+def test_cli_source_fetch_record_and_replay_exclusive(capfd):
+    with pytest.raises(SystemExit) as e:
+        cli.cli(w("pricehist fetch coindesk BTC/EUR --record a --replay b"))
+    assert e.value.code != 0
+    out, err = capfd.readouterr()
+    assert "not allowed with argument" in err
+
+
+def test_cli_serve(mocker):
+    serve = mocker.patch.object(cli.server, "serve")
+    cli.cli(w("pricehist serve --socket /tmp/prices.sock --cache-ttl 60"))
+    serve.assert_called_once_with(
+        host="127.0.0.1",
+        port=8080,
+        socket="/tmp/prices.sock",
+        cache_size=1000,
+        cache_ttl=60,
+    )
+
+
+def test_cli_serve_address_in_use(mocker, caplog):
+    error = OSError(98, "Address already in use")
+    mocker.patch.object(cli.server, "serve", side_effect=error)
+    with caplog.at_level(logging.CRITICAL):
+        with pytest.raises(SystemExit) as e:
+            cli.cli(w("pricehist serve --port 8080"))
+    assert e.value.code == 1
+    assert "Couldn't serve prices: [Errno 98] Address already in use" in caplog.text
+
+
+def test_cli_fetch_via(mocker):
+    cli.fetch = mocker.MagicMock(return_value="")
+    cli.cli(w("pricehist fetch ecb usd/jpy --via eur"))
+    assert cli.fetch.call_args.kwargs["via"] == ["EUR"]
+
+
+def test_cli_fetch_resample(mocker):
+    cli.fetch = mocker.MagicMock(return_value="")
+    cli.cli(w("pricehist fetch ecb EUR/USD --resample month --aggregate mean"))
+    assert cli.fetch.call_args.kwargs["resample"] == "month"
+    assert cli.fetch.call_args.kwargs["aggregate"] == "mean"
+
+
+def test_cli_fetch_fixed(mocker, capfd):
+    ecb = sources.by_id["ecb"]
+
+    def fetch_many(series_list):
+        for series in series_list:
+            if series.base != "EUR":
+                raise exceptions.InvalidPair(series.base, series.quote, ecb)
+        amounts = {"USD": ["1.2296", "1.2271"], "JPY": ["126.62", "126.42"]}
+        dates = ["2021-01-04", "2021-01-05"]
+        return [
+            replace(
+                s,
+                prices=[Price(d, Decimal(a)) for d, a in zip(dates, amounts[s.quote])],
+            )
+            for s in series_list
+        ]
+
+    mocker.patch.object(cli, "fetch", fetch)
+    mocker.patch.object(ecb, "fetch_many", side_effect=fetch_many)
+    args = "pricehist fetch ecb USD/JPY --via EUR -s 2021-01-04 -e 2021-01-05"
+    args += " --invert --quantize 6"
+    cli.cli(w(args))
+    expected = capfd.readouterr().out
+    spy = mocker.spy(FixedSeries, "from_series")
+    cli.cli(w(f"{args} --fixed"))
+    assert spy.call_count == 3
+    assert capfd.readouterr().out == expected
+    assert expected.splitlines()[1] == "2021-01-04,JPY,USD,0.009711,ecb,reference"
+
+
+def test_cli_fetch_binary_output(mocker, capsysbinary):
+    cli.fetch = mocker.MagicMock(return_value=b"PAR1\x00\xff")
+    mocker.patch.object(
+        cli.outputs.by_type["parquet"], "missing_dependency", return_value=None
+    )
+    cli.cli(w("pricehist fetch ecb EUR/USD -o parquet"))
+    assert capsysbinary.readouterr().out == b"PAR1\x00\xff"
+
+
+def test_cli_fetch_output_missing_dependency(mocker, capfd):
+    cli.fetch = mocker.MagicMock(return_value=b"")
+    mocker.patch.object(
+        cli.outputs.by_type["parquet"], "missing_dependency", return_value="pyarrow"
+    )
+    with pytest.raises(SystemExit) as e:
+        cli.cli(w("pricehist fetch ecb EUR/USD -o parquet"))
+    assert e.value.code == 2
+    assert "requires the pyarrow package" in capfd.readouterr().err
+    cli.fetch.assert_not_called()
+
+
+def test_cli_fetch_output_file(mocker, capfd):
+    cli.fetch = mocker.MagicMock(return_value=None)
+    cli.cli(w("pricehist fetch ecb EUR/USD -o sqlite --output-file prices.db"))
+    assert cli.fetch.call_args.kwargs["path"] == "prices.db"
+    assert capfd.readouterr().out == ""
+
+
+def test_cli_fetch_file_only_output_requires_file(mocker, capfd):
+    cli.fetch = mocker.MagicMock(return_value=None)
+    with pytest.raises(SystemExit) as e:
+        cli.cli(w("pricehist fetch ecb EUR/USD -o sqlite"))
+    assert e.value.code == 2
+    assert "can only be written to a file" in capfd.readouterr().err
+
+
+def test_cli_lookup(mocker, capfd):
+    format_lookup = mocker.patch.object(
+        cli.archive, "format_lookup", return_value="date,price_date\n"
+    )
+    cli.cli(w("pricehist lookup prices.phar 2021-01-01 2021-02-01"))
+    format_lookup.assert_called_once_with("prices.phar", ["2021-01-01", "2021-02-01"])
+    assert capfd.readouterr().out == "date,price_date\n"
+
+
+def test_cli_stats(mocker, capfd):
+    mocker.patch.object(cli.stats, "missing_dependency", return_value=None)
+    format_stats = mocker.patch.object(
+        cli.stats, "format_stats", return_value="base,quote\n"
+    )
+    cli.cli(w("pricehist stats ecb EUR/USD eur/jpy -s 2021-01-01 --window 5 -o json"))
+    series_list, source, window, output = format_stats.call_args.args
+    assert [(s.base, s.quote, s.start) for s in series_list] == [
+        ("EUR", "USD", "2021-01-01"),
+        ("EUR", "JPY", "2021-01-01"),
+    ]
+    assert source is sources.by_id["ecb"]
+    assert (window, output) == (5, "json")
+    assert capfd.readouterr().out == "base,quote\n"
+
+
+def test_cli_stats_errors(mocker, capfd):
+    format_stats = mocker.patch.object(cli.stats, "format_stats")
+    mocker.patch.object(cli.stats, "missing_dependency", return_value=None)
+    with pytest.raises(SystemExit) as e:
+        cli.cli(w("pricehist stats ecb EUR/USD --window 1"))
+    assert e.value.code == 2
+    assert "window must be at least 2" in capfd.readouterr().err
+    mocker.patch.object(cli.stats, "missing_dependency", return_value="numpy")
+    with pytest.raises(SystemExit) as e:
+        cli.cli(w("pricehist stats ecb EUR/USD"))
+    assert e.value.code == 2
+    assert "requires the numpy package" in capfd.readouterr().err
+    format_stats.assert_not_called()
+
+
+def test_cli_lookup_missing_archive(tmp_path, caplog):
+    with pytest.raises(SystemExit) as e:
+        cli.cli(w(f"pricehist lookup {tmp_path}/missing.phar 2021-01-01"))
+    assert e.value.code == 1
+    assert any(
+        r.levelname == "CRITICAL" and "No such file" in r.message
+        for r in caplog.records
+    )
+
+
+def test_cli_fetch_many_pairs(mocker):
+    cli.fetch_many = mocker.MagicMock(return_value="")
+    cli.cli(w("pricehist fetch ecb eur/usd EUR/jpy EUR/* -s 2021-01-01"))
+    series_list = cli.fetch_many.call_args.args[0]
+    assert [(s.base, s.quote) for s in series_list] == [
+        ("EUR", "USD"),
+        ("EUR", "JPY"),
+        ("EUR", "*"),
+    ]
+    assert all(s.start == "2021-01-01" for s in series_list)
+
+
+def test_cli_fetch_wildcard_uses_fetch_many(mocker):
+    cli.fetch = mocker.MagicMock(return_value="")
+    cli.fetch_many = mocker.MagicMock(return_value="")
+    cli.cli(w("pricehist fetch ecb EUR/*"))
+    cli.cli(w("pricehist fetch bankofcanada */CAD"))
+    cli.fetch.assert_not_called()
+    assert cli.fetch_many.call_count == 2
+
+
+def test_cli_fetch_many_single_pair_output(mocker, capfd):
+    cli.fetch_many = mocker.MagicMock(return_value=b"")
+    with pytest.raises(SystemExit) as e:
+        cli.cli(w("pricehist fetch ecb EUR/USD EUR/JPY -o archive"))
+    assert e.value.code == 2
+    assert "can only hold a single pair" in capfd.readouterr().err
+    cli.fetch_many.assert_not_called()
+
+
+def test_cli_fetch_merge(mocker, capfd):
+    cli.fetch_many = mocker.MagicMock(return_value="")
+    cli.cli(w("pricehist fetch ecb EUR/USD EUR/JPY --merge"))
+    assert cli.fetch_many.call_args.kwargs["merge"] is True
+    cli.cli(w("pricehist fetch ecb EUR/USD EUR/JPY"))
+    assert cli.fetch_many.call_args.kwargs["merge"] is False
+    with pytest.raises(SystemExit) as e:
+        cli.cli(w("pricehist fetch ecb EUR/USD EUR/JPY --merge -o gnucash-sql"))
+    assert e.value.code == 2
+    assert "can't merge pairs by date" in capfd.readouterr().err
+
+
+def test_cli_fetch_writes_metrics(mocker, tmp_path):
+    cli.fetch = mocker.MagicMock(return_value="")
+    path = tmp_path / "pricehist.prom"
+    cli.cli(w(f"pricehist fetch ecb EUR/USD --metrics {path}"))
+    assert path.exists()
+
+
+def test_cli_fetch_prints_nothing_after_source_error(mocker, capfd):
+    mocker.patch.object(cli, "fetch", fetch)
+    mocker.patch.object(
+        sources.by_id["ecb"], "fetch", side_effect=exceptions.BadResponse("Bad")
+    )
+    with pytest.raises(SystemExit) as e:
+        cli.cli(w("pricehist fetch ecb EUR/USD -s 2021-01-01"))
+    assert e.value.code == 1
+    assert capfd.readouterr().out == ""
+
+
+def test_cli_metrics_written_after_source_error(mocker, tmp_path):
+    def fail(series):
+        raise exceptions.BadResponse("Bad")
+
+    path = tmp_path / "pricehist.json"
+    mocker.patch.object(cli, "fetch", fetch)
+    mocker.patch.object(sources.by_id["ecb"], "fetch", side_effect=fail)
+    metrics.reset()
+    with pytest.raises(SystemExit):
+        cli.cli(w(f"pricehist fetch ecb EUR/USD -s 2021-01-01 --metrics {path}"))
+    data = json.loads(path.read_text())
+    types = [s["labels"]["type"] for s in data["pricehist_errors_total"]["series"]]
+    assert "BadResponse" in types
+
+
+def test_cli_metrics_skip_errors_recovered_from(mocker, tmp_path):
+    ecb = sources.by_id["ecb"]
+
+    def fetch_many(series_list):
+        for series in series_list:
+            if series.base != "EUR":
+                raise exceptions.InvalidPair(series.base, series.quote, ecb)
+        return [
+            replace(s, prices=[Price("2021-01-04", Decimal("1.2"))])
+            for s in series_list
+        ]
+
+    path = tmp_path / "pricehist.json"
+    mocker.patch.object(cli, "fetch", fetch)
+    mocker.patch.object(ecb, "fetch_many", side_effect=fetch_many)
+    metrics.reset()
+    cli.cli(
+        w(
+            "pricehist fetch ecb USD/JPY --via EUR -s 2021-01-04 -e 2021-01-04 "
+            f"--metrics {path}"
+        )
+    )
+    data = json.loads(path.read_text())
+    assert "pricehist_errors_total" not in data
+
+
+def test_cli_fetch_writes_trace(mocker, tmp_path):
+    cli.fetch = mocker.MagicMock(return_value="")
+    path = tmp_path / "trace.json"
+    cli.cli(w(f"pricehist fetch ecb EUR/USD --trace {path}"))
+    names = [e["name"] for e in json.loads(path.read_text())["traceEvents"]]
+    assert "cli" in names
+
+
+def test_cli_run_prints_job_output_in_order(capfd, mocker, tmp_path):
+    path = tmp_path / "jobs.toml"
+    path.write_text('[[jobs]]\nsource = "ecb"\npairs = ["EUR/AUD"]\n')
+    run = mocker.patch.object(jobs, "run", return_value=(["one\n", None], True))
+    cli.cli(w(f"pricehist run {path} --workers 2"))
+    out, err = capfd.readouterr()
+    assert out == "one\n"
+    assert run.call_args.kwargs["workers"] == 2
+
+
+def test_cli_run_fails_if_a_job_fails(mocker, tmp_path):
+    path = tmp_path / "jobs.toml"
+    path.write_text('[[jobs]]\nsource = "ecb"\npairs = ["EUR/AUD"]\n')
+    mocker.patch.object(jobs, "run", return_value=([None], False))
+    with pytest.raises(SystemExit) as e:
+        cli.cli(w(f"pricehist run {path}"))
+    assert e.value.code == 1
+
+
+def test_cli_run_invalid_job_file(capfd, tmp_path):
+    path = tmp_path / "jobs.toml"
+    path.write_text('[[jobs]]\nsource = "xxx"\npairs = ["EUR/AUD"]\n')
+    with pytest.raises(SystemExit) as e:
+        cli.cli(w(f"pricehist run {path}"))
+    assert e.value.code == 1
+    out, err = capfd.readouterr()
+    assert "Job 'job 1': Unknown source 'xxx'." in err
+
+
+def test_cli_watch_rejects_job_without_output_file(capfd, tmp_path):
+    path = tmp_path / "jobs.toml"
+    path.write_text('[[jobs]]\nsource = "ecb"\npairs = ["EUR/AUD"]\n')
+    with pytest.raises(SystemExit) as e:
+        cli.cli(w(f"pricehist watch {path}"))
+    assert e.value.code == 1
+    out, err = capfd.readouterr()
+    assert "Watched jobs need an output-file." in err
@@ -0,0 +1,116 @@
+from decimal import Decimal
+
+import pytest
+
+from pricehist import derive, exceptions
+from pricehist.fixed import FixedSeries
+from pricehist.price import Price
+from pricehist.series import Series
+from pricehist.sources.basesource import BaseSource
+
+
+def eur(quote, *amounts):
+    dates = ["2021-01-04", "2021-01-05", "2021-01-06"]
+    prices = [Price(d, Decimal(a)) for d, a in zip(dates, amounts)]
+    return Series("EUR", quote, "reference", "2021-01-04", "2021-01-06", prices)
+
+
+@pytest.fixture
+def available():
+    return [
+        eur("USD", "1.25", "1.2", "1.0"),
+        eur("JPY", "125", "132", "110"),
+        eur("GBP", "0.9", "0.9", "0.9"),
+    ]
+
+
+def amounts(series):
+    return [p.amount for p in series.prices]
+
+
+def test_chain():
+    a = eur("USD", "1.25", "1.2", "1.0").invert()
+    b = eur("JPY", "125", "132", "110")
+    result = derive.chain([a, b])
+    assert (result.base, result.quote) == ("USD", "JPY")
+    assert amounts(result) == [Decimal("100"), Decimal("110"), Decimal("110")]
+
+
+def test_chain_fixed():
+    a = FixedSeries.from_series(eur("USD", "1.25", "1.2", "1.0")).invert()
+    b = FixedSeries.from_series(eur("JPY", "125", "132", "110"))
+    result = derive.chain([a, b])
+    assert isinstance(result, FixedSeries)
+    assert amounts(result.to_series()) == [
+        Decimal("100"),
+        Decimal("110"),
+        Decimal("110"),
+    ]
+
+
+def test_cross_through_common_base(available):
+    result = derive.cross(available, "USD", "JPY")
+    assert (result.base, result.quote) == ("USD", "JPY")
+    assert amounts(result) == [Decimal("100"), Decimal("110"), Decimal("110")]
+
+
+def test_cross_direct_and_inverted(available):
+    assert amounts(derive.cross(available, "EUR", "USD"))[0] == Decimal("1.25")
+    assert amounts(derive.cross(available, "USD", "EUR"))[0] == Decimal("0.8")
+
+
+def test_cross_unavailable(available):
+    with pytest.raises(ValueError, match="No way to derive USD/CAD"):
+        derive.cross(available, "USD", "CAD")
+    with pytest.raises(ValueError, match="No way to derive USD/USD"):
+        derive.cross(available, "USD", "USD")
+
+
+@pytest.fixture
+def source(mocker, available):
+    source = mocker.MagicMock(BaseSource)
+    by_pair = {(s.base, s.quote): s for s in available}
+
+    def fetch(series):
+        if (series.base, series.quote) not in by_pair:
+            raise exceptions.InvalidPair(series.base, series.quote, source)
+        return by_pair[(series.base, series.quote)]
+
+    source.fetch = mocker.MagicMock(side_effect=fetch)
+    source.fetch_many = mocker.MagicMock(
+        side_effect=lambda series_list: [fetch(s) for s in series_list]
+    )
+    return source
+
+
+def test_fetch_via(source):
+    series = Series("USD", "JPY", "reference", "2021-01-01", "2021-01-31")
+    result = derive.fetch(series, source, ["EUR"])
+    assert (result.base, result.quote) == ("USD", "JPY")
+    assert (result.start, result.end) == ("2021-01-01", "2021-01-31")
+    assert amounts(result) == [Decimal("100"), Decimal("110"), Decimal("110")]
+    assert source.fetch_many.call_count == 2
+    requested = source.fetch_many.call_args.args[0]
+    assert [(s.base, s.quote) for s in requested] == [("EUR", "USD"), ("EUR", "JPY")]
+
+
+def test_fetch_via_fixed(source, mocker):
+    spy = mocker.spy(FixedSeries, "from_series")
+    series = Series("USD", "JPY", "reference", "2021-01-01", "2021-01-31")
+    result = derive.fetch(series, source, ["EUR"], fixed=True)
+    assert spy.call_count == 2
+    assert result == derive.fetch(series, source, ["EUR"])
+
+
+def test_fetch_via_several(source):
+    series = Series("USD", "JPY", "reference", "2021-01-01", "2021-01-31")
+    result = derive.fetch(series, source, ["EUR", "GBP", "EUR"])
+    expected = [Decimal("100"), Decimal("110"), Decimal("110")]
+    assert amounts(result.quantize(10)) == expected
+
+
+def test_fetch_via_invalid_leg(source):
+    series = Series("USD", "XXX", "reference", "2021-01-01", "2021-01-31")
+    with pytest.raises(exceptions.InvalidPair) as e:
+        derive.fetch(series, source, ["EUR"])
+    assert "EUR/XXX" in str(e.value)
@@ -5,8 +5,10 @@ from decimal import Decimal
 import pytest
 
 from pricehist import exceptions
-from pricehist.fetch import fetch
+from pricehist.fetch import _transform, fetch, fetch_many
+from pricehist.fixed import FixedSeries
 from pricehist.format import Format
+from pricehist.outputs.ledger import Ledger
 from pricehist.price import Price
 from pricehist.series import Series
 from pricehist.sources.basesource import BaseSource
@@ -31,6 +33,7 @@ def source(res_series, mocker):
 @pytest.fixture
 def output(mocker):
     output = mocker.MagicMock()
+    output.streaming = False
     output.format = mocker.MagicMock(return_value="")
     return output
 
@@ -197,3 +200,188 @@ def test_fetch_handles_source_exceptions(source, output, fmt, mocker, caplog):
     assert "something strange" in r.message
 
     assert e.value.code == 1
+
+
+def test_fetch_via_derives_pair(source, output, fmt, mocker):
+    req_series = Series("USD", "JPY", "reference", "2021-01-01", "2021-01-03")
+    derived = mocker.patch("pricehist.derive.fetch")
+    fetch(req_series, source, output, False, None, fmt, via=["EUR"])
+    derived.assert_called_once_with(req_series, source, ["EUR"], False)
+    source.fetch.assert_not_called()
+
+
+def test_fetch_resamples_before_inverting(source, res_series, output, fmt):
+    req_series = Series("BTC", "EUR", "close", "2021-01-01", "2021-01-03")
+    fetch(req_series, source, output, True, None, fmt, resample="week")
+    res_series.resample.assert_called_once_with("week", "last")
+    res_series.resample.return_value.invert.assert_called_once_with()
+
+
+def test_fetch_writes_to_path(source, res_series, output, fmt):
+    req_series = Series("BTC", "EUR", "close", "2021-01-01", "2021-01-03")
+    result = fetch(req_series, source, output, False, None, fmt, path="out.db")
+    assert result is None
+    output.write.assert_called_once_with(res_series, source, fmt, "out.db")
+    output.format.assert_not_called()
+
+
+def test_fetch_writes_to_file(source, res_series, output, fmt, mocker):
+    file = mocker.MagicMock()
+    output.format = mocker.MagicMock(return_value="rendered output")
+    req_series = Series("BTC", "EUR", "close", "2021-01-01", "2021-01-03")
+    result = fetch(req_series, source, output, False, None, fmt, file=file)
+    assert result is None
+    file.write.assert_called_once_with("rendered output")
+
+
+def chunked(series, *dates):
+    for chunk in dates:
+        prices = [Price(d, Decimal("2")) for d in chunk]
+        yield Series(
+            series.base, series.quote, series.type, chunk[0], chunk[-1], prices
+        )
+
+
+def test_fetch_streams_chunks_as_they_arrive(source, fmt, mocker, caplog):
+    written = []
+    file = mocker.MagicMock()
+    file.write = written.append
+    chunks = [["2021-01-01", "2021-01-02"], ["2021-01-02", "2021-01-03"]]
+
+    def stream(series):
+        for chunk in chunked(series, *chunks):
+            yield chunk
+            assert len(written) > 0  # Already written before the next chunk
+
+    source.stream = stream
+    req_series = Series("BTC", "EUR", "close", "2021-01-01", "2021-01-03")
+    with caplog.at_level(logging.DEBUG):
+        result = fetch(req_series, source, Ledger(), True, 2, fmt, file=file)
+
+    assert result is None
+    source.fetch.assert_not_called()
+    assert "".join(written) == (
+        "P 2021-01-01 00:00:00 EUR 0.50 BTC\n"
+        "P 2021-01-02 00:00:00 EUR 0.50 BTC\n"
+        "P 2021-01-03 00:00:00 EUR 0.50 BTC\n"
+    )
+    assert any("as requested" in r.message for r in caplog.records)
+
+
+def test_fetch_streams_to_path(source, fmt, tmp_path):
+    source.stream = lambda series: chunked(series, ["2021-01-01"], ["2021-01-03"])
+    req_series = Series("BTC", "EUR", "close", "2021-01-01", "2021-01-03")
+    path = tmp_path / "out.ledger"
+    fetch(req_series, source, Ledger(), False, None, fmt, path=str(path))
+    assert path.read_text() == (
+        "P 2021-01-01 00:00:00 BTC 2 EUR\nP 2021-01-03 00:00:00 BTC 2 EUR\n"
+    )
+
+
+def test_fetch_stream_failure_keeps_existing_file(source, fmt, tmp_path):
+    def stream(series):
+        yield from chunked(series, ["2021-01-01"])
+        raise exceptions.RequestError("Connection refused")
+
+    source.stream = stream
+    req_series = Series("BTC", "EUR", "close", "2021-01-01", "2021-01-03")
+    path = tmp_path / "out.ledger"
+    path.write_text("P 2020-12-31 BTC 1 EUR\n")
+    with pytest.raises(SystemExit):
+        fetch(req_series, source, Ledger(), False, None, fmt, path=str(path))
+    assert path.read_text() == "P 2020-12-31 BTC 1 EUR\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.ledger"]
+
+
+def test_fetch_streams_empty(source, fmt, mocker, caplog):
+    file = mocker.MagicMock()
+    source.stream = lambda series: iter(
+        [Series(series.base, series.quote, series.type, series.start, series.end)]
+    )
+    req_series = Series("BTC", "EUR", "close", "2021-01-01", "2021-01-03")
+    fetch(req_series, source, Ledger(), False, None, fmt, file=file)
+    assert any("No data found" in r.message for r in caplog.records)
+
+
+def test_fetch_many_formats_all_series(source, res_series, output, fmt, mocker):
+    req_list = [
+        Series("EUR", "USD", "reference", "2021-01-01", "2021-01-03"),
+        Series("EUR", "JPY", "reference", "2021-01-01", "2021-01-03"),
+    ]
+    source.fetch_many = mocker.MagicMock(return_value=[res_series, res_series])
+    output.format_many = mocker.MagicMock(return_value="rendered output")
+    result = fetch_many(req_list, source, output, False, None, fmt)
+    source.fetch_many.assert_called_once_with(req_list)
+    output.format_many.assert_called_once_with(
+        [res_series, res_series], source, fmt=fmt
+    )
+    assert result == "rendered output"
+
+
+def test_fetch_many_merged(source, res_series, output, fmt, mocker):
+    req_list = [Series("EUR", "USD", "reference", "2021-01-01", "2021-01-03")] * 2
+    source.fetch_many = mocker.MagicMock(return_value=[res_series, res_series])
+    output.format_merged = mocker.MagicMock(return_value="merged output")
+    result = fetch_many(req_list, source, output, False, None, fmt, merge=True)
+    output.format_merged.assert_called_once_with(
+        [res_series, res_series], source, fmt=fmt
+    )
+    output.format_many.assert_not_called()
+    assert result == "merged output"
+
+    fetch_many(req_list, source, output, False, None, fmt, path="out", merge=True)
+    output.write_merged.assert_called_once_with(
+        [res_series, res_series], source, fmt, "out"
+    )
+    output.write_many.assert_not_called()
+
+
+def test_fetch_many_transforms_each(source, res_series, output, fmt, mocker):
+    req_list = [Series("EUR", "USD", "reference", "2021-01-01", "2021-01-03")] * 2
+    source.fetch_many = mocker.MagicMock(return_value=[res_series, res_series])
+    fetch_many(req_list, source, output, True, 2, fmt)
+    assert res_series.invert.call_count == 2
+    assert res_series.invert.return_value.quantize.call_count == 2
+
+
+def test_fetch_many_via(source, output, fmt, mocker):
+    req_list = [
+        Series("USD", "JPY", "reference", "2021-01-01", "2021-01-03"),
+        Series("USD", "GBP", "reference", "2021-01-01", "2021-01-03"),
+    ]
+    derived = mocker.patch("pricehist.derive.fetch")
+    fetch_many(req_list, source, output, False, None, fmt, via=["EUR"])
+    assert derived.call_count == 2
+    source.fetch_many.assert_not_called()
+
+
+def test_fetch_many_warns_per_pair(source, output, fmt, mocker, caplog):
+    req_list = [Series("EUR", "USD", "reference", "2021-01-01", "2021-01-03")]
+    source.fetch_many = mocker.MagicMock(return_value=req_list)
+    with caplog.at_level(logging.INFO):
+        fetch_many(req_list, source, output, False, None, fmt)
+    assert "EUR/USD: No data found for the interval" in caplog.text
+
+
+def test_fetch_many_writes_to_path(source, res_series, output, fmt, mocker):
+    req_list = [Series("EUR", "USD", "reference", "2021-01-01", "2021-01-03")]
+    source.fetch_many = mocker.MagicMock(return_value=[res_series])
+    result = fetch_many(req_list, source, output, False, None, fmt, path="out.db")
+    assert result is None
+    output.write_many.assert_called_once_with([res_series], source, fmt, "out.db")
+
+
+@pytest.mark.parametrize(
+    "invert,quantize,resample", [(False, None, None), (True, 2, "month")]
+)
+def test_transform_fixed(mocker, invert, quantize, resample):
+    prices = [
+        Price("2021-01-04", Decimal("1.2296")),
+        Price("2021-01-05", Decimal("1.2271")),
+        Price("2021-02-01", Decimal("1.2338")),
+    ]
+    series = Series("EUR", "USD", "reference", "2021-01-01", "2021-02-28", prices)
+    spy = mocker.spy(FixedSeries, "from_series")
+    result = _transform(series, invert, quantize, resample, "mean", fixed=True)
+    assert spy.call_count == (1 if invert else 0)
+    assert result == _transform(series, invert, quantize, resample, "mean")
@@ -0,0 +1,146 @@
+from dataclasses import replace
+from decimal import Decimal, localcontext
+
+import pytest
+
+from pricehist.fixed import FixedSeries
+from pricehist.price import Price
+from pricehist.series import Series
+
+
+def prices(*rows):
+    return [Price(d, Decimal(a)) for d, a in rows]
+
+
+@pytest.fixture
+def series():
+    return Series(
+        "BASE",
+        "QUOTE",
+        "type",
+        "2021-01-01",
+        "2021-03-31",
+        prices(
+            ("2021-01-01", "1.14"),
+            ("2021-01-02", "2.25"),
+            ("2021-01-04", "3.35"),
+            ("2021-01-05", "0.0004461"),
+            ("2021-01-11", "12345.5"),
+            ("2021-02-01", "7"),
+            ("2021-02-02", "1.012345678901234567890123456789"),
+            ("2021-03-15", "-4.46"),
+            ("2021-03-16", "98765432109876543210.987"),
+        ),
+    )
+
+
+@pytest.fixture
+def other():
+    return Series(
+        "QUOTE",
+        "OTHER",
+        "type",
+        "2021-01-02",
+        "2021-06-30",
+        prices(
+            ("2021-01-02", "1.5"),
+            ("2021-01-03", "1.6"),
+            ("2021-01-04", "0.3"),
+            ("2021-01-11", "3.333333333333333333333333333"),
+            ("2021-03-16", "123456789.123456789"),
+        ),
+    )
+
+
+def same(fixed, series):
+    result = fixed.to_series()
+    assert (result.base, result.quote) == (series.base, series.quote)
+    assert (result.start, result.end) == (series.start, series.end)
+    assert [p.date for p in result.prices] == [p.date for p in series.prices]
+    assert [p.amount for p in result.prices] == [p.amount for p in series.prices]
+
+
+def test_round_trip(series):
+    fixed = FixedSeries.from_series(series)
+    assert fixed.exponent == -30
+    assert fixed.to_series() == series
+
+
+def test_round_trip_empty():
+    empty = Series("BASE", "QUOTE", "type", "2021-01-01", "2021-01-31")
+    assert FixedSeries.from_series(empty).to_series() == empty
+
+
+def test_invert(series):
+    same(FixedSeries.from_series(series).invert(), series.invert())
+
+
+def test_invert_zero(series):
+    zero = replace(series, prices=prices(("2021-01-01", "0")))
+    with pytest.raises(ZeroDivisionError):
+        FixedSeries.from_series(zero).invert()
+
+
+@pytest.mark.parametrize("places", [-1, 0, 1, 2, 3, 10, 26, 27, 35])
+def test_quantize(series, places):
+    same(FixedSeries.from_series(series).quantize(places), series.quantize(places))
+
+
+def test_quantize_writes_the_same_places(series):
+    subject = replace(series, prices=series.prices[0:6])
+    result = FixedSeries.from_series(subject).quantize(3).to_series()
+    assert [str(p.amount) for p in result.prices] == [
+        str(p.amount) for p in subject.quantize(3).prices
+    ]
+
+
+def test_cross(series, other):
+    fixed = FixedSeries.from_series(series).cross(FixedSeries.from_series(other))
+    same(fixed, series.cross(other))
+
+
+def test_cross_requires_matching_symbols(series):
+    fixed = FixedSeries.from_series(series)
+    with pytest.raises(ValueError, match="Can't cross BASE/QUOTE with BASE/QUOTE"):
+        fixed.cross(fixed)
+
+
+def test_mid(series, other):
+    low = replace(other, base="BASE", quote="QUOTE")
+    by_date = {p.date: p.amount for p in low.prices}
+    expected = replace(
+        series,
+        prices=[
+            Price(p.date, sum([p.amount, by_date[p.date]]) / 2)
+            for p in series.prices
+            if p.date in by_date
+        ],
+    )
+    fixed = FixedSeries.from_series(series).mid(FixedSeries.from_series(low))
+    same(fixed, expected)
+
+
+@pytest.mark.parametrize("period", ["week", "month", "quarter", "year"])
+@pytest.mark.parametrize("aggregate", ["last", "first", "high", "low", "mean"])
+def test_resample(series, period, aggregate):
+    fixed = FixedSeries.from_series(series).resample(period, aggregate)
+    same(fixed, series.resample(period, aggregate))
+
+
+def test_resample_unknown_period_or_aggregate(series):
+    fixed = FixedSeries.from_series(series)
+    with pytest.raises(ValueError, match="Unknown resampling period 'day'"):
+        fixed.resample("day")
+    with pytest.raises(ValueError, match="Unknown resampling aggregate 'median'"):
+        fixed.resample("month", "median")
+
+
+def test_uses_context_precision(series, other):
+    series = replace(series, prices=series.prices[0:7])
+    with localcontext() as ctx:
+        ctx.prec = 12
+        fixed = FixedSeries.from_series(series)
+        same(fixed.invert(), series.invert())
+        same(fixed.quantize(8), series.quantize(8))
+        same(fixed.resample("month", "mean"), series.resample("month", "mean"))
+        same(fixed.cross(FixedSeries.from_series(other)), series.cross(other))
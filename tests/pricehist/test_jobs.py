@@ -0,0 +1,256 @@
+import logging
+from dataclasses import replace
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from pricehist import exceptions, jobs, metrics, outputs, sources
+from pricehist.price import Price
+
+EUR = {
+    "AUD": ["1.5928", "1.5927", "1.5824"],
+    "USD": ["1.2296", "1.2271", "1.2338"],
+}
+DATES = ["2021-01-04", "2021-01-05", "2021-01-06"]
+
+
+@pytest.fixture
+def ecb(mocker):
+    ecb = sources.by_id["ecb"]
+
+    def fetch_many(series_list):
+        # Like the real source, a wildcard leaves out the quotes asked for.
+        wanted = {series.quote for series in series_list}
+        for series in series_list:
+            if series.base != "EUR" or series.quote not in [*EUR, "*"]:
+                raise exceptions.InvalidPair(series.base, series.quote, ecb)
+        return [
+            replace(
+                series,
+                quote=quote,
+                prices=[
+                    Price(d, Decimal(a))
+                    for d, a in zip(DATES, EUR[quote])
+                    if series.start <= d <= series.end
+                ],
+            )
+            for series in series_list
+            for quote in (
+                [q for q in EUR if q not in wanted]
+                if series.quote == "*"
+                else [series.quote]
+            )
+        ]
+
+    mocker.patch.object(ecb, "fetch_many", side_effect=fetch_many)
+    return ecb
+
+
+@pytest.fixture
+def coindesk(mocker):
+    coindesk = sources.by_id["coindesk"]
+
+    def fetch(series):
+        prices = [Price(d, Decimal("30000")) for d in DATES]
+        return replace(series, prices=prices)
+
+    mocker.patch.object(coindesk, "fetch", side_effect=fetch)
+    return coindesk
+
+
+def parse(*job_specs, **defaults):
+    return jobs.parse({"defaults": defaults, "jobs": list(job_specs)})
+
+
+def test_parse_applies_defaults():
+    job, other = parse(
+        {"source": "ecb", "pairs": ["EUR/AUD"], "fmt": {"decimal": ","}},
+        {"name": "other", "source": "ecb", "pairs": "EUR/USD", "start": "2021-02-01"},
+        start=date(2021, 1, 4),
+        output="ledger",
+        fmt={"thousands": "."},
+        fixed=True,
+    )
+    assert job.name == "job 1"
+    assert job.series_list[0].start == "2021-01-04"
+    assert job.series_list[0].type == "reference"
+    assert job.output is outputs.by_type["ledger"]
+    assert (job.fmt.decimal, job.fmt.thousands) == (",", ".")
+    assert other.name == "other"
+    assert other.series_list[0].start == "2021-02-01"
+    assert other.fmt.decimal == "."
+    assert job.fixed and other.fixed
+
+
+@pytest.mark.parametrize(
+    "spec,message",
+    [
+        ({"pairs": ["EUR/AUD"]}, "No source given."),
+        ({"source": "xxx", "pairs": ["EUR/AUD"]}, "Unknown source 'xxx'."),
+        ({"source": "ecb"}, "No pairs given."),
+        ({"source": "ecb", "pairs": ["/AUD"]}, "No base found"),
+        ({"source": "ecb", "pairs": ["EUR/AUD"], "other": 1}, "Unknown key 'other'."),
+        ({"source": "ecb", "pairs": ["EUR/AUD"], "start": "x"}, "Not a valid"),
+        ({"source": "ecb", "pairs": ["EUR/AUD"], "type": "close"}, "not recognized"),
+        ({"source": "ecb", "pairs": ["EUR/AUD"], "fmt": {"x": 1}}, "Unknown fmt key"),
+        (
+            {"source": "ecb", "pairs": ["EUR/AUD", "EUR/USD"], "output": "archive"},
+            "can only hold a single pair",
+        ),
+        (
+            {"source": "ecb", "pairs": ["EUR/AUD"], "output": "sqlite"},
+            "can only be written to a file",
+        ),
+        (
+            {"source": "ecb", "pairs": ["EUR/*"], "via": ["USD"]},
+            "Wildcard pairs can't be derived",
+        ),
+    ],
+)
+def test_parse_errors(spec, message):
+    with pytest.raises(ValueError, match=message):
+        parse(spec)
+
+
+def test_parse_duplicate_names():
+    spec = {"name": "same", "source": "ecb", "pairs": ["EUR/AUD"]}
+    with pytest.raises(ValueError, match="More than one job is named 'same'."):
+        parse(spec, spec)
+
+
+def test_load_invalid_toml(tmp_path):
+    path = tmp_path / "jobs.toml"
+    path.write_text("[[jobs]\n")
+    with pytest.raises(ValueError, match="Invalid job file"):
+        jobs.load(str(path))
+
+
+def test_load(tmp_path):
+    path = tmp_path / "jobs.toml"
+    path.write_text('[[jobs]]\nsource = "ecb"\npairs = ["EUR/AUD"]\nend = 2021-01-06\n')
+    (job,) = jobs.load(str(path))
+    assert job.series_list[0].end == "2021-01-06"
+
+
+def test_run_fetches_shared_pairs_once(ecb):
+    job_list = parse(
+        {"source": "ecb", "pairs": ["EUR/AUD"]},
+        {"source": "ecb", "pairs": ["EUR/USD"], "start": "2021-01-05"},
+        {"source": "ecb", "pairs": ["AUD/USD"], "via": ["EUR"], "quantize": 4},
+        start="2021-01-04",
+        end="2021-01-06",
+    )
+    results, succeeded = jobs.run(job_list)
+
+    assert succeeded
+    requested = [
+        [(s.base, s.quote, s.start) for s in call.args[0]]
+        for call in ecb.fetch_many.call_args_list
+    ]
+    assert requested == [
+        [
+            ("EUR", "AUD", "2021-01-04"),
+            ("EUR", "USD", "2021-01-04"),
+            ("AUD", "EUR", "2021-01-04"),
+        ],
+        [("EUR", "AUD", "2021-01-04"), ("EUR", "USD", "2021-01-04")],
+    ]
+    assert results[0].splitlines()[1] == "2021-01-04,EUR,AUD,1.5928,ecb,reference"
+    assert results[1].splitlines()[1] == "2021-01-05,EUR,USD,1.2271,ecb,reference"
+    assert results[2].splitlines()[1] == "2021-01-04,AUD,USD,0.7720,ecb,reference"
+
+
+def test_run_fetches_wildcard_with_other_pairs_once(ecb):
+    job_list = parse(
+        {"source": "ecb", "pairs": ["EUR/*"]},
+        {"source": "ecb", "pairs": ["EUR/USD"], "start": "2021-01-06"},
+        start="2021-01-04",
+        end="2021-01-06",
+    )
+    results, succeeded = jobs.run(job_list)
+
+    assert succeeded
+    assert ecb.fetch_many.call_count == 1
+    requested = ecb.fetch_many.call_args.args[0]
+    assert [(s.base, s.quote, s.start) for s in requested] == [
+        ("EUR", "*", "2021-01-04"),
+        ("EUR", "USD", "2021-01-04"),
+    ]
+    assert len(results[0].splitlines()) == 7
+    assert "2021-01-04,EUR,USD,1.2296,ecb,reference" in results[0]
+    assert results[1].splitlines()[1:] == ["2021-01-06,EUR,USD,1.2338,ecb,reference"]
+
+
+def test_run_fetches_other_sources_per_pair(ecb, coindesk):
+    job_list = parse(
+        {"source": "coindesk", "pairs": ["BTC/USD", "BTC/EUR"]},
+        {"source": "coindesk", "pairs": ["BTC/USD"], "invert": True},
+        {"source": "ecb", "pairs": ["EUR/USD"]},
+        start="2021-01-04",
+        end="2021-01-06",
+    )
+    results, succeeded = jobs.run(job_list)
+
+    assert succeeded
+    assert coindesk.fetch.call_count == 2
+    assert ecb.fetch_many.call_count == 1
+    assert len(results[0].splitlines()) == 7
+    assert results[1].splitlines()[1].startswith("2021-01-04,USD,BTC,")
+
+
+def test_run_writes_output_files(ecb, tmp_path):
+    path = tmp_path / "prices.ledger"
+    job_list = parse(
+        {"source": "ecb", "pairs": ["EUR/AUD"], "output": "ledger"},
+        start="2021-01-04",
+        end="2021-01-04",
+        **{"output-file": str(path)},
+    )
+    results, succeeded = jobs.run(job_list)
+    assert results == [None]
+    assert path.read_text() == "P 2021-01-04 00:00:00 EUR 1.5928 AUD\n"
+
+
+def test_run_failed_pair_only_fails_jobs_that_need_it(ecb, caplog):
+    job_list = parse(
+        {"name": "good", "source": "ecb", "pairs": ["EUR/AUD"]},
+        {"name": "bad", "source": "ecb", "pairs": ["EUR/XXX"]},
+        start="2021-01-04",
+        end="2021-01-06",
+    )
+    with caplog.at_level(logging.CRITICAL):
+        results, succeeded = jobs.run(job_list)
+    assert not succeeded
+    assert results[0] is not None
+    assert results[1] is None
+    assert "Job 'bad' failed: Invalid pair 'EUR/XXX'." in caplog.text
+
+
+def test_run_counts_errors_of_failed_jobs_only(ecb):
+    job_list = parse(
+        {"name": "derived", "source": "ecb", "pairs": ["AUD/USD"], "via": ["EUR"]},
+        {"name": "bad", "source": "ecb", "pairs": ["EUR/XXX"]},
+        start="2021-01-04",
+        end="2021-01-06",
+    )
+    metrics.reset()
+    results, _ = jobs.run(job_list)
+    assert results[0] is not None
+    assert metrics.snapshot()["pricehist_errors_total"] == {
+        (("source", "ecb"), ("type", "InvalidPair")): 1
+    }
+    metrics.reset()
+
+
+def test_run_skips_jobs_after_failed_fetch(ecb, caplog):
+    ecb.fetch_many.side_effect = exceptions.RequestError("Network issue")
+    job_list = parse({"name": "euro", "source": "ecb", "pairs": ["EUR/AUD"]})
+    with caplog.at_level(logging.WARNING):
+        results, succeeded = jobs.run(job_list)
+    assert (results, succeeded) == ([None], False)
+    assert (
+        "Fetching from ecb failed: An error occured while making a request"
+        in caplog.text
+    )
+    assert "Job 'euro' skipped after an earlier failure." in caplog.text
@@ -0,0 +1,34 @@
+from decimal import Decimal
+
+import pytest
+
+from pricehist import jsonparse
+
+
+@pytest.fixture(params=["orjson", "json"])
+def decoder(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(jsonparse, "orjson", None)
+    return request.param
+
+
+def test_floats_left_as_text(decoder):
+    data = jsonparse.loads(b'{"a": 1.10, "b": 2, "c": [0.1, null]}')
+    assert data == {"a": "1.10", "b": 2, "c": ["0.1", None]}
+    assert Decimal(data["a"]) == Decimal("1.10")
+    assert str(Decimal(data["a"])) == "1.10"
+
+
+def test_string_amounts_kept(decoder):
+    content = b'{"2021-01-04": {"1. open": "1.57496", "4. close": "1.57823"}}'
+    data = jsonparse.loads(content, amounts_are_strings=True)
+    assert data["2021-01-04"]["4. close"] == "1.57823"
+
+
+def test_invalid_content_raises(decoder):
+    with pytest.raises(ValueError):
+        jsonparse.loads(b"{not json", amounts_are_strings=True)
+    with pytest.raises(ValueError):
+        jsonparse.loads(b"{not json")
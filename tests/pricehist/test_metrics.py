@@ -0,0 +1,132 @@
+import json
+from datetime import timedelta
+
+import pytest
+import responses
+
+from pricehist import exceptions, jsonparse, metrics
+from pricehist.sources.coindesk import CoinDesk
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+@pytest.fixture
+def response(mocker):
+    response = mocker.MagicMock()
+    response.request.url = "https://api.pro.coinbase.com/products/BTC-EUR/candles?x=1"
+    response.status_code = 200
+    response.content = b"0123456789"
+    response.elapsed = timedelta(seconds=0.2)
+    return response
+
+
+def test_record_response(response):
+    metrics.record_response("coinbasepro", response)
+    metrics.record_response("coinbasepro", response)
+    values = metrics.snapshot()
+    labels = (("source", "coinbasepro"), ("endpoint", "/products/*/candles"))
+    assert values["pricehist_requests_total"] == {labels + (("status", "200"),): 2}
+    assert values["pricehist_response_bytes_total"] == {labels: 20}
+    histogram = values["pricehist_request_seconds"][labels]
+    assert histogram["count"] == 2
+    assert histogram["sum"] == pytest.approx(0.4)
+    assert histogram["buckets"] == [0, 0, 2, 2, 2, 2, 2, 2, 2]
+
+
+def test_parsing_attributed_to_last_response(response):
+    metrics.record_response("coinbasepro", response)
+    jsonparse.loads(b'{"a": 1.5}')
+    labels = (("source", "coinbasepro"), ("endpoint", "/products/*/candles"))
+    assert metrics.snapshot()["pricehist_parse_seconds"][labels]["count"] == 1
+
+
+def test_errors_counted_by_type(response, mocker):
+    source = mocker.MagicMock()
+    source.id = mocker.MagicMock(return_value="ecb")
+    exceptions.count(exceptions.InvalidPair("EUR", "XXX", source))
+    metrics.begin("coindesk", "https://api.coindesk.com/v1/bpi/x.json")
+    exceptions.count(exceptions.RequestError("Network issue"))
+    exceptions.count(exceptions.RequestError("Network issue"))
+    assert metrics.snapshot()["pricehist_errors_total"] == {
+        (("source", "ecb"), ("type", "InvalidPair")): 1,
+        (("source", "coindesk"), ("type", "RequestError")): 2,
+    }
+
+
+def test_errors_not_counted_when_raised(mocker):
+    source = mocker.MagicMock()
+    source.id = mocker.MagicMock(return_value="ecb")
+    try:
+        raise exceptions.InvalidPair("EUR", "XXX", source)
+    except exceptions.InvalidPair:
+        pass
+    assert "pricehist_errors_total" not in metrics.snapshot()
+
+
+def test_errors_counted_by_handler(mocker):
+    metrics.begin("coindesk", "https://api.coindesk.com/v1/bpi/x.json")
+    with pytest.raises(SystemExit):
+        with exceptions.handler():
+            raise exceptions.RequestError("Network issue")
+    assert metrics.snapshot()["pricehist_errors_total"] == {
+        (("source", "coindesk"), ("type", "RequestError")): 1,
+    }
+
+
+def test_format_prometheus(response):
+    metrics.record_response("coinbasepro", response)
+    metrics.record_error(exceptions.BadResponse("x"), 'odd"id')
+    text = metrics.format_prometheus()
+    labels = 'source="coinbasepro",endpoint="/products/*/candles"'
+    assert "# TYPE pricehist_requests_total counter\n" in text
+    assert f'pricehist_requests_total{{{labels},status="200"}} 1\n' in text
+    assert f'pricehist_request_seconds_bucket{{{labels},le="0.1"}} 0\n' in text
+    assert f'pricehist_request_seconds_bucket{{{labels},le="0.25"}} 1\n' in text
+    assert f'pricehist_request_seconds_bucket{{{labels},le="+Inf"}} 1\n' in text
+    assert f"pricehist_request_seconds_sum{{{labels}}} 0.2\n" in text
+    assert f"pricehist_request_seconds_count{{{labels}}} 1\n" in text
+    assert 'source="odd\\"id",type="BadResponse"} 1\n' in text
+
+
+def test_format_json(response):
+    metrics.record_response("coinbasepro", response)
+    data = json.loads(metrics.format_json())
+    assert data["pricehist_response_bytes_total"]["series"] == [
+        {
+            "labels": {"source": "coinbasepro", "endpoint": "/products/*/candles"},
+            "value": 10,
+        }
+    ]
+    histogram = data["pricehist_request_seconds"]["series"][0]
+    assert histogram["buckets"]["0.25"] == 1
+    assert histogram["buckets"]["+Inf"] == 1
+    assert histogram["count"] == 1
+
+
+def test_write(response, tmp_path):
+    metrics.record_response("coinbasepro", response)
+    metrics.write(str(tmp_path / "pricehist.prom"))
+    metrics.write(str(tmp_path / "pricehist.json"))
+    assert (tmp_path / "pricehist.prom").read_text() == metrics.format_prometheus()
+    assert json.loads((tmp_path / "pricehist.json").read_text())
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "pricehist.json",
+        "pricehist.prom",
+    ]
+
+
+def test_source_requests_recorded():
+    url = "https://api.coindesk.com/v1/bpi/supported-currencies.json"
+    body = '[{"currency": "AUD", "country": "Australian Dollar"}]'
+    with responses.RequestsMock() as mock:
+        mock.add(responses.GET, url, body=body)
+        CoinDesk().symbols()
+    values = metrics.snapshot()
+    labels = (("source", "coindesk"), ("endpoint", "/v1/bpi/supported-currencies.json"))
+    assert values["pricehist_requests_total"][labels + (("status", "200"),)] == 1
+    assert values["pricehist_parse_seconds"][labels]["count"] == 1
@@ -0,0 +1,106 @@
+import json
+import os
+
+import pytest
+import requests
+import responses
+
+from pricehist import exceptions, recorder
+from pricehist.series import Series
+from pricehist.sources.coindesk import CoinDesk
+
+
+@pytest.fixture(autouse=True)
+def reset_recorder():
+    yield
+    recorder.reset()
+
+
+@pytest.fixture
+def src():
+    return CoinDesk()
+
+
+@pytest.fixture
+def url():
+    return "https://api.coindesk.com/v1/bpi/historical/close.json"
+
+
+@pytest.fixture
+def body():
+    return '{"bpi": {"2021-01-01": 29391.775, "2021-01-02": 32198.48}}'
+
+
+@pytest.fixture
+def series():
+    return Series("BTC", "USD", "close", "2021-01-01", "2021-01-02")
+
+
+def record_one(src, url, body, series, directory):
+    recorder.record(directory)
+    with responses.RequestsMock() as mock:
+        mock.add(responses.GET, url, body=body, status=200)
+        return src.fetch(series)
+
+
+def test_record_saves_one_file_per_request(src, url, body, series, tmp_path):
+    record_one(src, url, body, series, str(tmp_path))
+    files = os.listdir(tmp_path)
+    assert len(files) == 1
+    assert files[0].startswith("api.coindesk.com-")
+    exchange = json.loads((tmp_path / files[0]).read_text())
+    assert exchange["request"]["method"] == "GET"
+    assert exchange["request"]["url"].startswith(url)
+    assert exchange["response"]["status"] == 200
+    assert exchange["response"]["body"] == body
+
+
+def test_replay_without_network(src, url, body, series, tmp_path):
+    recorded = record_one(src, url, body, series, str(tmp_path))
+    recorder.replay(str(tmp_path))
+    with responses.RequestsMock():  # Any real request would fail.
+        replayed = src.fetch(series)
+    assert replayed == recorded
+
+
+def test_replay_missing_response(src, series, tmp_path):
+    recorder.replay(str(tmp_path))
+    with pytest.raises(exceptions.RequestError) as e:
+        src.fetch(series)
+    assert "No recorded response" in str(e.value)
+
+
+def test_not_recording_saves_nothing(src, url, body, series, tmp_path):
+    with responses.RequestsMock() as mock:
+        mock.add(responses.GET, url, body=body, status=200)
+        src.fetch(series)
+    assert os.listdir(tmp_path) == []
+
+
+def test_credentials_not_saved_or_matched(tmp_path):
+    url = "https://www.alphavantage.co/query"
+    recorder.record(str(tmp_path))
+    with responses.RequestsMock() as mock:
+        mock.add(responses.GET, url, body="{}", status=200)
+        response = requests.get(url, params={"function": "X", "apikey": "SECRET"})
+        recorder.save(response)
+    (path,) = tmp_path.iterdir()
+    assert "SECRET" not in path.read_text()
+
+    recorder.replay(str(tmp_path))
+    with recorder.session() as session:
+        replayed = session.get(url, params={"function": "X", "apikey": "OTHER"})
+    assert replayed.status_code == 200
+    assert replayed.text == "{}"
+
+
+def test_binary_body_round_trip(tmp_path):
+    url = "https://example.com/data"
+    recorder.record(str(tmp_path))
+    with responses.RequestsMock() as mock:
+        mock.add(responses.GET, url, body=b"\xff\x00\xfe", status=200)
+        recorder.save(requests.get(url))
+
+    recorder.replay(str(tmp_path))
+    with recorder.session() as session:
+        assert session.get(url).content == b"\xff\x00\xfe"
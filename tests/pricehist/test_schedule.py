@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+
+from pricehist.schedule import EVERY_DAY, Publication
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_next_follows_daylight_saving_time():
+    ecb = Publication("16:00", "Europe/Berlin")
+    assert ecb.next(utc(2021, 1, 4, 10)) == utc(2021, 1, 4, 15)
+    assert ecb.next(utc(2021, 7, 1, 10)) == utc(2021, 7, 1, 14)
+
+
+def test_next_skips_to_next_weekday():
+    boc = Publication("16:30", "America/Toronto")
+    assert boc.next(utc(2021, 1, 8, 21, 30)) == utc(2021, 1, 11, 21, 30)
+    assert boc.next(utc(2021, 1, 8, 21, 29)) == utc(2021, 1, 8, 21, 30)
+
+
+def test_latest_date():
+    ecb = Publication("16:00", "Europe/Berlin")
+    assert ecb.latest_date(utc(2021, 1, 5, 14, 59)) == "2021-01-04"
+    assert ecb.latest_date(utc(2021, 1, 5, 15)) == "2021-01-05"
+    assert ecb.latest_date(utc(2021, 1, 10, 12)) == "2021-01-08"
+
+
+def test_published_days_later():
+    crypto = Publication("00:00", "UTC", EVERY_DAY, days_later=1)
+    assert crypto.latest_date(utc(2021, 1, 10, 0, 30)) == "2021-01-09"
+    assert crypto.next(utc(2021, 1, 10, 0, 30)) == utc(2021, 1, 11)
@@ -0,0 +1,131 @@
+import logging
+
+import pytest
+
+from pricehist import exceptions, search
+from pricehist.search import Index
+from pricehist.sources.basesource import BaseSource
+
+
+@pytest.fixture
+def index():
+    return Index(
+        [
+            ("ecb", "EUR/USD", "Euro against US Dollar"),
+            ("coinmarketcap", "id=1", "BTC Bitcoin"),
+            ("coinmarketcap", "id=1831", "BCH Bitcoin Cash"),
+            ("coindesk", "BTC", "Bitcoin"),
+            ("coindesk", "BTCX", "Bitcoin X"),
+            ("alphavantage", "ETH", "Ethereum"),
+        ]
+    )
+
+
+def test_exact_symbol_first(index):
+    results = index.search("btc")
+    assert results[0] == ("coindesk", "BTC", "Bitcoin")
+    assert results[1] == ("coindesk", "BTCX", "Bitcoin X")
+    assert ("coinmarketcap", "id=1", "BTC Bitcoin") in results
+
+
+def test_prefix(index):
+    assert index.search("eur/")[0] == ("ecb", "EUR/USD", "Euro against US Dollar")
+
+
+def test_words_in_description(index):
+    results = index.search("bitcoin cash")
+    assert results[0] == ("coinmarketcap", "id=1831", "BCH Bitcoin Cash")
+
+
+def test_typo_tolerated(index):
+    results = [symbol for _, symbol, _ in index.search("etherium")]
+    assert results == ["ETH"]
+
+
+def test_no_match(index):
+    assert index.search("zzzzzz") == []
+    assert index.search("  ") == []
+
+
+def test_limit(index):
+    assert len(index.search("bitcoin", limit=2)) == 2
+
+
+@pytest.fixture
+def src(mocker):
+    src = mocker.MagicMock(BaseSource)
+    src.BASE_URL_NAME = BaseSource.BASE_URL_NAME
+    src.id = mocker.MagicMock(return_value="testsource")
+    src.symbols = mocker.MagicMock(return_value=[("BTC", "Bitcoin"), ("ETH", "Ether")])
+    return src
+
+
+def test_entries_cached(src):
+    for _ in range(3):
+        assert search.entries([src]) == [
+            ("testsource", "BTC", "Bitcoin"),
+            ("testsource", "ETH", "Ether"),
+        ]
+    assert src.symbols.call_count == 1
+    search.entries([src], refresh=True)
+    assert src.symbols.call_count == 2
+
+
+def test_entries_cached_per_base_url(src, monkeypatch):
+    search.entries([src])
+    monkeypatch.setenv(BaseSource.BASE_URL_NAME, "http://127.0.0.1:1")
+    search.entries([src])
+    assert src.symbols.call_count == 2
+
+
+def test_entries_skip_failing_source(src, mocker, caplog):
+    other = mocker.MagicMock(BaseSource)
+    other.BASE_URL_NAME = BaseSource.BASE_URL_NAME
+    other.id = mocker.MagicMock(return_value="other")
+    other.symbols.side_effect = exceptions.RequestError("Network issue")
+    assert len(search.entries([other, src])) == 2
+    assert any(
+        r.levelname == "WARNING" and "Skipping other" in r.message
+        for r in caplog.records
+    )
+
+
+def test_index_cached(src, mocker, cache_dir):
+    entries = mocker.spy(search, "_entries")
+    for _ in range(3):
+        assert search.index([src]).search("btc")[0][1] == "BTC"
+    assert entries.call_count == 1
+    assert (cache_dir / "search-index-testsource.json").exists()
+    search.index([src], refresh=True)
+    assert entries.call_count == 2
+    assert src.symbols.call_count == 2
+
+
+def test_index_not_cached_after_failure(src, mocker, cache_dir):
+    other = mocker.MagicMock(BaseSource)
+    other.BASE_URL_NAME = BaseSource.BASE_URL_NAME
+    other.id = mocker.MagicMock(return_value="other")
+    other.symbols.side_effect = exceptions.RequestError("Network issue")
+    assert search.index([src, other]).search("xrp") == []
+    assert not (cache_dir / "search-index-testsource-other.json").exists()
+
+    other.symbols.side_effect = None
+    other.symbols.return_value = [("XRP", "Ripple")]
+    assert search.index([src, other]).search("xrp")[0] == ("other", "XRP", "Ripple")
+    assert (cache_dir / "search-index-testsource-other.json").exists()
+
+
+def test_index_round_trip(index):
+    restored = Index.fromdata(index.data())
+    assert restored.entries == index.entries
+    assert restored.search("bitcon") == index.search("bitcon")
+
+
+def test_format_search(src):
+    assert search.format_search("eth", [src]) == "testsource    ETH    Ether\n"
+
+
+def test_format_search_no_results(src, caplog):
+    with caplog.at_level(logging.INFO):
+        assert search.format_search("xyz", [src]) == ""
+    assert any("No results found" in r.message for r in caplog.records)
@@ -4,7 +4,7 @@ from decimal import Decimal
 import pytest
 
 from pricehist.price import Price
-from pricehist.series import Series
+from pricehist.series import Series, interleave
 
 
 @pytest.fixture
@@ -93,3 +93,292 @@ def test_quantize_does_not_go_beyond_context_max_prec(series):
     assert result0.prices[0].amount == Decimal("1.01234567890123456789012346")
     assert result1.prices[0].amount == Decimal("1.012345678901234567890123457")
     assert result2.prices[0].amount == Decimal("1.012345678901234567890123457")
+
+
+def test_cross_joins_on_common_dates():
+    a = Series(
+        "A",
+        "B",
+        "type",
+        "2021-01-01",
+        "2021-01-31",
+        [
+            Price("2021-01-01", Decimal("2")),
+            Price("2021-01-02", Decimal("3")),
+            Price("2021-01-04", Decimal("4")),
+        ],
+    )
+    b = Series(
+        "B",
+        "C",
+        "type",
+        "2021-01-02",
+        "2021-02-28",
+        [
+            Price("2021-01-02", Decimal("1.5")),
+            Price("2021-01-03", Decimal("1.6")),
+            Price("2021-01-04", Decimal("1.7")),
+        ],
+    )
+    result = a.cross(b)
+    assert (result.base, result.quote) == ("A", "C")
+    assert (result.start, result.end) == ("2021-01-02", "2021-01-31")
+    assert result.prices == [
+        Price("2021-01-02", Decimal("4.5")),
+        Price("2021-01-04", Decimal("6.8")),
+    ]
+
+
+def test_cross_requires_matching_symbols(series):
+    with pytest.raises(ValueError, match="Can't cross BASE/QUOTE with BASE/QUOTE"):
+        series.cross(series)
+
+
+@pytest.fixture
+def daily():
+    amounts = {
+        "2021-03-30": "1",
+        "2021-03-31": "3",
+        "2021-04-01": "5",
+        "2021-04-02": "4",
+        "2021-04-05": "2",
+        "2021-06-30": "6",
+        "2021-07-01": "7",
+    }
+    prices = [Price(d, Decimal(a)) for d, a in amounts.items()]
+    return Series("BASE", "QUOTE", "type", "2021-03-01", "2021-07-31", prices)
+
+
+@pytest.mark.parametrize(
+    "period,aggregate,expected",
+    [
+        (
+            "month",
+            "last",
+            [
+                ("2021-03-31", "3"),
+                ("2021-04-05", "2"),
+                ("2021-06-30", "6"),
+                ("2021-07-01", "7"),
+            ],
+        ),
+        (
+            "month",
+            "first",
+            [
+                ("2021-03-30", "1"),
+                ("2021-04-01", "5"),
+                ("2021-06-30", "6"),
+                ("2021-07-01", "7"),
+            ],
+        ),
+        (
+            "week",
+            "high",
+            [
+                ("2021-04-02", "5"),
+                ("2021-04-05", "2"),
+                ("2021-07-01", "7"),
+            ],
+        ),
+        (
+            "quarter",
+            "low",
+            [("2021-03-31", "1"), ("2021-06-30", "2"), ("2021-07-01", "7")],
+        ),
+        (
+            "quarter",
+            "mean",
+            [("2021-03-31", "2"), ("2021-06-30", "4.25"), ("2021-07-01", "7")],
+        ),
+        ("year", "last", [("2021-07-01", "7")]),
+    ],
+)
+def test_resample(daily, period, aggregate, expected):
+    result = daily.resample(period, aggregate)
+    assert [(p.date, p.amount) for p in result.prices] == [
+        (d, Decimal(a)) for d, a in expected
+    ]
+    assert (result.start, result.end) == (daily.start, daily.end)
+
+
+def test_resample_empty(daily):
+    assert replace(daily, prices=[]).resample("month").prices == []
+
+
+def test_resample_unknown_period_or_aggregate(daily):
+    with pytest.raises(ValueError, match="Unknown resampling period 'day'"):
+        daily.resample("day")
+    with pytest.raises(ValueError, match="Unknown resampling aggregate 'median'"):
+        daily.resample("month", "median")
+
+
+@pytest.fixture
+def gappy():
+    dates = ["2021-01-04", "2021-01-05", "2021-01-07", "2021-01-08", "2021-01-11"]
+    prices = [Price(d, Decimal(i + 1)) for i, d in enumerate(dates)]
+    return Series("BASE", "QUOTE", "type", "2021-01-01", "2021-01-31", prices)
+
+
+def test_at(gappy):
+    assert gappy.at("2021-01-05") == Price("2021-01-05", Decimal("2"))
+    assert gappy.at("2021-01-06") is None
+    assert gappy.at("2021-01-01") is None
+    assert gappy.at("2021-01-31") is None
+
+
+def test_asof(gappy):
+    assert gappy.asof("2021-01-03") is None
+    assert gappy.asof("2021-01-04") == Price("2021-01-04", Decimal("1"))
+    assert gappy.asof("2021-01-06") == Price("2021-01-05", Decimal("2"))
+    assert gappy.asof("2021-01-31") == Price("2021-01-11", Decimal("5"))
+
+
+def test_slice(gappy):
+    result = gappy.slice("2021-01-05", "2021-01-10")
+    assert (result.start, result.end) == ("2021-01-05", "2021-01-10")
+    assert result.prices == gappy.prices[1:4]
+    assert len(result.prices) == 3
+    assert result.prices[-1] == Price("2021-01-08", Decimal("4"))
+    assert result.prices[0:2] == gappy.prices[1:3]
+    assert [p.date for p in result.prices] == ["2021-01-05", "2021-01-07", "2021-01-08"]
+    with pytest.raises(IndexError):
+        result.prices[3]
+
+
+def test_slice_shares_prices(gappy):
+    result = gappy.slice("2021-01-05", "2021-01-10")
+    assert result.prices[0] is gappy.prices[1]
+    assert result.prices._prices is gappy.prices
+
+
+def test_slice_of_slice(gappy):
+    outer = gappy.slice("2021-01-05", "2021-01-10")
+    inner = outer.slice("2021-01-01", "2021-01-07")
+    assert inner.prices == gappy.prices[1:3]
+    assert inner.at("2021-01-08") is None
+    assert inner.asof("2021-01-31") == Price("2021-01-07", Decimal("3"))
+    assert inner.asof("2021-01-04") is None
+    assert inner.prices._dates is outer.prices._dates
+
+
+def test_slice_empty(gappy):
+    assert gappy.slice("2021-01-09", "2021-01-10").prices == []
+    assert gappy.slice("2021-01-10", "2021-01-09").prices == []
+    assert gappy.slice("2022-01-01", "2022-12-31").prices == []
+
+
+def test_slice_transforms(gappy):
+    result = gappy.slice("2021-01-05", "2021-01-07").invert()
+    assert result.prices == [
+        Price("2021-01-05", Decimal("0.5")),
+        Price("2021-01-07", 1 / Decimal("3")),
+    ]
+
+
+def prices(*pairs):
+    return [Price(d, Decimal(a)) for d, a in pairs]
+
+
+@pytest.fixture
+def older():
+    return Series(
+        "BASE",
+        "QUOTE",
+        "type",
+        "2021-01-01",
+        "2021-01-05",
+        prices(("2021-01-01", "1"), ("2021-01-03", "3"), ("2021-01-05", "5")),
+    )
+
+
+@pytest.fixture
+def newer():
+    return Series(
+        "BASE",
+        "QUOTE",
+        "type",
+        "2021-01-03",
+        "2021-01-08",
+        prices(("2021-01-03", "3.5"), ("2021-01-04", "4"), ("2021-01-08", "8")),
+    )
+
+
+def test_merge_prefers_last_by_default(older, newer):
+    result = older.merge(newer)
+    assert (result.start, result.end) == ("2021-01-01", "2021-01-08")
+    assert result.prices == prices(
+        ("2021-01-01", "1"),
+        ("2021-01-03", "3.5"),
+        ("2021-01-04", "4"),
+        ("2021-01-05", "5"),
+        ("2021-01-08", "8"),
+    )
+
+
+def test_merge_prefers_first(older, newer):
+    result = older.merge(newer, conflict="first")
+    assert result.at("2021-01-03").amount == Decimal("3")
+    assert len(result.prices) == 5
+
+
+def test_merge_many(older, newer):
+    empty = replace(older, start="2020-12-01", prices=[])
+    extra = replace(newer, prices=prices(("2021-01-02", "2"), ("2021-01-03", "9")))
+    result = empty.merge(older, newer, extra)
+    assert result.start == "2020-12-01"
+    assert [p.date for p in result.prices] == [
+        "2021-01-01",
+        "2021-01-02",
+        "2021-01-03",
+        "2021-01-04",
+        "2021-01-05",
+        "2021-01-08",
+    ]
+    assert result.at("2021-01-03").amount == Decimal("9")
+
+
+def test_merge_dedupes_within_one_series(older):
+    doubled = replace(older, prices=older.prices + older.prices[2:])
+    assert replace(older, prices=[]).merge(doubled).prices == older.prices
+
+
+def test_merge_error_on_conflict(older, newer):
+    with pytest.raises(
+        ValueError, match="Conflicting prices for 2021-01-03: 3 and 3.5"
+    ):
+        older.merge(newer, conflict="error")
+    assert older.merge(older, conflict="error").prices == older.prices
+
+
+def test_merge_requires_same_pair_and_type(older):
+    with pytest.raises(ValueError, match="Can't merge BASE/QUOTE open prices"):
+        older.merge(replace(older, type="open"))
+    with pytest.raises(ValueError, match="Unknown merge conflict policy 'x'"):
+        older.merge(older, conflict="x")
+
+
+def test_interleave_by_date_then_pair(older, newer):
+    usd = replace(newer, quote="USD")
+    eur = replace(older, quote="EUR")
+    chunks = list(interleave([usd, eur]))
+    assert [(c.quote, [p.date for p in c.prices]) for c in chunks] == [
+        ("EUR", ["2021-01-01", "2021-01-03"]),
+        ("USD", ["2021-01-03", "2021-01-04"]),
+        ("EUR", ["2021-01-05"]),
+        ("USD", ["2021-01-08"]),
+    ]
+    assert chunks[0].start == older.start
+
+
+def test_interleave_keeps_input_order_for_same_pair(older, newer):
+    chunks = list(interleave([newer, older, replace(older, prices=[])]))
+    assert [p.amount for c in chunks for p in c.prices] == [
+        Decimal("1"),
+        Decimal("3.5"),
+        Decimal("3"),
+        Decimal("4"),
+        Decimal("5"),
+        Decimal("8"),
+    ]
+    assert list(interleave([])) == []
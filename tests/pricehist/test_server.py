@@ -0,0 +1,276 @@
+import os
+import signal
+import socket
+import stat
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+import requests
+
+from pricehist import exceptions, metrics, sources
+from pricehist.price import Price
+from pricehist.server import Cache, PriceServer, serve
+from pricehist.sources.basesource import BaseSource
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_loads_once():
+    cache = Cache()
+    calls = []
+    assert cache.get("k", lambda: calls.append(1) or "v") == "v"
+    assert cache.get("k", lambda: calls.append(1) or "other") == "v"
+    assert len(calls) == 1
+
+
+def test_cache_drops_least_recently_used():
+    cache = Cache(size=2)
+    cache.get("a", lambda: 1)
+    cache.get("b", lambda: 2)
+    cache.get("a", lambda: 0)
+    cache.get("c", lambda: 3)
+    assert len(cache) == 2
+    assert cache.get("a", lambda: "reloaded") == 1
+    assert cache.get("b", lambda: "reloaded") == "reloaded"
+
+
+def test_cache_entries_expire():
+    clock = Clock()
+    cache = Cache(ttl=10, clock=clock)
+    cache.get("k", lambda: "old")
+    clock.now = 9
+    assert cache.get("k", lambda: "new") == "old"
+    clock.now = 10
+    assert cache.get("k", lambda: "new") == "new"
+
+
+def test_cache_exceptions_not_cached():
+    cache = Cache()
+
+    def fail():
+        raise exceptions.RequestError("Network issue")
+
+    with pytest.raises(exceptions.RequestError):
+        cache.get("k", fail)
+    assert cache.get("k", lambda: "v") == "v"
+
+
+def test_cache_coalesces_concurrent_loads():
+    cache = Cache()
+    calls = []
+    release = threading.Event()
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        return "v"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get("k", load)))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert results == ["v"] * 5
+
+
+@pytest.fixture
+def src(mocker):
+    src = mocker.MagicMock(BaseSource)
+    src.id = mocker.MagicMock(return_value="testsource")
+    src.types = mocker.MagicMock(return_value=["close", "open"])
+    src.start = mocker.MagicMock(return_value="2021-01-01")
+    src.normalizesymbol = lambda s: s.upper()
+
+    def fetch(series):
+        return series.__class__(
+            series.base,
+            series.quote,
+            series.type,
+            series.start,
+            series.end,
+            [Price("2021-01-01", Decimal("1.5")), Price("2021-01-02", Decimal("2"))],
+        )
+
+    src.fetch = mocker.MagicMock(side_effect=fetch)
+    mocker.patch.dict(sources.by_id, {"testsource": src})
+    return src
+
+
+@pytest.fixture
+def server():
+    server = PriceServer(("127.0.0.1", 0))
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, **params):
+    return requests.get(f"{server.location()}/prices", params=params)
+
+
+def test_prices(server, src):
+    response = get(
+        server,
+        source="testsource",
+        pair="btc/usd",
+        start="2021-01-01",
+        end="2021-01-02",
+        output="ledger",
+    )
+    assert response.status_code == 200
+    assert response.text == (
+        "P 2021-01-01 00:00:00 BTC 1.5 USD\nP 2021-01-02 00:00:00 BTC 2 USD\n"
+    )
+
+
+def test_prices_transformed_and_formatted(server, src):
+    response = get(
+        server,
+        source="testsource",
+        pair="BTC/USD",
+        start="2021-01-01",
+        end="2021-01-02",
+        invert="true",
+        quantize="2",
+        output="csv",
+        **{"fmt-decimal": ","},
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/csv")
+    assert response.text.splitlines()[1] == '2021-01-01,USD,BTC,"0,67",testsource,close'
+
+
+def test_prices_cached(server, src):
+    for _ in range(3):
+        response = get(server, source="testsource", pair="BTC/USD", end="2021-01-02")
+        assert response.status_code == 200
+    assert src.fetch.call_count == 1
+    get(server, source="testsource", pair="BTC/USD", end="2021-01-02", type="open")
+    assert src.fetch.call_count == 2
+
+
+@pytest.mark.parametrize(
+    "params,message",
+    [
+        ({"pair": "BTC/USD"}, "source and pair parameters are required"),
+        ({"source": "nosource", "pair": "BTC/USD"}, "Unknown source"),
+        ({"source": "testsource", "pair": "/USD"}, "No base found"),
+        ({"source": "testsource", "pair": "BTC/USD", "type": "x"}, "not recognized"),
+        ({"source": "testsource", "pair": "BTC/USD", "end": "2021-13-01"}, "valid"),
+        ({"source": "testsource", "pair": "BTC/USD", "end": "2020-01-01"}, "preceeds"),
+        ({"source": "testsource", "pair": "BTC/USD", "output": "x"}, "Unknown output"),
+        ({"source": "testsource", "pair": "BTC/USD", "output": "sqlite"}, "a file"),
+        (
+            {"source": "testsource", "pair": "BTC/USD", "quantize": "x"},
+            "The quantize parameter must be an integer, not 'x'.",
+        ),
+    ],
+)
+def test_prices_bad_request(server, src, params, message):
+    response = get(server, **params)
+    assert response.status_code == 400
+    assert message in response.text
+
+
+def test_prices_invalid_pair(server, src):
+    src.fetch.side_effect = exceptions.InvalidPair("BTC", "XXX", src)
+    response = get(server, source="testsource", pair="BTC/XXX")
+    assert response.status_code == 404
+    assert "Invalid pair 'BTC/XXX'" in response.text
+
+
+def test_prices_invalid_type(server, src):
+    src.fetch.side_effect = exceptions.InvalidType("open", "BTC", "USD", src)
+    response = get(server, source="testsource", pair="BTC/USD", type="open")
+    assert response.status_code == 400
+    assert "Invalid price type 'open' for pair 'BTC/USD'" in response.text
+
+
+def test_prices_source_error(server, src):
+    src.fetch.side_effect = exceptions.BadResponse("Server error")
+    response = get(server, source="testsource", pair="BTC/USD")
+    assert response.status_code == 502
+    assert "Server error" in response.text
+
+
+def test_prices_source_error_counted(server, src):
+    metrics.reset()
+    src.fetch.side_effect = exceptions.RequestError("Network issue")
+    get(server, source="testsource", pair="BTC/USD")
+    assert metrics.snapshot()["pricehist_errors_total"] == {
+        (("source", ""), ("type", "RequestError")): 1
+    }
+    metrics.reset()
+
+
+def test_not_found(server):
+    response = requests.get(f"{server.location()}/other")
+    assert response.status_code == 404
+
+
+def test_metrics(server, mocker):
+    metrics.reset()
+    metrics.record_error(exceptions.BadResponse("x"), "testsource")
+    response = requests.get(f"{server.location()}/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert 'pricehist_errors_total{source="testsource",type="BadResponse"} 1' in (
+        response.text
+    )
+    response = requests.get(f"{server.location()}/metrics", params={"format": "json"})
+    assert response.json()["pricehist_errors_total"]["series"][0]["value"] == 1
+    metrics.reset()
+
+
+def stale_socket(path):
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(path))
+    listener.close()  # Leaves the socket file behind.
+
+
+def test_serve_replaces_stale_socket_and_stops_on_sigterm(tmp_path):
+    path = tmp_path / "p.sock"
+    stale_socket(path)
+    timer = threading.Timer(0.2, os.kill, (os.getpid(), signal.SIGTERM))
+    timer.start()
+    serve(socket=str(path))
+    timer.join()
+    assert not path.exists()
+    assert signal.getsignal(signal.SIGTERM) is signal.SIG_DFL
+
+
+def test_serve_keeps_live_socket_and_other_files(tmp_path):
+    path = tmp_path / "p.sock"
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(path))
+    listener.listen()
+    try:
+        with pytest.raises(OSError, match="Address already in use"):
+            serve(socket=str(path))
+        assert stat.S_ISSOCK(path.stat().st_mode)
+    finally:
+        listener.close()
+
+    other = tmp_path / "file"
+    other.write_text("")
+    with pytest.raises(OSError):
+        serve(socket=str(other))
+    assert other.read_text() == ""
@@ -1,6 +1,10 @@
 import re
 
+import pytest
+
 from pricehist import sources
+from pricehist.sources.basesource import BaseSource
+from pricehist.sources.ecb import ECB
 
 
 def test_formatted_includes_ecb():
@@ -14,3 +18,125 @@ def test_formatted_names_aligned():
     first = offsets[0]
     assert first > 1
     assert all(offset == first for offset in offsets)
+
+
+class Plugin(BaseSource):
+    def id(self):
+        return "plugin"
+
+    def name(self):
+        return "Plugin Source"
+
+    def description(self):
+        return ""
+
+    def source_url(self):
+        return ""
+
+    def start(self):
+        return "2000-01-01"
+
+    def types(self):
+        return ["close"]
+
+    def notes(self):
+        return ""
+
+    def symbols(self):
+        return []
+
+    def fetch(self, series):
+        return series
+
+
+@pytest.fixture
+def entry_point(mocker):
+    entry_point = mocker.MagicMock()
+    entry_point.name = "plugin"
+    entry_point.value = "plugin_package.source:Plugin"
+    entry_point.dist.version = "1.0.0"
+    entry_point.load = mocker.MagicMock(return_value=Plugin)
+    return entry_point
+
+
+def test_registry_lists_plugin_without_loading_it(entry_point):
+    registry = sources.Registry([ECB()], [entry_point])
+    assert list(registry) == ["ecb", "plugin"]
+    assert "plugin" in registry
+    entry_point.load.assert_not_called()
+
+
+def test_registry_loads_plugin_once_when_looked_up(entry_point):
+    registry = sources.Registry([ECB()], [entry_point])
+    source = registry["plugin"]
+    assert isinstance(source, Plugin)
+    assert registry["plugin"] is source
+    entry_point.load.assert_called_once()
+
+
+def test_registry_unknown_id(entry_point):
+    registry = sources.Registry([ECB()], [entry_point])
+    with pytest.raises(KeyError):
+        registry["other"]
+
+
+def test_registry_ignores_plugin_with_builtin_id(entry_point, caplog):
+    entry_point.name = "ecb"
+    registry = sources.Registry([ECB()], [entry_point])
+    assert list(registry) == ["ecb"]
+    assert isinstance(registry["ecb"], ECB)
+    assert "duplicate ID" in caplog.text
+
+
+def test_registry_rejects_plugin_with_wrong_id(entry_point):
+    entry_point.name = "other"
+    registry = sources.Registry([], [entry_point])
+    with pytest.raises(ValueError, match="has the ID 'plugin'"):
+        registry["other"]
+
+
+def test_registry_rejects_plugin_that_is_not_a_source(entry_point):
+    entry_point.load.return_value = object
+    registry = sources.Registry([], [entry_point])
+    with pytest.raises(TypeError, match="not a BaseSource subclass"):
+        registry["plugin"]
+
+
+def test_registry_name_cached_until_version_changes(entry_point):
+    sources.Registry([], [entry_point]).name("plugin")
+    assert entry_point.load.call_count == 1
+
+    assert sources.Registry([], [entry_point]).name("plugin") == "Plugin Source"
+    assert entry_point.load.call_count == 1
+
+    entry_point.dist.version = "1.1.0"
+    assert sources.Registry([], [entry_point]).name("plugin") == "Plugin Source"
+    assert entry_point.load.call_count == 2
+
+
+def test_formatted_skips_plugin_that_fails_to_load(entry_point, mocker, caplog):
+    entry_point.load.side_effect = ImportError("No module named 'plugin_package'")
+    mocker.patch.object(sources, "by_id", sources.Registry([ECB()], [entry_point]))
+    assert sources.formatted().splitlines() == ["ecb    European Central Bank"]
+    assert "plugin source, which failed to load" in caplog.text
+
+
+def test_registry_available_skips_plugin_that_fails_to_load(entry_point, caplog):
+    entry_point.load.side_effect = ImportError("No module named 'plugin_package'")
+    registry = sources.Registry([ECB()], [entry_point])
+    assert [source.id() for source in registry.available()] == ["ecb"]
+    assert "plugin source, which failed to load" in caplog.text
+
+
+def test_registry_available_loads_plugins(entry_point):
+    registry = sources.Registry([ECB()], [entry_point])
+    assert [source.id() for source in registry.available()] == ["ecb", "plugin"]
+
+
+def test_registry_assignment_replaces_plugin(entry_point):
+    registry = sources.Registry([ECB()], [entry_point])
+    registry["plugin"] = ECB()
+    assert isinstance(registry["plugin"], ECB)
+    del registry["ecb"]
+    assert list(registry) == ["plugin"]
+    entry_point.load.assert_not_called()
@@ -0,0 +1,129 @@
+import threading
+from datetime import date
+
+import pytest
+
+from pricehist import exceptions
+from pricehist.series import Series
+from pricehist.sources.alphavantage import AlphaVantage
+from pricehist.sources.bankofcanada import BankOfCanada
+from pricehist.sources.coinbasepro import CoinbasePro
+from pricehist.sources.coindesk import CoinDesk
+from pricehist.sources.coinmarketcap import CoinMarketCap
+from pricehist.sources.ecb import ECB
+from pricehist.sources.yahoo import Yahoo
+from pricehist.standin import Market, StandIn
+
+
+def start_server(**kwargs):
+    market = Market(years=3, today=date(2021, 6, 30))
+    server = StandIn(("127.0.0.1", 0), market, **kwargs)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    return server
+
+
+@pytest.fixture
+def standin(monkeypatch):
+    server = start_server()
+    monkeypatch.setenv("PRICEHIST_BASE_URL", server.base_url())
+    monkeypatch.setenv("ALPHAVANTAGE_API_KEY", "STANDIN")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def check(series, start, end):
+    dates = [p.date for p in series.prices]
+    assert dates
+    assert dates == sorted(set(dates))
+    assert start <= dates[0] and dates[-1] <= end
+    assert all(p.amount > 0 for p in series.prices)
+
+
+def test_market_is_deterministic():
+    a = Market(years=1, seed=1, today=date(2021, 6, 30))
+    b = Market(years=1, seed=1, today=date(2021, 6, 30))
+    c = Market(years=1, seed=2, today=date(2021, 6, 30))
+    rows = a.ohlc("k", "2021-01-01", "2021-01-31")
+    assert rows == b.ohlc("k", "2021-01-01", "2021-01-31")
+    assert rows != c.ohlc("k", "2021-01-01", "2021-01-31")
+
+
+def test_market_skips_weekends_by_default():
+    market = Market(years=1, today=date(2021, 6, 30))
+    weekdays = market.ohlc("k", "2021-01-01", "2021-01-31")
+    all_days = market.ohlc("k", "2021-01-01", "2021-01-31", weekdays=False)
+    assert len(weekdays) == 21
+    assert len(all_days) == 31
+
+
+@pytest.mark.parametrize(
+    "src,base,quote,type",
+    [
+        (ECB(), "EUR", "USD", "reference"),
+        (BankOfCanada(), "USD", "CAD", "default"),
+        (CoinbasePro(), "BTC", "EUR", "mid"),
+        (CoinDesk(), "BTC", "USD", "close"),
+        (CoinMarketCap(), "BTC", "USD", "close"),
+        (AlphaVantage(), "IBM", "", "close"),
+        (AlphaVantage(), "EUR", "AUD", "close"),
+        (AlphaVantage(), "BTC", "AUD", "close"),
+        (Yahoo(), "TSLA", "", "adjclose"),
+    ],
+)
+def test_sources_fetch_from_standin(standin, src, base, quote, type):
+    series = src.fetch(Series(base, quote, type, "2019-01-01", "2021-06-30"))
+    check(series, "2019-01-01", "2021-06-30")
+
+
+def test_segmented_source_covers_whole_range(standin):
+    series = CoinbasePro().fetch(
+        Series("BTC", "EUR", "close", "2019-01-01", "2021-06-30")
+    )
+    days = (date(2021, 6, 30) - date(2019, 1, 1)).days + 1
+    assert len(series.prices) == days
+
+
+def test_symbols_from_standin(standin):
+    assert ("EUR/USD", "Euro against US Dollar") in ECB().symbols()
+    assert len(BankOfCanada().symbols()) > 20
+
+
+def test_invalid_pair(standin):
+    with pytest.raises(exceptions.InvalidPair):
+        BankOfCanada().fetch(
+            Series("XXX", "CAD", "default", "2021-01-01", "2021-01-31")
+        )
+
+
+def test_batched_pairs_from_standin(standin):
+    result = BankOfCanada().fetch_many(
+        [
+            Series("USD", "CAD", "default", "2021-01-01", "2021-01-31"),
+            Series("*", "CAD", "default", "2021-01-01", "2021-01-31"),
+        ]
+    )
+    assert len(result) > 20
+    assert len({(s.base, s.quote) for s in result}) == len(result)
+    for series in result:
+        check(series, "2021-01-01", "2021-01-31")
+
+
+def test_errors_at_given_rate(monkeypatch):
+    server = start_server(error_rate=1)
+    monkeypatch.setenv("PRICEHIST_BASE_URL", server.base_url())
+    try:
+        with pytest.raises(exceptions.BadResponse) as e:
+            CoinDesk().fetch(Series("BTC", "USD", "close", "2021-01-01", "2021-01-31"))
+        assert "503" in str(e.value)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_rebase_url():
+    url = "https://www.ecb.europa.eu/stats/x.xml?a=1"
+    base_url = "http://localhost:1/prefix/"
+    rebased = ECB()._rebase_url(url, base_url)
+    assert rebased == "http://localhost:1/prefix/stats/x.xml?a=1"
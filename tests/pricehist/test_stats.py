@@ -0,0 +1,130 @@
+import json
+import logging
+import math
+from dataclasses import replace
+from decimal import Decimal
+
+import pytest
+
+from pricehist import stats
+from pricehist.price import Price
+from pricehist.series import Series
+
+pytest.importorskip("numpy")
+
+
+def prices(*rows):
+    return [Price(d, Decimal(a)) for d, a in rows]
+
+
+@pytest.fixture
+def series():
+    return Series(
+        "BTC",
+        "EUR",
+        "close",
+        "2021-01-01",
+        "2021-01-15",
+        prices(
+            ("2021-01-04", "100"),
+            ("2021-01-05", "110"),
+            ("2021-01-06", "99"),
+            ("2021-01-08", "121"),
+            ("2021-01-13", "120"),
+        ),
+    )
+
+
+@pytest.fixture
+def source(mocker, series):
+    source = mocker.MagicMock()
+    source.start = mocker.MagicMock(return_value="2009-01-03")
+    source.fetch_many = mocker.MagicMock(return_value=[series, series])
+    return source
+
+
+def test_compute(series):
+    result = stats.compute(series, window=3)
+    assert result["start"] == "2021-01-04"
+    assert result["end"] == "2021-01-13"
+    assert result["rows"] == 5
+    assert result["min"] == Decimal("99")
+    assert result["max"] == Decimal("121")
+    assert result["log_return"] == pytest.approx(math.log(1.2))
+    assert result["mean_log_return"] == pytest.approx(math.log(1.2) / 4)
+    assert result["last_window_mean"] == pytest.approx((99 + 121 + 120) / 3)
+    assert result["max_drawdown"] == pytest.approx(0.1)
+    # 2021-01-07, then 2021-01-11 and 2021-01-12 over the weekend.
+    assert result["gaps"] == 2
+    assert result["missing_weekdays"] == 3
+
+
+def test_compute_volatility(series):
+    returns = [
+        math.log(110 / 100),
+        math.log(99 / 110),
+        math.log(121 / 99),
+        math.log(120 / 121),
+    ]
+    mean = sum(returns) / 4
+    sample_sd = math.sqrt(sum((r - mean) ** 2 for r in returns) / 3)
+    last3 = returns[1:]
+    mean3 = sum(last3) / 3
+    sample_sd3 = math.sqrt(sum((r - mean3) ** 2 for r in last3) / 2)
+    result = stats.compute(series, window=3)
+    assert result["volatility"] == pytest.approx(sample_sd)
+    assert result["last_window_volatility"] == pytest.approx(sample_sd3)
+
+
+def test_compute_too_few_prices(series):
+    result = stats.compute(series, window=5)
+    assert result["last_window_mean"] == pytest.approx(110)
+    assert result["last_window_volatility"] is None
+
+    single = stats.compute(Series("A", "B", "t", "x", "y", series.prices[:1]))
+    assert single["rows"] == 1
+    assert single["log_return"] is None
+    assert single["volatility"] is None
+    assert single["max_drawdown"] == 0
+    assert single["gaps"] == 0
+
+
+def test_compute_empty():
+    result = stats.compute(Series("A", "B", "t", "2021-01-01", "2021-01-31"))
+    assert result["rows"] == 0
+    assert result["start"] is None
+    assert result["min"] is None
+    assert result["max_drawdown"] is None
+    assert result["missing_weekdays"] == 0
+
+
+def test_compute_non_positive_amounts(series):
+    amounts = prices(("2021-01-04", "0")) + series.prices[1:3]
+    subject = Series("A", "B", "t", "x", "y", amounts)
+    result = stats.compute(subject)
+    assert result["log_return"] is None
+    assert result["min"] == Decimal("0")
+
+
+def test_format_stats_csv(series, source):
+    result = stats.format_stats([series, series], source, window=3)
+    lines = result.splitlines()
+    assert lines[0] == ",".join(stats.COLUMNS)
+    assert len(lines) == 3
+    assert lines[1].startswith("BTC,EUR,close,2021-01-04,2021-01-13,5,99,121,")
+    assert lines[1].endswith(",2,3")
+
+
+def test_format_stats_json(series, source):
+    data = json.loads(stats.format_stats([series], source, window=10, output="json"))
+    assert len(data) == 2
+    assert list(data[0]) == stats.COLUMNS
+    assert data[0]["min"] == "99"
+    assert data[0]["last_window_mean"] is None
+
+
+def test_format_stats_warns_like_fetch(series, source, caplog):
+    with caplog.at_level(logging.WARNING):
+        stats.format_stats([replace(series, start="2008-01-01")], source)
+    assert "preceeds the" in caplog.text
+    assert "BTC/EUR: Available data covers the interval" in caplog.text
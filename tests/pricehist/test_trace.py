@@ -0,0 +1,79 @@
+import json
+from dataclasses import replace
+from decimal import Decimal
+
+import pytest
+
+from pricehist import trace
+from pricehist.fetch import fetch
+from pricehist.format import Format
+from pricehist.outputs.csv import CSV
+from pricehist.price import Price
+from pricehist.series import Series
+from pricehist.sources.basesource import BaseSource
+
+
+@pytest.fixture
+def tracing():
+    trace.start()
+    yield
+    trace.stop()
+
+
+def events():
+    return trace._events
+
+
+def test_span_does_nothing_when_not_tracing():
+    with trace.span("idle", a=1) as span:
+        span.set(b=2)
+    assert events() is None
+
+
+def test_spans_record_times_and_attributes(tracing):
+    with trace.span("outer", pair="EUR/USD") as outer:
+        with trace.span("inner"):
+            pass
+        outer.set(rows=3)
+    inner, outer = events()
+    assert (inner["name"], outer["name"]) == ("inner", "outer")
+    assert outer["ph"] == "X"
+    assert outer["args"] == {"pair": "EUR/USD", "rows": 3}
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+
+
+def test_span_notes_error(tracing):
+    with pytest.raises(ValueError):
+        with trace.span("failing"):
+            raise ValueError("Bad value")
+    assert events()[0]["args"] == {"error": "ValueError: Bad value"}
+
+
+def test_write(tracing, tmp_path):
+    with trace.span("phase", date=Decimal("1.5")):
+        pass
+    path = tmp_path / "trace.json"
+    trace.write(str(path))
+    data = json.loads(path.read_text())
+    assert data["traceEvents"][0]["ph"] == "M"
+    assert data["traceEvents"][1]["name"] == "phase"
+    assert data["traceEvents"][1]["args"] == {"date": "1.5"}
+
+
+def test_fetch_phases_traced(tracing, mocker):
+    prices = [Price("2021-01-01", Decimal("1.23456")), Price("2021-01-02", Decimal(2))]
+    source = mocker.MagicMock(BaseSource)
+    source.id = mocker.MagicMock(return_value="mock")
+    source.start = mocker.MagicMock(return_value="2021-01-01")
+    req_series = Series("EUR", "USD", "close", "2021-01-01", "2021-01-02")
+    source.fetch = mocker.MagicMock(return_value=replace(req_series, prices=prices))
+
+    fetch(req_series, source, CSV(), invert=True, quantize=2, fmt=Format())
+
+    spans = {e["name"]: e["args"] for e in events()}
+    assert list(spans) == ["source", "invert", "quantize", "output", "fetch"]
+    assert spans["fetch"]["pair"] == "EUR/USD"
+    assert spans["fetch"]["source"] == "mock"
+    assert spans["source"] == {"rows": 2}
+    assert spans["output"] == {"output": "CSV", "rows": 2}
@@ -0,0 +1,118 @@
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from pricehist import jobs, sources, watch
+from pricehist.price import Price
+
+AUD = {"2021-01-04": "1.5928", "2021-01-05": "1.5927", "2021-01-07": "1.5836"}
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def ecb(mocker):
+    ecb = sources.by_id["ecb"]
+
+    def fetch_many(series_list):
+        return [
+            replace(
+                series,
+                prices=[
+                    Price(d, Decimal(a))
+                    for d, a in AUD.items()
+                    if series.start <= d <= series.end
+                ],
+            )
+            for series in series_list
+        ]
+
+    mocker.patch.object(ecb, "fetch_many", side_effect=fetch_many)
+    return ecb
+
+
+def job_list(tmp_path, **spec):
+    spec = {
+        "source": "ecb",
+        "pairs": ["EUR/AUD"],
+        "start": "2021-01-04",
+        "output": "ledger",
+        "output-file": str(tmp_path / "prices.ledger"),
+        **spec,
+    }
+    return jobs.parse({"jobs": [spec]})
+
+
+def requested(ecb):
+    return [
+        [(s.start, s.end) for s in call.args[0]]
+        for call in ecb.fetch_many.call_args_list
+    ]
+
+
+def test_polls_after_publication_and_appends(ecb, tmp_path):
+    watcher = watch.Watcher(job_list(tmp_path))
+
+    assert watcher.poll(utc(2021, 1, 5, 12)) == utc(2021, 1, 5, 15, 5)
+    assert watcher.poll(utc(2021, 1, 5, 15, 5)) == utc(2021, 1, 6, 15, 5)
+
+    assert requested(ecb) == [
+        [("2021-01-04", "2021-01-04")],
+        [("2021-01-05", "2021-01-05")],
+    ]
+    assert (tmp_path / "prices.ledger").read_text() == (
+        "P 2021-01-04 00:00:00 EUR 1.5928 AUD\n"
+        "P 2021-01-05 00:00:00 EUR 1.5927 AUD\n"
+    )
+
+
+def test_polls_again_with_increasing_delays_until_price_appears(ecb, tmp_path):
+    watcher = watch.Watcher(job_list(tmp_path, start="2021-01-05"))
+    watcher.poll(utc(2021, 1, 5, 15, 5))
+
+    assert watcher.poll(utc(2021, 1, 6, 15, 5)) == utc(2021, 1, 6, 15, 15)
+    assert watcher.poll(utc(2021, 1, 6, 15, 15)) == utc(2021, 1, 6, 15, 35)
+    assert watcher.poll(utc(2021, 1, 7, 15, 5)) == utc(2021, 1, 8, 15, 5)
+
+    assert requested(ecb)[1:] == [
+        [("2021-01-06", "2021-01-06")],
+        [("2021-01-06", "2021-01-06")],
+        [("2021-01-06", "2021-01-07")],
+    ]
+    assert (tmp_path / "prices.ledger").read_text().splitlines()[-1] == (
+        "P 2021-01-07 00:00:00 EUR 1.5836 AUD"
+    )
+
+
+def test_polls_unscheduled_sources_at_interval(mocker, tmp_path):
+    yahoo = sources.by_id["yahoo"]
+    mocker.patch.object(yahoo, "fetch", side_effect=lambda series: series)
+    watcher = watch.Watcher(
+        job_list(tmp_path, source="yahoo", pairs=["AAPL"]),
+        interval=timedelta(hours=1),
+    )
+    assert watcher.poll(utc(2021, 1, 5, 12)) == utc(2021, 1, 5, 13)
+    assert yahoo.fetch.call_args.args[0].end == "2021-01-04"
+
+
+def test_watched_jobs_need_an_output_file(tmp_path):
+    jobs_list = [replace(job, path=None) for job in job_list(tmp_path)]
+    with pytest.raises(ValueError, match="need an output-file"):
+        watch.Watcher(jobs_list)
+
+
+@pytest.mark.parametrize(
+    "spec,message",
+    [
+        ({"output": "json"}, "can't be appended to"),
+        ({"resample": "month"}, "Resampled jobs"),
+        ({"pairs": ["EUR/*"]}, "Wildcard pairs"),
+    ],
+)
+def test_unwatchable_jobs(tmp_path, spec, message):
+    with pytest.raises(ValueError, match=message):
+        watch.Watcher(job_list(tmp_path, **spec))